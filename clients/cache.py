@@ -0,0 +1,96 @@
+"""
+Cache de la liste des clients.
+
+La liste des clients triée par nom est conservée dans le cache Django sous
+une clé versionnée. Toute création, modification ou suppression d'un client
+incrémente la version (voir clients/signals.py), ce qui rend l'entrée
+précédente obsolète sans avoir à la supprimer explicitement. La version est
+conservée en base, comme celle des devis (voir devis/cache.py) : elle est
+partagée par tous les processus web.
+
+Les pages de l'autocomplétion des clients sont conservées dans un cache LRU
+propre au processus, indexé par la version lue en base à chaque appel : une
+modification des clients, faite par n'importe quel processus, rend les pages
+précédentes inaccessibles dans tous les processus dès la validation de sa
+transaction. Chaque page servie coûte donc une requête (la lecture de la
+version) au lieu de la recherche des clients.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+from devis.cache import incrementer_version, lire_versions
+
+from .models import Client
+
+# Nombre de clients par page d'autocomplétion
+TAILLE_PAGE_AUTOCOMPLETION = 20
+
+# Dernière page d'autocomplétion servie : au-delà, la page est vide sans
+# interroger la base (un OFFSET démesuré dépasserait la capacité d'un bigint)
+PAGE_MAX_AUTOCOMPLETION = 500
+
+VERSION_CLIENTS = 'clients'
+
+
+def version_clients():
+    """
+    Retourne la version courante de la liste des clients.
+    """
+    return lire_versions(VERSION_CLIENTS)[0]
+
+
+def invalider_clients():
+    """
+    Invalide la liste des clients mise en cache en incrémentant sa version.
+    """
+    incrementer_version(VERSION_CLIENTS)
+
+
+def liste_clients():
+    """
+    Retourne la liste des clients triés par nom, depuis le cache si possible.
+
+    Seuls l'identifiant et le nom sont chargés : la liste sert aux menus
+    déroulants et aux sélecteurs de client.
+    """
+    cle = f'clients:liste:{version_clients()}'
+    clients = cache.get(cle)
+    if clients is None:
+        clients = list(Client.objects.only('id', 'nom').order_by('nom'))
+        cache.set(cle, clients, getattr(settings, 'CLIENTS_LISTE_CACHE_TIMEOUT', 3600))
+    return clients
+
+
+@lru_cache(maxsize=getattr(settings, 'CLIENTS_AUTOCOMPLETION_CACHE', 512))
+def _page_autocompletion(version, prefixe, page):
+    debut = (page - 1) * TAILLE_PAGE_AUTOCOMPLETION
+    clients = Client.objects.order_by('nom', 'id')
+    if prefixe:
+        # UPPER(nom) LIKE 'PREFIXE%' : servi par l'index client_nom_prefixe
+        clients = clients.filter(nom__istartswith=prefixe)
+    # Une ligne de plus que la page indique s'il existe une page suivante,
+    # sans compter les correspondances
+    lignes = tuple(clients.values_list('id', 'nom', 'email')[debut:debut + TAILLE_PAGE_AUTOCOMPLETION + 1])
+    return lignes[:TAILLE_PAGE_AUTOCOMPLETION], len(lignes) > TAILLE_PAGE_AUTOCOMPLETION
+
+
+def autocompletion_clients(prefixe, page=1):
+    """
+    Retourne une page des clients dont le nom commence par un préfixe.
+    Les pages au-delà de PAGE_MAX_AUTOCOMPLETION sont vides.
+
+    Args:
+        prefixe: Le début du nom, sans distinction de casse (vide : tous les clients)
+        page: Le numéro de la page, à partir de 1
+
+    Returns:
+        tuple: (les clients de la page en tuples (id, nom, email), True s'il
+               existe une page suivante)
+    """
+    if page > PAGE_MAX_AUTOCOMPLETION:
+        return (), False
+    clients, suivante = _page_autocompletion(version_clients(), prefixe.strip(), page)
+    return clients, suivante and page < PAGE_MAX_AUTOCOMPLETION
@@ -1,11 +1,17 @@
-from .models import Client
+from django.utils.functional import SimpleLazyObject
+
+from .cache import liste_clients
 
 def clients_list(request):
     """
     Ajoute la liste des clients au contexte global.
+
+    La liste est paresseuse : aucune requête n'est exécutée tant qu'un
+    template ne lit pas la variable, et elle est ensuite servie depuis
+    le cache (voir clients/cache.py).
     """
     if request.user.is_authenticated:
         return {
-            'clients': Client.objects.all().order_by('nom')
+            'clients': SimpleLazyObject(liste_clients)
         }
-    return {'clients': []} 
\ No newline at end of file
+    return {'clients': []}
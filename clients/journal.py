@@ -0,0 +1,139 @@
+"""
+Journal CSV des clients créés.
+
+Chaque client créé est ajouté au fichier CSV des clients (CLIENTS_CSV_PATH,
+clients_data.csv par défaut), après la validation de la transaction qui l'a
+créé. Les lignes sont mises en tampon et écrites par lots par un thread
+d'arrière-plan : une requête HTTP n'attend jamais l'écriture du fichier.
+
+Le fichier est verrouillé (fcntl, ou msvcrt sous Windows) pendant chaque
+écriture d'un lot : plusieurs processus (workers gunicorn) peuvent y ajouter
+des lignes sans qu'elles s'entremêlent, et l'en-tête n'est écrit qu'une fois,
+lorsque le fichier est vide.
+"""
+
+import atexit
+import csv
+import io
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+ENTETE = ['Nom', 'Email']
+
+_journaux = {}
+_verrou = threading.Lock()
+
+
+def _verrouiller(fichier):
+    """Verrouille le fichier en exclusivité, en attendant si nécessaire."""
+    if fcntl is not None:
+        fcntl.flock(fichier.fileno(), fcntl.LOCK_EX)
+    else:
+        fichier.seek(0)
+        msvcrt.locking(fichier.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _deverrouiller(fichier):
+    if fcntl is not None:
+        fcntl.flock(fichier.fileno(), fcntl.LOCK_UN)
+    else:
+        fichier.seek(0)
+        msvcrt.locking(fichier.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class JournalClients:
+    """
+    Écrivain du journal CSV, propre à un processus et à un fichier.
+
+    Les lignes ajoutées sont écrites par le thread d'arrière-plan dès que
+    taille_lot lignes sont en attente, ou au plus tard delai secondes après
+    leur ajout. Les lignes en attente sont écrites à la fin du processus.
+    """
+
+    def __init__(self, chemin, delai=1.0, taille_lot=100):
+        self.chemin = chemin
+        self.delai = delai
+        self.taille_lot = taille_lot
+        self._initialiser()
+        if hasattr(os, 'register_at_fork'):
+            # Un processus créé par fork repart d'un tampon vide et sans thread
+            os.register_at_fork(after_in_child=self._initialiser)
+
+    def _initialiser(self):
+        self._condition = threading.Condition()
+        self._tampon = []
+        self._thread = None
+
+    def ajouter(self, nom, email):
+        """Ajoute une ligne au tampon, sans attendre son écriture."""
+        with self._condition:
+            self._tampon.append([nom, email])
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._boucle, name='journal-clients', daemon=True
+                )
+                self._thread.start()
+            if len(self._tampon) >= self.taille_lot:
+                self._condition.notify()
+
+    def _boucle(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._tampon) >= self.taille_lot, timeout=self.delai)
+                lignes, self._tampon = self._tampon, []
+            if lignes:
+                self._ecrire(lignes)
+
+    def vider(self):
+        """Écrit immédiatement les lignes en attente."""
+        with self._condition:
+            lignes, self._tampon = self._tampon, []
+        if lignes:
+            self._ecrire(lignes)
+
+    def _ecrire(self, lignes):
+        """Ajoute un lot de lignes au fichier, sous verrou."""
+        contenu = io.StringIO()
+        csv.writer(contenu).writerows(lignes)
+        try:
+            with open(self.chemin, mode='a', newline='', encoding='utf-8') as fichier:
+                _verrouiller(fichier)
+                try:
+                    # Taille lue sous verrou : un seul processus écrit l'en-tête
+                    if os.fstat(fichier.fileno()).st_size == 0:
+                        csv.writer(fichier).writerow(ENTETE)
+                    fichier.write(contenu.getvalue())
+                    fichier.flush()
+                finally:
+                    _deverrouiller(fichier)
+            logger.info(f"{len(lignes)} client(s) enregistré(s) dans le fichier CSV")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement de {len(lignes)} client(s) dans le CSV: {str(e)}")
+
+
+def get_journal():
+    """
+    Retourne le journal du fichier CSV configuré, créé au premier appel.
+    """
+    chemin = getattr(settings, 'CLIENTS_CSV_PATH', os.path.join(settings.BASE_DIR, 'clients_data.csv'))
+    with _verrou:
+        journal = _journaux.get(chemin)
+        if journal is None:
+            journal = _journaux[chemin] = JournalClients(
+                chemin,
+                delai=getattr(settings, 'CLIENTS_JOURNAL_DELAI', 1.0),
+                taille_lot=getattr(settings, 'CLIENTS_JOURNAL_TAILLE_LOT', 100),
+            )
+            atexit.register(journal.vider)
+        return journal
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:04
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations
+
+# Vecteur de recherche d'un client, recalculé à chaque écriture du nom, de
+# l'email, du téléphone (tel quel et sans séparateurs) ou de l'adresse
+CREER_TRIGGER = r"""
+CREATE OR REPLACE FUNCTION clients_client_recherche() RETURNS trigger AS $$
+BEGIN
+    NEW.recherche :=
+        setweight(to_tsvector('simple', unaccent(coalesce(NEW.nom, ''))), 'A') ||
+        setweight(to_tsvector('simple', unaccent(coalesce(NEW.email, ''))), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW."téléphone", '') || ' ' ||
+                  regexp_replace(coalesce(NEW."téléphone", ''), '\D', '', 'g')), 'B') ||
+        setweight(to_tsvector('simple', unaccent(coalesce(NEW.adresse, ''))), 'C');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER clients_client_recherche
+    BEFORE INSERT OR UPDATE OF nom, email, "téléphone", adresse ON clients_client
+    FOR EACH ROW EXECUTE FUNCTION clients_client_recherche();
+
+UPDATE clients_client SET nom = nom;
+"""
+
+SUPPRIMER_TRIGGER = """
+DROP TRIGGER IF EXISTS clients_client_recherche ON clients_client;
+DROP FUNCTION IF EXISTS clients_client_recherche();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0008_remove_montant_ttc_field'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.AddField(
+            model_name='client',
+            name='recherche',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREER_TRIGGER, SUPPRIMER_TRIGGER),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['recherche'], name='client_recherche_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nom'], name='client_nom_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
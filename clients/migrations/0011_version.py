@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0010_autocompletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True, help_text='Date et heure de la dernière modification', verbose_name='Date de modification'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Incrémentée à chaque modification du client ou de ses devis', verbose_name='Version'),
+        ),
+    ]
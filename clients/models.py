@@ -1,4 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
@@ -18,6 +22,10 @@ class Client(models.Model):
         notes (str): Notes additionnelles sur le client (optionnelles)
         date_creation (DateTimeField): Date et heure d'ajout du client
         cree_par (ForeignKey): Utilisateur ayant créé le client
+        version (int): Version de la fiche du client, incrémentée à chaque
+                       modification du client ou de l'un de ses devis
+        date_modification (DateTimeField): Date et heure de la dernière modification
+        recherche (SearchVectorField): Vecteur de recherche plein texte
     """
     
     # Champs obligatoires
@@ -64,6 +72,24 @@ class Client(models.Model):
         help_text="Utilisateur ayant créé le client"
     )
     
+    # Version de la fiche du client, pour les requêtes conditionnelles et le
+    # cache des fragments (voir generateur_de_devis/conditionnel.py)
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="Version",
+        help_text="Incrémentée à chaque modification du client ou de ses devis"
+    )
+    date_modification = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de modification",
+        help_text="Date et heure de la dernière modification"
+    )
+    
+    # Vecteur de recherche (nom, email, téléphone, adresse), calculé par un
+    # trigger PostgreSQL à chaque écriture (voir devis/recherche.py)
+    recherche = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         """Métadonnées du modèle"""
         verbose_name = "Client"
@@ -72,12 +98,30 @@ class Client(models.Model):
         indexes = [
             models.Index(fields=['nom']),
             models.Index(fields=['email']),
+            # Autocomplétion par préfixe du nom (nom__istartswith)
+            models.Index(OpClass(Upper('nom'), name='text_pattern_ops'), name='client_nom_prefixe'),
+            # Recherche plein texte et recherche approchée (pg_trgm)
+            GinIndex(fields=['recherche'], name='client_recherche_gin'),
+            GinIndex(fields=['nom'], name='client_nom_trgm', opclasses=['gin_trgm_ops']),
         ]
     
     def __str__(self):
         """Représentation textuelle du client"""
         return self.nom
     
+    @classmethod
+    def marquer_modifies(cls, pks):
+        """
+        Incrémente la version des clients donnés, dont la fiche affiche des
+        données modifiées ailleurs (devis, statistiques).
+        """
+        pks = {pk for pk in pks if pk is not None}
+        if pks:
+            cls.objects.filter(pk__in=pks).update(
+                version=models.F('version') + 1,
+                date_modification=timezone.now(),
+            )
+    
     def get_absolute_url(self):
         """
         Retourne l'URL pour accéder aux détails du client.
@@ -85,45 +129,73 @@ class Client(models.Model):
         """
         return reverse('clients:client_detail', args=[str(self.id)])
     
+    @property
+    def statistiques_devis(self):
+        """
+        Retourne les statistiques de devis du client.
+        Les statistiques sont tenues à jour par l'application devis ; un client
+        sans devis n'en possède pas encore et obtient des compteurs à zéro.
+        """
+        if not hasattr(self, '_statistiques_devis'):
+            try:
+                self._statistiques_devis = self.statistiques
+            except ObjectDoesNotExist:
+                from devis.models import StatistiquesClient
+                self._statistiques_devis = StatistiquesClient(client=self)
+        return self._statistiques_devis
+    
     @property
     def nombre_devis(self):
         """
         Retourne le nombre total de devis associés à ce client.
-        Propriété calculée à la volée.
+        Lu depuis les statistiques dénormalisées.
         """
-        return self.devis.count()
+        return self.statistiques_devis.nombre_devis
     
     @property
     def devis_actifs(self):
         """
         Retourne le nombre de devis en cours (brouillon ou envoyé).
-        Propriété calculée à la volée.
+        Lu depuis les statistiques dénormalisées.
         """
-        return self.devis.filter(statut__in=['brouillon', 'envoye']).count()
+        statistiques = self.statistiques_devis
+        return statistiques.nb_brouillon + statistiques.nb_envoye
     
     @property
     def devis_acceptes(self):
         """
         Retourne le nombre de devis acceptés.
-        Propriété calculée à la volée.
+        Lu depuis les statistiques dénormalisées.
         """
-        return self.devis.filter(statut='accepte').count()
+        return self.statistiques_devis.nb_accepte
     
     @property
     def montant_total_devis(self):
         """
-        Retourne le montant total des devis acceptés.
-        Propriété calculée à la volée.
+        Retourne le montant total TTC des devis acceptés.
+        Lu depuis les statistiques dénormalisées.
         """
-        return sum(devis.montant_ttc for devis in self.devis.filter(statut='accepte'))
+        return self.statistiques_devis.montant_accepte_ttc
     
     def save(self, *args, **kwargs):
         """
         Surcharge de la méthode save pour ajouter des validations
-        ou des traitements supplémentaires si nécessaire.
+        ou des traitements supplémentaires si nécessaire, et incrémenter
+        la version du client à chaque modification.
         """
         # Validation supplémentaire si nécessaire
         if not self.nom:
             raise ValueError("Le nom du client est obligatoire")
         
+        modification = not self._state.adding
+        if modification:
+            # Incrément réalisé par la base : deux enregistrements simultanés
+            # ne peuvent pas écrire la même version
+            self.version = models.F('version') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version', 'date_modification'}
+        
         super().save(*args, **kwargs)
+        if modification:
+            self.refresh_from_db(fields=['version'])
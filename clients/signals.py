@@ -1,42 +1,36 @@
 # clients/signals.py
-import csv
-import os
 import logging
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import Client
-from django.conf import settings
+from .cache import invalider_clients
+from .journal import get_journal
 
 logger = logging.getLogger(__name__)
 
 @receiver(post_save, sender=Client)
 def enregistrer_client_csv(sender, instance, created, **kwargs):
+    """
+    Ajoute le client créé au journal CSV des clients, après validation de
+    la transaction. L'écriture du fichier est faite en arrière-plan
+    (voir clients/journal.py).
+    """
     if created:
-        try:
-            # Chemin du fichier CSV (configurable via settings)
-            file_path = getattr(settings, 'CLIENTS_CSV_PATH', 
-                              os.path.join(settings.BASE_DIR, 'clients_data.csv'))
+        # Vérifie si les données sont valides
+        if not instance.nom or not instance.email:
+            logger.warning(f"Données client invalides: nom={instance.nom}, email={instance.email}")
+            return
 
-            # Vérifie si le fichier existe
-            file_exists = os.path.isfile(file_path)
+        nom, email = instance.nom, instance.email
+        transaction.on_commit(lambda: get_journal().ajouter(nom, email))
 
-            # Vérifie si les données sont valides
-            if not instance.nom or not instance.email:
-                logger.warning(f"Données client invalides: nom={instance.nom}, email={instance.email}")
-                return
-
-            # Ouvre le fichier en mode ajout
-            with open(file_path, mode='a', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                # Écrit l'en-tête si le fichier est nouveau
-                if not file_exists:
-                    writer.writerow(['Nom', 'Email'])
-
-                # Écrit les données du nouveau client
-                writer.writerow([instance.nom, instance.email])
-                
-            logger.info(f"Client {instance.nom} enregistré avec succès dans le fichier CSV")
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de l'enregistrement du client dans le CSV: {str(e)}")
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def invalider_cache_clients(sender, instance, **kwargs):
+    """
+    Invalide la liste des clients mise en cache à chaque modification, dans
+    la transaction de la modification : la nouvelle version (et l'ETag des
+    pages de liste) devient visible en même temps que les données.
+    """
+    invalider_clients()
@@ -0,0 +1,49 @@
+"""
+Tests du cache des pages d'autocomplétion des clients.
+"""
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from clients.cache import _page_autocompletion, autocompletion_clients
+from clients.models import Client
+from devis.cache import incrementer_version
+
+
+class AutocompletionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Client.objects.bulk_create([
+            Client(nom=f"Dupont {i}", email=f"dupont{i}@exemple.test", téléphone="0000000000")
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        _page_autocompletion.cache_clear()
+
+    def noms(self, prefixe):
+        clients, _ = autocompletion_clients(prefixe)
+        return [nom for _, nom, _ in clients]
+
+    def test_page_servie_depuis_le_cache_du_processus(self):
+        self.noms('dup')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.noms('dup'), ["Dupont 0", "Dupont 1", "Dupont 2"])
+
+    def test_modification_par_un_autre_processus(self):
+        self.assertEqual(len(self.noms('dup')), 3)
+        # Écritures d'un autre processus : aucun signal dans ce processus,
+        # seule la version partagée en base change
+        Client.objects.filter(nom="Dupont 1").update(nom="Martin")
+        incrementer_version('clients')
+        self.assertEqual(self.noms('dup'), ["Dupont 0", "Dupont 2"])
+
+    def test_page_hors_limites(self):
+        self.client.force_login(User.objects.create_user('lecteur'))
+        url = reverse('clients:client_autocompletion')
+        with self.assertNumQueries(2):  # session et utilisateur
+            reponse = self.client.get(url, {'q': 'dup', 'page': '9' * 30})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.json()['resultats'], [])
+        self.assertFalse(reponse.json()['suivante'])
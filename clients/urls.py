@@ -26,6 +26,8 @@ urlpatterns = [
     path('<int:pk>/modifier/', views.client_update, name='client_update'),
     # Suppression d'un client
     path('<int:pk>/supprimer/', views.client_delete, name='client_delete'),
+    # Recherche par le début du nom, pour les sélecteurs de client (JSON paginé)
+    path('autocompletion/', views.client_autocompletion, name='client_autocompletion'),
     
     # Export des clients
     # Export de la liste des clients au format CSV
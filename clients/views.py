@@ -11,13 +11,24 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import logout
+from django.http import JsonResponse
+from django.urls import reverse
+from .cache import VERSION_CLIENTS, autocompletion_clients
 from .models import Client
+from devis.cache import VERSION_DEVIS, lire_versions
 from devis.models import Devis
+from devis.statistiques import TAUX_TTC
 from django.core.paginator import Paginator
 from django.contrib.auth.forms import UserCreationForm
-from django.http import HttpResponse
-import csv
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Round
+from generateur_de_devis.conditionnel import page_conditionnelle
+from generateur_de_devis.csv_streaming import reponse_csv
 from datetime import datetime
+from decimal import Decimal
+
+# Nombre de lignes lues par aller-retour avec la base lors des exports
+TAILLE_MORCEAU_EXPORT = 2000
 
 @login_required
 def home_client(request):
@@ -35,13 +46,23 @@ def home_client(request):
     """
     return render(request, 'clients/index.html')
 
+def _estampille_liste(request):
+    """Versions des données affichées par la liste des clients (clients et statistiques de devis)."""
+    return lire_versions(VERSION_CLIENTS, VERSION_DEVIS)
+
+def _estampille_client(request, pk):
+    """Versions des données affichées par la fiche d'un client, ou None s'il n'existe pas."""
+    return Client.objects.filter(pk=pk).values_list('version', 'date_modification').first()
+
 @login_required
+@page_conditionnelle(_estampille_liste)
 def client_list(request):
     """
     Vue pour afficher la liste de tous les clients.
     
     Cette vue gère l'affichage paginé de tous les clients dans le système.
-    Les clients sont triés par nom et affichés 10 par page.
+    Les clients sont triés par nom et affichés 10 par page. Les statistiques
+    de devis sont chargées dans la même requête.
     
     Args:
         request: La requête HTTP
@@ -49,19 +70,25 @@ def client_list(request):
     Returns:
         HttpResponse: La page HTML avec la liste paginée des clients
     """
-    clients = Client.objects.all().order_by('nom')
+    clients = Client.objects.select_related('statistiques').order_by('nom')
     paginator = Paginator(clients, 10)  # 10 clients par page
     page = request.GET.get('page')
     clients = paginator.get_page(page)
     return render(request, 'clients/client_list.html', {'clients': clients})
 
 @login_required
+@page_conditionnelle(_estampille_client)
 def client_detail(request, pk):
     """
     Vue pour afficher les détails d'un client spécifique.
     
     Cette vue affiche toutes les informations d'un client, y compris
-    son historique de devis et des statistiques sur ses devis.
+    son historique de devis et des statistiques sur ses devis, lues
+    depuis les statistiques dénormalisées du client.
+    
+    Une page inchangée depuis la dernière visite est servie par une réponse
+    304. Les statistiques et la liste des devis sont mises en cache par
+    version du client : elles ne sont lues que si elles doivent être rendues.
     
     Args:
         request: La requête HTTP
@@ -71,12 +98,48 @@ def client_detail(request, pk):
         HttpResponse: La page HTML avec les détails du client
     """
     client = get_object_or_404(Client, pk=pk)
+    # QuerySet paresseux : évalué uniquement hors du cache du fragment
     devis = Devis.objects.filter(client=client).order_by('-date_creation')
     return render(request, 'clients/client_detail.html', {
         'client': client,
         'devis': devis
     })
 
+@login_required
+def client_autocompletion(request):
+    """
+    Recherche de clients par le début de leur nom, pour les sélecteurs de client.
+    
+    Les clients sont triés par nom et paginés ; seules les correspondances
+    de la page demandée sont chargées (voir clients/cache.py).
+    
+    Args:
+        request: La requête HTTP (paramètres q : le début du nom, page : le numéro de page)
+        
+    Returns:
+        JsonResponse: {'resultats': [{id, nom, email, url}], 'page': n, 'suivante': bool}
+    """
+    prefixe = request.GET.get('q', '')[:Client._meta.get_field('nom').max_length]
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    
+    clients, suivante = autocompletion_clients(prefixe, page)
+    return JsonResponse({
+        'resultats': [
+            {
+                'id': pk,
+                'nom': nom,
+                'email': email,
+                'url': reverse('clients:client_detail', args=[pk]),
+            }
+            for pk, nom, email in clients
+        ],
+        'page': page,
+        'suivante': suivante,
+    })
+
 @login_required
 def client_create(request):
     """
@@ -185,40 +248,51 @@ def client_export_csv(request):
     Exporte la liste des clients en format CSV.
     
     Cette vue génère un fichier CSV contenant toutes les informations
-    des clients, y compris leurs statistiques de devis.
+    des clients, y compris leurs statistiques de devis. Les statistiques
+    sont calculées par une seule requête agrégée, lue par morceaux, et le
+    fichier est diffusé au fil de l'eau.
     
     Args:
         request: La requête HTTP
         
     Returns:
-        HttpResponse: Le fichier CSV généré avec les en-têtes appropriés
+        StreamingHttpResponse: Le fichier CSV généré avec les en-têtes appropriés
     """
-    # Configuration de la réponse HTTP
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="clients_{datetime.now().strftime("%Y%m%d")}.csv"'
-    
-    writer = csv.writer(response)
-    # En-têtes du CSV
-    writer.writerow([
-        'Nom', 'Email', 'Téléphone', 'Adresse',
-        'Nombre total de devis', 'Devis acceptés',
-        'Montant total des devis acceptés'
-    ])
+    accepte = Q(devis__statut='accepte')
+    clients = (
+        Client.objects.order_by('nom')
+        .annotate(
+            nb_devis=Count('devis'),
+            nb_devis_acceptes=Count('devis', filter=accepte),
+            # Le TTC est arrondi devis par devis, comme dans les statistiques clients
+            montant_accepte_ttc=Sum(
+                Round(F('devis__montant_ht') * TAUX_TTC, precision=2),
+                filter=accepte,
+                default=Decimal('0'),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        .values_list(
+            'nom', 'email', 'téléphone', 'adresse',
+            'nb_devis', 'nb_devis_acceptes', 'montant_accepte_ttc'
+        )
+    )
     
-    # Écriture des données des clients
-    clients = Client.objects.all().order_by('nom')
-    for client in clients:
-        writer.writerow([
-            client.nom,
-            client.email,
-            client.telephone,
-            client.adresse,
-            client.nombre_devis(),
-            client.nombre_devis_acceptes(),
-            f"{client.montant_total_devis_acceptes():.2f} €"
-        ])
+    lignes = (
+        [nom, email, telephone, adresse, nb_devis, nb_devis_acceptes, f"{montant:.2f} €"]
+        for nom, email, telephone, adresse, nb_devis, nb_devis_acceptes, montant
+        in clients.iterator(chunk_size=TAILLE_MORCEAU_EXPORT)
+    )
     
-    return response
+    return reponse_csv(
+        f'clients_{datetime.now().strftime("%Y%m%d")}.csv',
+        [
+            'Nom', 'Email', 'Téléphone', 'Adresse',
+            'Nombre total de devis', 'Devis acceptés',
+            'Montant total des devis acceptés'
+        ],
+        lignes,
+    )
 
 def register(request):
     """
@@ -0,0 +1,169 @@
+"""
+Analyses des devis : chiffre d'affaires, taux d'acceptation et montant moyen.
+
+Les analyses ne lisent que les agrégats mensuels (AgregatMensuel, vue
+matérialisée devis_agregats_mensuels), jamais la table des devis : leur coût
+dépend du nombre de mois, de clients et d'utilisateurs, pas du nombre de
+devis. Les chiffres datent du dernier rafraîchissement des agrégats
+(commande rafraichir_agregats, à planifier par exemple toutes les heures).
+
+Indicateurs, pour chaque regroupement (mois, client ou créateur) :
+- chiffre d'affaires : montant des devis acceptés ;
+- taux d'acceptation : devis acceptés parmi les devis acceptés ou refusés ;
+- montant moyen : montant HT moyen de l'ensemble des devis.
+"""
+
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .models import AgregatMensuel
+from .statistiques import TAUX_TTC
+
+# Colonnes lues, noms affichés et ordre des résultats de chaque regroupement
+REGROUPEMENTS = {
+    'mois': (['mois'], {}, ['mois']),
+    'client': (['client_id'], {'nom': F('client__nom')}, ['-chiffre_affaires_ht', 'nom']),
+    'utilisateur': (['cree_par_id'], {'nom': F('cree_par__username')}, ['-chiffre_affaires_ht', 'nom']),
+}
+
+# Période analysée par défaut, en mois (mois en cours compris)
+MOIS_PAR_DEFAUT = 12
+
+# Nombre maximal de lignes retournées par défaut pour les regroupements par client ou créateur
+LIMITE_PAR_DEFAUT = 20
+
+CENTIMES = Decimal('0.01')
+
+
+def rafraichir_agregats(concurrent=True):
+    """
+    Recalcule la vue matérialisée des agrégats mensuels et y note la date du
+    rafraîchissement (commentaire de la vue, lisible par tous les processus).
+
+    Args:
+        concurrent: Rafraîchit sans bloquer les lectures (plus lent)
+    """
+    table = connection.ops.quote_name(AgregatMensuel._meta.db_table)
+    with transaction.atomic(), connection.cursor() as curseur:
+        curseur.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrent else ''}{table}")
+        # Date produite ici, au format ISO : aucun échappement nécessaire
+        curseur.execute(f"COMMENT ON MATERIALIZED VIEW {table} IS '{timezone.now().isoformat()}'")
+
+
+def date_rafraichissement():
+    """Retourne la date du dernier rafraîchissement des agrégats, ou None si elle est inconnue."""
+    with connection.cursor() as curseur:
+        curseur.execute("SELECT obj_description(%s::regclass, 'pg_class')", [AgregatMensuel._meta.db_table])
+        commentaire = curseur.fetchone()[0]
+    try:
+        return datetime.fromisoformat(commentaire)
+    except (TypeError, ValueError):
+        return None
+
+
+def _lire_mois(valeur):
+    """Lit un mois au format AAAA-MM ; retourne son premier jour, ou None s'il est invalide."""
+    try:
+        return datetime.strptime(valeur or '', '%Y-%m').date()
+    except ValueError:
+        return None
+
+
+def lire_parametres(parametres):
+    """
+    Lit et valide les paramètres d'une analyse.
+
+    Les valeurs invalides sont ignorées. Sans mois de début ni de fin, la
+    période analysée couvre les MOIS_PAR_DEFAUT derniers mois.
+
+    Args:
+        parametres: Les paramètres GET de la requête (debut, fin au format
+                    AAAA-MM ; client, utilisateur : identifiants)
+
+    Returns:
+        dict: Les arguments de analyser() (debut, fin, client, utilisateur)
+    """
+    lus = {'debut': _lire_mois(parametres.get('debut')), 'fin': _lire_mois(parametres.get('fin'))}
+    if lus['debut'] is None and lus['fin'] is None:
+        mois = timezone.localdate().replace(day=1)
+        annee, rang = divmod(mois.year * 12 + mois.month - MOIS_PAR_DEFAUT, 12)
+        lus['debut'] = mois.replace(year=annee, month=rang + 1)
+    for nom in ('client', 'utilisateur'):
+        valeur = parametres.get(nom, '')
+        lus[nom] = int(valeur) if valeur.isdigit() else None
+    return lus
+
+
+def analyser(regroupement, debut=None, fin=None, client=None, utilisateur=None, limite=None):
+    """
+    Calcule les indicateurs des devis, regroupés par mois, client ou créateur.
+
+    Args:
+        regroupement: 'mois', 'client' ou 'utilisateur'
+        debut: Premier mois inclus (date, optionnel)
+        fin: Dernier mois inclus (date, optionnel)
+        client: Limite l'analyse aux devis de ce client (identifiant, optionnel)
+        utilisateur: Limite l'analyse aux devis créés par cet utilisateur (identifiant, optionnel)
+        limite: Nombre maximal de lignes (défaut : toutes pour les mois,
+                LIMITE_PAR_DEFAUT sinon)
+
+    Returns:
+        list: Un dictionnaire d'indicateurs par ligne
+    """
+    colonnes, noms, ordre = REGROUPEMENTS[regroupement]
+    agregats = AgregatMensuel.objects.all()
+    if debut:
+        agregats = agregats.filter(mois__gte=debut.replace(day=1))
+    if fin:
+        agregats = agregats.filter(mois__lte=fin)
+    if client:
+        agregats = agregats.filter(client_id=client)
+    if utilisateur:
+        agregats = agregats.filter(cree_par_id=utilisateur)
+
+    lignes = (
+        agregats.values(*colonnes, **noms)
+        .annotate(
+            nombre_devis=Sum('nombre'),
+            acceptes=Sum('nombre', filter=Q(statut='accepte'), default=0),
+            refuses=Sum('nombre', filter=Q(statut='refuse'), default=0),
+            montant_total_ht=Sum('montant_ht'),
+            chiffre_affaires_ht=Sum('montant_ht', filter=Q(statut='accepte'), default=Decimal('0')),
+        )
+        .order_by(*ordre)
+    )
+    if limite is None and regroupement != 'mois':
+        limite = LIMITE_PAR_DEFAUT
+    if limite:
+        lignes = lignes[:limite]
+    return [_indicateurs(ligne) for ligne in lignes]
+
+
+def _indicateurs(ligne):
+    """Complète une ligne d'agrégats par les indicateurs calculés."""
+    decides = ligne['acceptes'] + ligne['refuses']
+    ligne['chiffre_affaires_ttc'] = (ligne['chiffre_affaires_ht'] * TAUX_TTC).quantize(CENTIMES, ROUND_HALF_UP)
+    ligne['taux_acceptation'] = round(ligne['acceptes'] / decides * 100, 1) if decides else None
+    ligne['montant_moyen_ht'] = (
+        (ligne['montant_total_ht'] / ligne['nombre_devis']).quantize(CENTIMES, ROUND_HALF_UP)
+        if ligne['nombre_devis'] else None
+    )
+    return ligne
+
+
+def totaux(lignes):
+    """
+    Calcule les indicateurs de l'ensemble des lignes d'une analyse.
+
+    Returns:
+        dict: Les indicateurs, calculés sur la somme des lignes
+    """
+    total = {champ: sum(ligne[champ] for ligne in lignes) for champ in ('nombre_devis', 'acceptes', 'refuses')}
+    for champ in ('montant_total_ht', 'chiffre_affaires_ht'):
+        total[champ] = sum((ligne[champ] for ligne in lignes), Decimal('0'))
+    return _indicateurs(total)
+
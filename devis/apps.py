@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DevisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'devis'
+
+    def ready(self):
+        import devis.signals  # ← Active les signaux (statistiques clients)
@@ -0,0 +1,86 @@
+"""
+Version des listes de devis.
+
+Les listes de devis (et la liste des clients, qui affiche leurs statistiques)
+sont servies avec un ETag calculé à partir de versions conservées en base
+(modèle VersionListe). Toute création, modification ou suppression d'un
+devis incrémente la version des devis (voir devis/signals.py), ce qui change
+l'ETag de toutes les pages de liste, dans tous les processus web.
+
+Les versions ne sont pas conservées dans le cache Django : avec un cache
+propre à chaque processus (LocMemCache), l'incrément d'un processus serait
+invisible des autres, qui serviraient des ETag et des fragments périmés.
+Les fragments eux-mêmes peuvent rester dans un cache local : leurs clés
+contiennent la version lue en base.
+
+La version est incrémentée dans la transaction de l'écriture qui la rend
+obsolète : un ETag calculé avant la validation désigne l'ancienne version,
+qui correspond bien aux données encore visibles. Toutes les écritures de
+devis mettent donc à jour la même ligne, verrouillée jusqu'à la fin de leur
+transaction : les enregistrements simultanés de devis sont sérialisés sur
+cette ligne. Les créations l'étaient déjà par le compteur de numérotation
+du mois, verrouillé lui aussi jusqu'à la fin de la transaction ; les
+transactions concernées (un formulaire de devis) sont courtes et bien moins
+fréquentes que les lectures des listes, qu'elles ne bloquent pas.
+
+Les mises à jour de masse (QuerySet.update(), bulk_create) ne déclenchent
+pas les signaux : appeler invalider_devis() après ce type d'opération.
+"""
+
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+VERSION_DEVIS = 'devis'
+
+
+def lire_versions(*noms):
+    """
+    Retourne les versions courantes des ensembles de données nommés, en une
+    requête.
+
+    Args:
+        noms: Les noms des ensembles de données ('devis', 'clients')
+
+    Returns:
+        tuple: Les versions, dans l'ordre des noms (0 pour une version
+               jamais incrémentée)
+    """
+    from .models import VersionListe
+
+    versions = dict(VersionListe.objects.filter(nom__in=noms).values_list('nom', 'valeur'))
+    return tuple(versions.get(nom, 0) for nom in noms)
+
+
+def incrementer_version(nom):
+    """
+    Incrémente en base la version d'un ensemble de données.
+
+    La version initiale est dérivée de l'horloge, afin qu'une version
+    supprimée puis recréée ne puisse pas réutiliser un ancien ETag.
+    """
+    from .models import VersionListe
+
+    if VersionListe.objects.filter(nom=nom).update(valeur=F('valeur') + 1):
+        return
+    try:
+        with transaction.atomic():
+            VersionListe.objects.create(nom=nom, valeur=time.time_ns())
+    except IntegrityError:
+        # Créée entre-temps par un autre processus
+        VersionListe.objects.filter(nom=nom).update(valeur=F('valeur') + 1)
+
+
+def version_devis():
+    """
+    Retourne la version courante des devis.
+    """
+    return lire_versions(VERSION_DEVIS)[0]
+
+
+def invalider_devis():
+    """
+    Invalide les listes de devis en incrémentant leur version.
+    """
+    incrementer_version(VERSION_DEVIS)
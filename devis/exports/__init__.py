@@ -0,0 +1,30 @@
+"""
+Exports des devis.
+
+Chaque format (PDF, Excel, Word) est rendu par une fonction
+rendre_<format>(devis, lignes) qui retourne le contenu du fichier.
+Le registre FORMATS associe à chaque format sa fonction de rendu,
+son extension, son type MIME et la version de sa mise en page.
+"""
+
+from collections import namedtuple
+
+from .excel import VERSION as VERSION_EXCEL, rendre_excel
+from .pdf import VERSION as VERSION_PDF, rendre_pdf
+from .word import VERSION as VERSION_WORD, rendre_word
+
+FormatExport = namedtuple('FormatExport', ['rendre', 'extension', 'content_type', 'version'])
+
+FORMATS = {
+    'pdf': FormatExport(
+        rendre_pdf, 'pdf', 'application/pdf', VERSION_PDF
+    ),
+    'excel': FormatExport(
+        rendre_excel, 'xlsx',
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', VERSION_EXCEL
+    ),
+    'word': FormatExport(
+        rendre_word, 'docx',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document', VERSION_WORD
+    ),
+}
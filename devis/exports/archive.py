@@ -0,0 +1,172 @@
+"""
+Export groupé de devis dans une archive ZIP.
+
+Les devis sélectionnés sont rendus en parallèle par un pool de processus
+(deux processus par processus web par défaut, voir
+DEVIS_EXPORTS_ZIP_WORKERS) et chaque
+document est ajouté à l'archive dès que son rendu est terminé. L'archive est
+écrite au fil de l'eau dans un tampon non adressable : la réponse HTTP
+commence avant la fin des rendus et la mémoire utilisée reste bornée par le
+nombre de rendus en cours.
+
+Ce module est importé par les processus du pool avant l'initialisation de
+Django : les modèles y sont donc importés localement.
+"""
+
+import logging
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import FORMATS
+from .cache import obtenir_rendu
+from .lignes import charger_lignes
+from .taches import creer_executeur
+
+logger = logging.getLogger(__name__)
+
+# Formats déjà compressés, stockés tels quels dans l'archive
+FORMATS_COMPRESSES = {'excel', 'word'}
+
+# Nombre de processus du pool par défaut. Le pool est propre à chaque
+# processus web : le total est multiplié par le nombre de processus web,
+# d'où une valeur fixe et faible plutôt que le nombre de cœurs
+ZIP_WORKERS_DEFAUT = 2
+
+_executeur = None
+_verrou = threading.Lock()
+
+
+def _nombre_workers():
+    return getattr(settings, 'DEVIS_EXPORTS_ZIP_WORKERS', None) or ZIP_WORKERS_DEFAUT
+
+
+def get_executeur():
+    """
+    Retourne le pool de processus des exports groupés, créé au premier appel.
+    """
+    global _executeur
+    with _verrou:
+        if _executeur is None:
+            _executeur = creer_executeur(_nombre_workers())
+        return _executeur
+
+
+def _reinitialiser_executeur(executeur):
+    """Abandonne un pool devenu inutilisable (processus tué)."""
+    global _executeur
+    with _verrou:
+        if _executeur is executeur:
+            _executeur = None
+
+
+def rendre_devis(devis_id, format_export):
+    """
+    Rend un devis dans un processus du pool.
+
+    Args:
+        devis_id: L'identifiant du devis à rendre
+        format_export: Le format d'export ('pdf', 'excel', 'word')
+
+    Returns:
+        tuple: (nom du fichier dans l'archive, contenu du document)
+    """
+    from ..models import Devis
+
+    close_old_connections()
+    try:
+        devis = Devis.objects.select_related('client').get(pk=devis_id)
+        contenu = obtenir_rendu(devis, charger_lignes(devis), format_export)
+    finally:
+        close_old_connections()
+    nom = f'devis_{devis.numero or devis.pk}.{FORMATS[format_export].extension}'
+    return nom, contenu
+
+
+class _TamponFlux:
+    """
+    Flux en écriture seule, non adressable, dont le contenu est vidé après
+    chaque document : zipfile écrit alors l'archive en mode flux
+    (descripteurs de données après chaque fichier).
+    """
+
+    def __init__(self):
+        self._morceaux = []
+
+    def write(self, donnees):
+        self._morceaux.append(bytes(donnees))
+        return len(donnees)
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        donnees = b''.join(self._morceaux)
+        self._morceaux.clear()
+        return donnees
+
+
+def generer_zip(devis_ids, format_export):
+    """
+    Génère une archive ZIP des devis, morceau par morceau.
+
+    Au plus deux rendus par processus du pool sont soumis à la fois ; les
+    documents sont ajoutés dans l'ordre de fin de rendu. Les devis dont le
+    rendu échoue sont listés dans un fichier erreurs.txt en fin d'archive.
+
+    Args:
+        devis_ids: Les identifiants des devis à exporter (itérable)
+        format_export: Le format d'export ('pdf', 'excel', 'word')
+
+    Yields:
+        bytes: Les morceaux successifs de l'archive
+    """
+    compression = zipfile.ZIP_STORED if format_export in FORMATS_COMPRESSES else zipfile.ZIP_DEFLATED
+    maximum_en_cours = 2 * _nombre_workers()
+    executeur = get_executeur()
+    tampon = _TamponFlux()
+    erreurs = []
+    en_cours = {}
+    devis_ids = iter(devis_ids)
+
+    try:
+        with zipfile.ZipFile(tampon, mode='w', compression=compression) as archive:
+            while True:
+                for devis_id in devis_ids:
+                    try:
+                        future = executeur.submit(rendre_devis, devis_id, format_export)
+                    except BrokenProcessPool:
+                        _reinitialiser_executeur(executeur)
+                        raise
+                    en_cours[future] = devis_id
+                    if len(en_cours) >= maximum_en_cours:
+                        break
+                if not en_cours:
+                    break
+
+                terminees, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+                for future in terminees:
+                    devis_id = en_cours.pop(future)
+                    try:
+                        nom, contenu = future.result()
+                    except BrokenProcessPool:
+                        _reinitialiser_executeur(executeur)
+                        raise
+                    except Exception as e:
+                        logger.exception(f"Échec du rendu du devis {devis_id}")
+                        erreurs.append(f"Devis {devis_id} : {str(e)}")
+                        continue
+                    archive.writestr(nom, contenu)
+                    yield tampon.vider()
+
+            if erreurs:
+                archive.writestr('erreurs.txt', '\n'.join(erreurs) + '\n')
+        yield tampon.vider()
+    finally:
+        # Client déconnecté ou erreur : les rendus non commencés sont annulés
+        for future in en_cours:
+            future.cancel()
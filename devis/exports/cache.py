@@ -0,0 +1,166 @@
+"""
+Cache des documents exportés.
+
+Un document exporté ne dépend que du contenu du devis (en-tête, client,
+lignes) et de la version de la mise en page. Son empreinte SHA-256 sert à la
+fois de clé de cache et d'ETag : un devis inchangé est servi depuis le
+disque sans nouveau rendu, ou par une réponse 304 si le navigateur possède
+déjà le fichier.
+
+Les documents sont stockés dans DEVIS_EXPORTS_CACHE['DOSSIER']. La taille
+totale est limitée à DEVIS_EXPORTS_CACHE['TAILLE_MAX'] octets ; au-delà,
+les documents les moins récemment lus sont supprimés (LRU, d'après la date
+de modification des fichiers, mise à jour à chaque lecture).
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+
+from . import FORMATS
+
+logger = logging.getLogger(__name__)
+
+# Taille maximale par défaut du cache (200 Mo)
+TAILLE_MAX_DEFAUT = 200 * 1024 * 1024
+
+
+def empreinte(devis, lignes, format_export):
+    """
+    Calcule l'empreinte du document exporté d'un devis.
+
+    Toutes les données affichées dans le document entrent dans l'empreinte,
+    ainsi que le format et la version de sa mise en page.
+
+    Args:
+        devis: Le devis exporté
+        lignes: Les lignes du devis
+        format_export: Le format d'export ('pdf', 'excel', 'word')
+
+    Returns:
+        str: L'empreinte hexadécimale
+    """
+    h = hashlib.sha256()
+    elements = [
+        format_export,
+        FORMATS[format_export].version,
+        devis.numero,
+        devis.date_creation.isoformat(),
+        devis.montant_ht,
+        devis.client.nom,
+        devis.client.adresse,
+    ]
+    h.update(repr(elements).encode())
+    for ligne in lignes:
+        h.update(repr((ligne.description, ligne.quantite, ligne.prix_unitaire, ligne.montant)).encode())
+    return h.hexdigest()
+
+
+class CacheRendus:
+    """
+    Stockage sur disque des documents rendus, avec éviction LRU.
+
+    Les écritures passent par un fichier temporaire renommé atomiquement :
+    plusieurs processus peuvent partager le même dossier.
+    """
+
+    def __init__(self, dossier, taille_max=TAILLE_MAX_DEFAUT):
+        self.dossier = str(dossier)
+        self.taille_max = taille_max
+
+    def _chemin(self, cle):
+        return os.path.join(self.dossier, cle)
+
+    def lire(self, cle):
+        """Retourne le document en cache, ou None s'il est absent."""
+        chemin = self._chemin(cle)
+        try:
+            with open(chemin, 'rb') as fichier:
+                contenu = fichier.read()
+            # Marque le document comme récemment utilisé
+            os.utime(chemin)
+        except FileNotFoundError:
+            return None
+        return contenu
+
+    def ecrire(self, cle, contenu):
+        """Enregistre un document puis applique la limite de taille."""
+        os.makedirs(self.dossier, exist_ok=True)
+        descripteur, temporaire = tempfile.mkstemp(dir=self.dossier, prefix='.tmp-')
+        try:
+            with os.fdopen(descripteur, 'wb') as fichier:
+                fichier.write(contenu)
+            os.replace(temporaire, self._chemin(cle))
+        except BaseException:
+            os.unlink(temporaire)
+            raise
+        self._evincer()
+
+    def _evincer(self):
+        """Supprime les documents les moins récemment utilisés au-delà de la taille maximale."""
+        documents = []
+        total = 0
+        with os.scandir(self.dossier) as entrees:
+            for entree in entrees:
+                if entree.name.startswith('.tmp-') or not entree.is_file():
+                    continue
+                try:
+                    infos = entree.stat()
+                except FileNotFoundError:
+                    continue
+                documents.append((infos.st_mtime, infos.st_size, entree.path))
+                total += infos.st_size
+
+        if total <= self.taille_max:
+            return
+        for _, taille, chemin in sorted(documents):
+            try:
+                os.unlink(chemin)
+            except FileNotFoundError:
+                pass
+            total -= taille
+            if total <= self.taille_max:
+                break
+
+
+@lru_cache(maxsize=None)
+def _creer_cache(dossier, taille_max):
+    return CacheRendus(dossier, taille_max)
+
+
+def get_cache():
+    """
+    Retourne le cache des documents configuré dans les paramètres.
+    """
+    configuration = getattr(settings, 'DEVIS_EXPORTS_CACHE', {})
+    dossier = configuration.get('DOSSIER', os.path.join(settings.MEDIA_ROOT, 'cache_exports'))
+    return _creer_cache(str(dossier), configuration.get('TAILLE_MAX', TAILLE_MAX_DEFAUT))
+
+
+def obtenir_rendu(devis, lignes, format_export, cle=None):
+    """
+    Retourne le document exporté d'un devis, depuis le cache si possible.
+
+    Args:
+        devis: Le devis à exporter
+        lignes: Les lignes du devis
+        format_export: Le format d'export ('pdf', 'excel', 'word')
+        cle: L'empreinte du document, si elle a déjà été calculée
+
+    Returns:
+        bytes: Le contenu du document
+    """
+    cle = cle or empreinte(devis, lignes, format_export)
+    cache = get_cache()
+    contenu = cache.lire(cle)
+    if contenu is None:
+        contenu = FORMATS[format_export].rendre(devis, lignes)
+        try:
+            cache.ecrire(cle, contenu)
+        except OSError as e:
+            logger.error(f"Impossible d'enregistrer l'export {cle} en cache: {str(e)}")
+    return contenu
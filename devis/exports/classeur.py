@@ -0,0 +1,112 @@
+"""
+Classeur Excel regroupant les devis d'une période.
+
+Deux dispositions sont proposées :
+- « plat » : une seule feuille, une ligne par ligne de devis, précédée du
+  numéro, de la date, du client et du statut du devis ;
+- « feuilles » : une feuille par devis, présentée comme l'export Excel
+  d'un devis seul.
+
+Le classeur est écrit en mode write-only. Les devis sont lus par morceaux
+avec leurs lignes (une requête pour les devis et une pour leurs lignes par
+morceau, voir devis_avec_lignes()), de sorte que la mémoire utilisée ne
+dépend pas du nombre de devis exportés.
+"""
+
+from io import BytesIO
+
+import openpyxl
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from ..models import LigneDevis
+from .excel import ENTETE_LIGNES, ajouter_styles, cellule_stylee, ecrire_feuille
+
+# Nombre de devis lus par requête
+TAILLE_MORCEAU_DEVIS = 500
+
+DISPOSITIONS = {
+    'plat': "Une ligne par ligne de devis",
+    'feuilles': "Une feuille par devis",
+}
+
+# Colonnes de la disposition « plat » et leur largeur
+COLONNES_PLAT = [
+    ('Numéro', 18),
+    ('Date', 12),
+    ('Client', 30),
+    ('Statut', 12),
+    (ENTETE_LIGNES[0], 50),
+    (ENTETE_LIGNES[1], 10),
+    (ENTETE_LIGNES[2], 15),
+    (ENTETE_LIGNES[3], 15),
+]
+
+
+def devis_avec_lignes(queryset):
+    """
+    Parcourt des devis avec leur client et leurs lignes, par morceaux.
+
+    Args:
+        queryset: Les devis à parcourir (filtres déjà appliqués)
+
+    Yields:
+        tuple: (devis, lignes du devis)
+    """
+    devis = (
+        queryset.select_related('client')
+        .prefetch_related(Prefetch('lignes', queryset=LigneDevis.objects.order_by('id')))
+        .order_by('date_creation', 'id')
+    )
+    for un_devis in devis.iterator(chunk_size=TAILLE_MORCEAU_DEVIS):
+        yield un_devis, un_devis.lignes.all()
+
+
+def _ecrire_plat(wb, devis_et_lignes):
+    """Écrit la feuille unique de la disposition « plat »."""
+    ws = wb.create_sheet("Lignes de devis")
+    for lettre, (_, largeur) in zip('ABCDEFGH', COLONNES_PLAT):
+        ws.column_dimensions[lettre].width = largeur
+    ws.freeze_panes = 'A2'
+    ws.append([cellule_stylee(ws, titre, 'devis_entete') for titre, _ in COLONNES_PLAT])
+
+    # Cellules stylées réutilisées pour toutes les lignes (écrites dès l'ajout)
+    date = cellule_stylee(ws, None, 'devis_date')
+    prix = cellule_stylee(ws, None, 'devis_montant')
+    montant = cellule_stylee(ws, None, 'devis_montant')
+    for devis, lignes in devis_et_lignes:
+        date.value = timezone.localtime(devis.date_creation).date()
+        debut = [devis.numero, date, devis.client.nom, devis.get_statut_display()]
+        for ligne in lignes:
+            prix.value = ligne.prix_unitaire
+            montant.value = ligne.montant
+            ws.append(debut + [ligne.description, ligne.quantite, prix, montant])
+
+
+def rendre_classeur(devis_et_lignes, disposition='plat'):
+    """
+    Génère un classeur Excel regroupant plusieurs devis.
+
+    Args:
+        devis_et_lignes: Les devis et leurs lignes, par couples (devis, lignes),
+                         par exemple produits par devis_avec_lignes()
+        disposition: 'plat' ou 'feuilles' (voir DISPOSITIONS)
+
+    Returns:
+        bytes: Le contenu du fichier Excel
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ajouter_styles(wb)
+
+    if disposition == 'feuilles':
+        for devis, lignes in devis_et_lignes:
+            ecrire_feuille(wb, devis, lignes)
+        # Un classeur doit contenir au moins une feuille
+        if not wb.worksheets:
+            wb.create_sheet("Aucun devis")
+    else:
+        _ecrire_plat(wb, devis_et_lignes)
+
+    tampon = BytesIO()
+    wb.save(tampon)
+    return tampon.getvalue()
@@ -0,0 +1,178 @@
+"""
+Rendu Excel des devis avec openpyxl.
+
+Le classeur est écrit en mode « write-only » : chaque ligne est sérialisée
+dès son ajout au lieu d'être conservée en mémoire sous forme de cellules.
+Les montants sont de vraies valeurs numériques, affichées en euros par le
+style nommé « devis_montant ».
+
+En mode write-only, la largeur des colonnes doit être connue avant la
+première ligne. Les lignes ne sont parcourues qu'une fois (un gros devis est
+relu en base par morceaux, voir lignes.py) : la largeur des colonnes de
+montants est bornée par le montant HT du devis, celle des descriptions et
+des quantités est calculée sur les LIGNES_ECHANTILLON premières lignes, qui
+sont ensuite écrites avec les suivantes.
+"""
+
+from decimal import Decimal
+from io import BytesIO
+from itertools import chain, islice
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+
+# Version du rendu : à incrémenter à chaque modification de la mise en page,
+# pour invalider les documents déjà en cache
+VERSION = 3
+
+# Taux de TVA appliqué aux totaux
+TAUX_TVA = Decimal('0.20')
+
+# Format d'affichage des montants
+FORMAT_MONTANT = '#,##0.00 "€"'
+
+# Format d'affichage des dates
+FORMAT_DATE = 'DD/MM/YYYY'
+
+ENTETE_LIGNES = ['Description', 'Quantité', 'Prix unitaire', 'Total']
+
+# Nombre de premières lignes lues pour calculer la largeur des colonnes
+LIGNES_ECHANTILLON = 200
+
+# Éléments de style partagés par tous les classeurs
+POLICE_TITRE = Font(bold=True, size=14)
+POLICE_ENTETE = Font(bold=True, size=12)
+FOND_ENTETE = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+CENTRE = Alignment(horizontal='center')
+
+
+def _styles_nommes():
+    """Construit les styles nommés d'un classeur de devis."""
+    return [
+        NamedStyle(name='devis_titre', font=POLICE_TITRE),
+        NamedStyle(name='devis_libelle', font=POLICE_ENTETE),
+        NamedStyle(name='devis_entete', font=POLICE_ENTETE, fill=FOND_ENTETE, alignment=CENTRE),
+        NamedStyle(name='devis_montant', number_format=FORMAT_MONTANT),
+        NamedStyle(name='devis_date', number_format=FORMAT_DATE),
+    ]
+
+
+def _texte_montant(montant):
+    """Texte affiché par Excel pour un montant au format FORMAT_MONTANT."""
+    return f"{montant:,.2f} €"
+
+
+def cellule_stylee(ws, valeur, style):
+    """Crée une cellule write-only portant un style nommé."""
+    cellule = WriteOnlyCell(ws, value=valeur)
+    cellule.style = style
+    return cellule
+
+
+def ajouter_styles(wb):
+    """Enregistre les styles nommés des devis dans un classeur."""
+    for style in _styles_nommes():
+        wb.add_named_style(style)
+
+
+def ecrire_feuille(wb, devis, lignes):
+    """
+    Ajoute à un classeur write-only une feuille présentant un devis.
+
+    Les styles nommés doivent avoir été enregistrés par ajouter_styles().
+
+    Args:
+        wb: Le classeur (mode write-only)
+        devis: Le devis à présenter
+        lignes: Les lignes du devis
+
+    Returns:
+        WriteOnlyWorksheet: La feuille écrite et fermée
+    """
+    montant_tva = devis.montant_ht * TAUX_TVA
+    totaux = [
+        ("Total HT:", devis.montant_ht),
+        ("TVA (20%):", montant_tva),
+        ("Total TTC:", devis.montant_ttc),
+    ]
+    entete = [
+        f"Devis N°{devis.numero}",
+        f"Date: {devis.date_creation.strftime('%d/%m/%Y')}",
+        "Client:",
+        devis.client.nom,
+        devis.client.adresse,
+    ]
+
+    # Largeur des colonnes : longueur du plus long texte affiché, plus une marge
+    largeurs = [len(str(valeur)) for valeur in ENTETE_LIGNES]
+    largeurs[0] = max([largeurs[0]] + [len(str(valeur)) for valeur in entete] + [len(libelle) for libelle, _ in totaux])
+    largeurs[1] = max([largeurs[1]] + [len(_texte_montant(montant)) for _, montant in totaux])
+    # Les valeurs étant positives, le texte le plus long est celui de la plus
+    # grande. Le montant d'une ligne, et donc son prix unitaire (quantité
+    # d'au moins 1), ne dépasse pas le montant HT du devis
+    lignes = iter(lignes)
+    echantillon = list(islice(lignes, LIGNES_ECHANTILLON))
+    description, quantite, montant = 0, 0, devis.montant_ht
+    for ligne in echantillon:
+        description = max(description, len(ligne.description))
+        quantite = max(quantite, ligne.quantite)
+        montant = max(montant, ligne.montant, ligne.prix_unitaire)
+    largeurs[0] = max(largeurs[0], description)
+    largeurs[1] = max(largeurs[1], len(str(quantite)))
+    largeurs[2] = max(largeurs[2], len(_texte_montant(montant)))
+    largeurs[3] = max(largeurs[3], len(_texte_montant(montant)))
+
+    ws = wb.create_sheet(f"Devis {devis.numero}")
+    for lettre, largeur in zip('ABCD', largeurs):
+        ws.column_dimensions[lettre].width = largeur + 2
+
+    # Titre et informations client
+    ws.append([cellule_stylee(ws, entete[0], 'devis_titre')])
+    ws.append([entete[1]])
+    ws.append([])
+    ws.append([cellule_stylee(ws, entete[2], 'devis_libelle')])
+    ws.append([entete[3]])
+    ws.append([entete[4]])
+    ws.append([])
+
+    # Tableau des lignes
+    ws.append([cellule_stylee(ws, titre, 'devis_entete') for titre in ENTETE_LIGNES])
+    # Les cellules stylées sont écrites dès l'ajout de la ligne : les deux
+    # mêmes cellules sont réutilisées pour toutes les lignes
+    prix = cellule_stylee(ws, None, 'devis_montant')
+    montant = cellule_stylee(ws, None, 'devis_montant')
+    for ligne in chain(echantillon, lignes):
+        prix.value = ligne.prix_unitaire
+        montant.value = ligne.montant
+        ws.append([ligne.description, ligne.quantite, prix, montant])
+
+    # Totaux
+    ws.append([])
+    for libelle, valeur in totaux:
+        ws.append([cellule_stylee(ws, libelle, 'devis_libelle'), cellule_stylee(ws, valeur, 'devis_montant')])
+
+    # Libère le fichier temporaire de la feuille
+    ws.close()
+    return ws
+
+
+def rendre_excel(devis, lignes):
+    """
+    Génère un fichier Excel contenant toutes les informations
+    du devis, y compris les lignes et les totaux.
+
+    Args:
+        devis: Le devis à exporter
+        lignes: Les lignes du devis
+
+    Returns:
+        bytes: Le contenu du fichier Excel
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ajouter_styles(wb)
+    ecrire_feuille(wb, devis, lignes)
+
+    tampon = BytesIO()
+    wb.save(tampon)
+    return tampon.getvalue()
@@ -0,0 +1,57 @@
+"""
+Lecture des lignes d'un devis pour les exports.
+
+Les lignes d'un devis ordinaire sont chargées en une requête. Au-delà de
+DEVIS_EXPORTS_SEUIL_GROS_DEVIS lignes, elles sont relues en base par
+morceaux à chaque parcours (calcul de l'empreinte, puis rendu), afin que la
+mémoire utilisée ne dépende pas de la taille du devis.
+"""
+
+from django.conf import settings
+
+# Seuil par défaut à partir duquel un devis est traité comme un gros devis
+SEUIL_GROS_DEVIS = 500
+
+# Nombre de lignes lues par requête lors du parcours d'un gros devis
+TAILLE_MORCEAU_LIGNES = 2000
+
+
+def seuil_gros_devis():
+    """Retourne le nombre de lignes à partir duquel un devis est un gros devis."""
+    return getattr(settings, 'DEVIS_EXPORTS_SEUIL_GROS_DEVIS', SEUIL_GROS_DEVIS)
+
+
+class LignesEnFlux:
+    """
+    Lignes d'un gros devis, relues en base par morceaux à chaque parcours.
+    """
+
+    def __init__(self, devis):
+        self.queryset = devis.lignes.order_by('id')
+        self._nombre = None
+
+    def __len__(self):
+        if self._nombre is None:
+            self._nombre = self.queryset.count()
+        return self._nombre
+
+    def __iter__(self):
+        return self.queryset.iterator(chunk_size=TAILLE_MORCEAU_LIGNES)
+
+
+def charger_lignes(devis):
+    """
+    Retourne les lignes d'un devis à exporter.
+
+    Args:
+        devis: Le devis exporté
+
+    Returns:
+        list ou LignesEnFlux: Les lignes en mémoire pour un devis ordinaire,
+                              ou relues par morceaux pour un gros devis
+    """
+    seuil = seuil_gros_devis()
+    lignes = list(devis.lignes.all()[:seuil])
+    if len(lignes) < seuil:
+        return lignes
+    return LignesEnFlux(devis)
@@ -0,0 +1,265 @@
+"""
+Rendu PDF des devis avec ReportLab.
+
+Les styles de paragraphe et de tableau ne dépendent pas du devis : ils sont
+construits une seule fois, à l'import du module, et partagés par tous les
+rendus du processus (ReportLab ne les modifie pas pendant la mise en page).
+Le modèle de page (cadre et marges) porte en revanche un état pendant la
+construction du document : il est construit une fois par thread.
+
+Les gros devis (voir devis/exports/lignes.py) sont rendus en mode flux : les
+lignes sont découpées en tableaux de LIGNES_PAR_TABLEAU lignes, chacun avec
+son en-tête (répété aussi en haut de page si le tableau est coupé), et ces
+tableaux sont produits au fur et à mesure de la mise en page au lieu d'être
+construits d'avance. Seuls quelques tableaux existent à la fois, et la mise
+en page de chacun ne dépend pas de la taille du devis. Le document PDF
+produit reste, lui, proportionnel au nombre de pages.
+"""
+
+import threading
+from collections import namedtuple
+from decimal import Decimal
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer, Table, TableStyle
+
+from .lignes import seuil_gros_devis
+
+# Version du rendu : à incrémenter à chaque modification de la mise en page,
+# pour invalider les documents déjà en cache
+VERSION = 2
+
+# Taux de TVA appliqué aux totaux
+TAUX_TVA = Decimal('0.20')
+
+# Format et marges de la page (identiques à SimpleDocTemplate)
+TAILLE_PAGE = letter
+MARGE = inch
+
+# Nombre de lignes par tableau dans le mode flux des gros devis
+LIGNES_PAR_TABLEAU = 40
+
+# Largeur des colonnes des tableaux du mode flux (largeur utile de la page)
+COLONNES_GROS_DEVIS = [3.5*inch, 0.9*inch, 1.05*inch, 1.05*inch]
+
+# Largeur disponible pour le texte d'une description (marges des cellules déduites)
+LARGEUR_DESCRIPTION = COLONNES_GROS_DEVIS[0] - 12
+
+ENTETE_LIGNES = ['Description', 'Quantité', 'Prix unitaire', 'Total']
+
+StylesPdf = namedtuple(
+    'StylesPdf',
+    ['titre', 'normal', 'sous_titre', 'pied', 'tableau', 'totaux', 'cellule', 'tableau_gros']
+)
+
+
+def construire_styles():
+    """
+    Construit les styles de paragraphe et de tableau des devis.
+
+    Returns:
+        StylesPdf: Les styles du document
+    """
+    styles = getSampleStyleSheet()
+    return StylesPdf(
+        titre=ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=1  # Centré
+        ),
+        normal=styles['Normal'],
+        sous_titre=styles['Heading2'],
+        pied=ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=10,
+            textColor=colors.grey,
+            alignment=1
+        ),
+        tableau=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 14),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]),
+        totaux=TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]),
+        cellule=ParagraphStyle(
+            'Cellule',
+            parent=styles['Normal'],
+            fontSize=10,
+            leading=12
+        ),
+        tableau_gros=TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]),
+    )
+
+
+# Styles partagés par tous les rendus du processus
+STYLES = construire_styles()
+
+_local = threading.local()
+
+
+def _modele_page():
+    """Retourne le modèle de page du thread courant, construit au premier appel."""
+    modele = getattr(_local, 'modele_page', None)
+    if modele is None:
+        largeur, hauteur = TAILLE_PAGE
+        cadre = Frame(MARGE, MARGE, largeur - 2 * MARGE, hauteur - 2 * MARGE, id='normal')
+        modele = _local.modele_page = PageTemplate(id='devis', frames=[cadre])
+    return modele
+
+
+class _FluxElements(list):
+    """
+    Liste d'éléments ReportLab alimentée à la demande par un itérateur.
+
+    BaseDocTemplate.build() consomme les éléments en tête de liste tant que
+    len() est non nul : la liste est complétée depuis l'itérateur à chaque
+    appel de len(), de sorte qu'elle ne contient jamais plus que quelques
+    éléments.
+    """
+
+    def __init__(self, iterateur, reserve=2):
+        super().__init__()
+        self._iterateur = iterateur
+        self._reserve = reserve
+
+    def __len__(self):
+        while self._iterateur is not None and super().__len__() < self._reserve:
+            try:
+                self.append(next(self._iterateur))
+            except StopIteration:
+                self._iterateur = None
+        return super().__len__()
+
+
+def _entete(devis, styles):
+    """Éléments d'en-tête : titre, date et informations client."""
+    return [
+        Paragraph(f"Devis N°{devis.numero}", styles.titre),
+        Paragraph(f"Date: {devis.date_creation.strftime('%d/%m/%Y')}", styles.normal),
+        Spacer(1, 20),
+        Paragraph("Client:", styles.sous_titre),
+        Paragraph(f"{devis.client.nom}", styles.normal),
+        Paragraph(f"{devis.client.adresse}", styles.normal),
+        Spacer(1, 20),
+    ]
+
+
+def _pied(devis, styles):
+    """Éléments de fin de document : totaux et mention de validité."""
+    montant_tva = devis.montant_ht * TAUX_TVA
+    montant_ttc = devis.montant_ht + montant_tva
+    totaux = [
+        ['Total HT:', f"{devis.montant_ht:.2f} €"],
+        ['TVA (20%):', f"{montant_tva:.2f} €"],
+        ['Total TTC:', f"{montant_ttc:.2f} €"]
+    ]
+    return [
+        Spacer(1, 20),
+        Table(totaux, colWidths=[2*inch, 2*inch], style=styles.totaux),
+        Spacer(1, 30),
+        Paragraph("Ce devis est valable 30 jours à compter de sa date d'émission.", styles.pied),
+    ]
+
+
+def _elements_gros_devis(devis, lignes, styles):
+    """
+    Produit les éléments d'un gros devis au fil du parcours des lignes.
+
+    Les descriptions trop longues pour la largeur fixe de leur colonne sont
+    des paragraphes, renvoyés à la ligne ; les autres restent du texte
+    simple, bien plus rapide à mettre en page.
+    """
+    yield from _entete(devis, styles)
+
+    cellule = styles.cellule
+    morceau = [ENTETE_LIGNES]
+    for ligne in lignes:
+        description = ligne.description
+        if stringWidth(description, cellule.fontName, cellule.fontSize) > LARGEUR_DESCRIPTION:
+            description = Paragraph(escape(description), cellule)
+        morceau.append([
+            description,
+            str(ligne.quantite),
+            f"{ligne.prix_unitaire:.2f} €",
+            f"{ligne.montant:.2f} €"
+        ])
+        if len(morceau) > LIGNES_PAR_TABLEAU:
+            yield Table(morceau, colWidths=COLONNES_GROS_DEVIS, repeatRows=1, style=styles.tableau_gros)
+            morceau = [ENTETE_LIGNES]
+    if len(morceau) > 1:
+        yield Table(morceau, colWidths=COLONNES_GROS_DEVIS, repeatRows=1, style=styles.tableau_gros)
+
+    yield from _pied(devis, styles)
+
+
+def rendre_pdf(devis, lignes, styles=None, flux=None):
+    """
+    Génère un PDF professionnel contenant toutes les informations
+    du devis, y compris les lignes et les totaux.
+
+    Args:
+        devis: Le devis à exporter
+        lignes: Les lignes du devis
+        styles: Les styles à utiliser (par défaut, les styles partagés STYLES)
+        flux: Force (True) ou désactive (False) le mode flux des gros devis ;
+              par défaut, il est choisi selon le nombre de lignes
+
+    Returns:
+        bytes: Le contenu du fichier PDF
+    """
+    styles = styles or STYLES
+    if flux is None:
+        flux = len(lignes) >= seuil_gros_devis()
+
+    tampon = BytesIO()
+    doc = BaseDocTemplate(
+        tampon,
+        pagesize=TAILLE_PAGE,
+        leftMargin=MARGE, rightMargin=MARGE, topMargin=MARGE, bottomMargin=MARGE,
+        pageTemplates=[_modele_page()],
+    )
+
+    if flux:
+        elements = _FluxElements(_elements_gros_devis(devis, lignes, styles))
+    else:
+        # Tableau des lignes
+        data = [ENTETE_LIGNES]
+        data.extend(
+            [ligne.description, str(ligne.quantite), f"{ligne.prix_unitaire:.2f} €", f"{ligne.montant:.2f} €"]
+            for ligne in lignes
+        )
+        elements = _entete(devis, styles) + [Table(data, style=styles.tableau)] + _pied(devis, styles)
+
+    doc.build(elements)
+    return tampon.getvalue()
@@ -0,0 +1,275 @@
+"""
+Exécution des exports de devis en arrière-plan.
+
+Les exports lourds (PDF, Excel, Word) sont confiés à un pool de processus
+local (ProcessPoolExecutor), sans courtier externe : la requête web crée une
+TacheExport puis retourne immédiatement, et un processus du pool rend le
+document et l'enregistre dans la tâche.
+
+Le pool est propre à chaque processus web et compte DEVIS_EXPORTS_WORKERS
+processus. Le nombre de rendus simultanés de l'ensemble des processus web
+est en outre borné par DEVIS_EXPORTS_SIMULTANES : sous PostgreSQL, chaque
+rendu occupe l'une de ces places, matérialisées par des verrous consultatifs
+de session (pg_try_advisory_lock) ; une tâche attend qu'une place se libère
+avant de commencer. Un verrou est libéré à la fermeture de sa connexion,
+même si le processus qui le détient est tué. Sans PostgreSQL, seule la
+borne par processus web s'applique.
+
+Les processus du pool sont démarrés par « spawn » : chacun initialise Django
+et ouvre ses propres connexions à la base, sans hériter de celles du
+processus web. Une tâche dont le processus web s'arrête avant l'exécution
+reste en attente ; une tâche dont le processus s'arrête pendant l'exécution
+reste en cours. La commande relancer_exports, à planifier, relance les
+premières et reprend les secondes au-delà de DEVIS_EXPORTS_DELAI_MAX
+secondes d'exécution (voir reprendre_taches_bloquees()).
+
+Ce module est importé par les processus du pool avant l'initialisation de
+Django : les modèles y sont donc importés localement.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import FORMATS
+from .cache import obtenir_rendu
+from .lignes import charger_lignes
+
+logger = logging.getLogger(__name__)
+
+# Nombre de processus d'export par défaut (par processus web)
+WORKERS_DEFAUT = 2
+
+# Nombre de rendus simultanés par défaut, tous processus web confondus
+SIMULTANES_DEFAUT = 4
+
+# Durée d'exécution (secondes) au-delà de laquelle une tâche en cours est
+# considérée comme abandonnée par un processus arrêté
+DELAI_MAX_DEFAUT = 30 * 60
+
+# Nombre d'exécutions commencées au-delà duquel une tâche n'est plus reprise
+TENTATIVES_MAX = 3
+
+# Clé des verrous consultatifs des places de rendu, et attente entre deux essais
+CLE_PLACES = 0x44455653  # « DEVS »
+ATTENTE_PLACE = 0.5
+
+_executeur = None
+_verrou = threading.Lock()
+
+
+def _initialiser_processus(module_settings):
+    """Initialise Django dans un processus du pool."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', module_settings)
+    import django
+    django.setup()
+
+
+def creer_executeur(max_workers):
+    """
+    Crée un pool de processus dont chaque processus initialise Django.
+
+    Args:
+        max_workers: Nombre maximal de processus du pool
+
+    Returns:
+        ProcessPoolExecutor: Le pool créé
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_initialiser_processus,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'generateur_de_devis.settings'),),
+    )
+
+
+def get_executeur():
+    """
+    Retourne le pool de processus d'export, créé au premier appel.
+    """
+    global _executeur
+    with _verrou:
+        if _executeur is None:
+            _executeur = creer_executeur(getattr(settings, 'DEVIS_EXPORTS_WORKERS', WORKERS_DEFAUT))
+        return _executeur
+
+
+def _reinitialiser_executeur(executeur):
+    """Abandonne un pool devenu inutilisable (processus tué) pour en recréer un."""
+    global _executeur
+    with _verrou:
+        if _executeur is executeur:
+            _executeur = None
+    executeur.shutdown(wait=False, cancel_futures=True)
+
+
+def soumettre_export(devis, format_export, utilisateur=None):
+    """
+    Crée une tâche d'export et la confie au pool de processus.
+
+    La tâche n'est soumise qu'après la validation de la transaction en cours,
+    afin que le processus d'export puisse la lire.
+
+    Args:
+        devis: Le devis à exporter
+        format_export: Le format d'export ('pdf', 'excel', 'word')
+        utilisateur: L'utilisateur demandant l'export
+
+    Returns:
+        TacheExport: La tâche créée
+    """
+    from ..models import TacheExport
+
+    tache = TacheExport.objects.create(devis=devis, format=format_export, cree_par=utilisateur)
+    transaction.on_commit(lambda: lancer_tache(tache.pk))
+    return tache
+
+
+def lancer_tache(tache_id):
+    """
+    Soumet une tâche existante au pool de processus.
+
+    Si le pool est inutilisable (un processus a été tué), il est recréé et
+    la soumission retentée une fois.
+    """
+    for tentative in range(2):
+        executeur = get_executeur()
+        try:
+            future = executeur.submit(executer_tache, tache_id)
+        except BrokenProcessPool:
+            _reinitialiser_executeur(executeur)
+            if tentative:
+                raise
+            continue
+        future.add_done_callback(lambda f: _verifier_execution(f, tache_id))
+        return
+
+
+def _verifier_execution(future, tache_id):
+    """
+    Marque la tâche en échec si son processus s'est arrêté brutalement.
+
+    Les erreurs de rendu sont déjà enregistrées par executer_tache() : seule
+    une exception remontée par le pool (processus tué, pool arrêté) arrive ici.
+    """
+    if future.cancelled():
+        erreur = "Tâche annulée"
+    elif future.exception() is not None:
+        erreur = str(future.exception()) or future.exception().__class__.__name__
+    else:
+        return
+    from ..models import TacheExport
+
+    try:
+        TacheExport.objects.filter(pk=tache_id, statut__in=['en_attente', 'en_cours']).update(
+            statut='echec', erreur=erreur, date_fin=timezone.now()
+        )
+    finally:
+        connection.close()
+
+
+def _prendre_place():
+    """
+    Attend qu'une place de rendu soit libre et la réserve pour la connexion
+    courante (PostgreSQL uniquement).
+
+    Returns:
+        int: Le numéro de la place réservée, ou None sans PostgreSQL
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    places = getattr(settings, 'DEVIS_EXPORTS_SIMULTANES', SIMULTANES_DEFAUT)
+    while True:
+        with connection.cursor() as curseur:
+            for place in range(places):
+                curseur.execute('SELECT pg_try_advisory_lock(%s, %s)', [CLE_PLACES, place])
+                if curseur.fetchone()[0]:
+                    return place
+        time.sleep(ATTENTE_PLACE)
+
+
+def _liberer_place(place):
+    if place is not None:
+        with connection.cursor() as curseur:
+            curseur.execute('SELECT pg_advisory_unlock(%s, %s)', [CLE_PLACES, place])
+
+
+def executer_tache(tache_id):
+    """
+    Exécute une tâche d'export dans un processus du pool.
+
+    La tâche attend une place de rendu libre (voir DEVIS_EXPORTS_SIMULTANES),
+    puis est réservée par une mise à jour conditionnelle de son statut :
+    une tâche déjà prise en charge n'est pas exécutée deux fois. Le document
+    est rendu (ou lu dans le cache des exports) puis enregistré dans la tâche.
+
+    Args:
+        tache_id: L'identifiant de la tâche à exécuter
+    """
+    from ..models import TacheExport
+
+    close_old_connections()
+    place = None
+    try:
+        place = _prendre_place()
+        reservee = TacheExport.objects.filter(pk=tache_id, statut='en_attente').update(
+            statut='en_cours', date_debut=timezone.now(), tentatives=F('tentatives') + 1
+        )
+        if not reservee:
+            return
+
+        tache = TacheExport.objects.select_related('devis__client').get(pk=tache_id)
+        devis = tache.devis
+        contenu = obtenir_rendu(devis, charger_lignes(devis), tache.format)
+
+        nom = f'devis_{devis.numero}.{FORMATS[tache.format].extension}'
+        tache.fichier.save(nom, ContentFile(contenu), save=False)
+        tache.statut = 'termine'
+        tache.date_fin = timezone.now()
+        tache.save(update_fields=['fichier', 'statut', 'date_fin'])
+    except Exception as e:
+        logger.exception(f"Échec de la tâche d'export {tache_id}")
+        TacheExport.objects.filter(pk=tache_id).update(
+            statut='echec', erreur=str(e), date_fin=timezone.now()
+        )
+    finally:
+        _liberer_place(place)
+        close_old_connections()
+
+
+def reprendre_taches_bloquees(delai_max=None):
+    """
+    Reprend les tâches restées en cours plus de delai_max secondes, dont le
+    processus d'export s'est vraisemblablement arrêté (processus web
+    redémarré, processus tué) : elles sont remises en attente, ou marquées
+    en échec après TENTATIVES_MAX exécutions commencées.
+
+    Args:
+        delai_max: Durée d'exécution maximale, en secondes
+                   (défaut : DEVIS_EXPORTS_DELAI_MAX)
+
+    Returns:
+        tuple: (nombre de tâches remises en attente, nombre de tâches en échec)
+    """
+    from ..models import TacheExport
+
+    if delai_max is None:
+        delai_max = getattr(settings, 'DEVIS_EXPORTS_DELAI_MAX', DELAI_MAX_DEFAUT)
+    bloquees = TacheExport.objects.filter(
+        statut='en_cours', date_debut__lt=timezone.now() - timezone.timedelta(seconds=delai_max)
+    )
+    echecs = bloquees.filter(tentatives__gte=TENTATIVES_MAX).update(
+        statut='echec', erreur="Exécution interrompue à chaque tentative", date_fin=timezone.now()
+    )
+    reprises = bloquees.update(statut='en_attente', date_debut=None)
+    return reprises, echecs
@@ -0,0 +1,168 @@
+"""
+Rendu Word des devis avec python-docx.
+
+Chaque document part d'un document de base (le modèle par défaut de
+python-docx, ou le fichier désigné par DEVIS_EXPORTS_MODELE_WORD), lu une
+seule fois par processus puis recopié pour chaque rendu.
+
+Les tableaux sont produits en une fois sous forme de XML WordprocessingML
+puis insérés dans le document : l'API cellule par cellule de python-docx
+(add_row(), cell.text, runs[0].bold) est trop lente pour les gros devis.
+"""
+
+import re
+import threading
+from decimal import Decimal
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+# Version du rendu : à incrémenter à chaque modification de la mise en page,
+# pour invalider les documents déjà en cache
+VERSION = 2
+
+# Taux de TVA appliqué aux totaux
+TAUX_TVA = Decimal('0.20')
+
+ENTETE_LIGNES = ['Description', 'Quantité', 'Prix unitaire', 'Total']
+
+# Largeur utile d'une page A4 du modèle par défaut (en vingtièmes de point)
+LARGEUR_PAGE = 8640
+
+# Retours à la ligne saisis dans les descriptions
+_RETOUR_LIGNE = re.compile(r'\r\n|\r|\n')
+
+_modele = None
+_verrou = threading.Lock()
+
+
+def _octets_modele():
+    """
+    Retourne le contenu du document de base, lu une seule fois par processus.
+    """
+    global _modele
+    with _verrou:
+        if _modele is None:
+            chemin = getattr(settings, 'DEVIS_EXPORTS_MODELE_WORD', None)
+            if chemin:
+                with open(chemin, 'rb') as fichier:
+                    _modele = fichier.read()
+            else:
+                tampon = BytesIO()
+                Document().save(tampon)
+                _modele = tampon.getvalue()
+        return _modele
+
+
+def _xml_cellule(texte, largeur, gras=False):
+    """XML d'une cellule de tableau contenant un texte (retours à la ligne compris)."""
+    proprietes = '<w:rPr><w:b/></w:rPr>' if gras else ''
+    textes = '<w:br/>'.join(
+        f'<w:t xml:space="preserve">{escape(morceau)}</w:t>'
+        for morceau in _RETOUR_LIGNE.split(texte)
+    )
+    return (
+        f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{largeur}"/></w:tcPr>'
+        f'<w:p><w:r>{proprietes}{textes}</w:r></w:p></w:tc>'
+    )
+
+
+def _xml_tableau(rangees, nombre_colonnes, gras):
+    """
+    Construit un tableau de style « Table Grid » en une seule analyse XML.
+
+    Args:
+        rangees: Les rangées du tableau, chacune une liste de textes
+        nombre_colonnes: Le nombre de colonnes (de largeurs égales)
+        gras: Fonction (index de rangée, index de colonne) -> bool indiquant
+              les cellules en gras
+
+    Returns:
+        CT_Tbl: L'élément <w:tbl>, à insérer dans le corps du document
+    """
+    largeur = LARGEUR_PAGE // nombre_colonnes
+    colonnes = f'<w:gridCol w:w="{largeur}"/>' * nombre_colonnes
+    lignes_xml = ''.join(
+        '<w:tr>'
+        + ''.join(_xml_cellule(texte, largeur, gras(i, j)) for j, texte in enumerate(rangee))
+        + '</w:tr>'
+        for i, rangee in enumerate(rangees)
+    )
+    return parse_xml(
+        f'<w:tbl {nsdecls("w")}>'
+        '<w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0"'
+        ' w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+        f'<w:tblGrid>{colonnes}</w:tblGrid>'
+        f'{lignes_xml}</w:tbl>'
+    )
+
+
+def _ajouter_tableau(doc, tableau):
+    """Ajoute un tableau à la fin du corps du document (avant la section)."""
+    corps = doc.element.body
+    if corps.sectPr is not None:
+        corps.sectPr.addprevious(tableau)
+    else:
+        corps.append(tableau)
+
+
+def rendre_word(devis, lignes):
+    """
+    Génère un document Word contenant toutes les informations
+    du devis, y compris les lignes et les totaux.
+
+    Args:
+        devis: Le devis à exporter
+        lignes: Les lignes du devis
+
+    Returns:
+        bytes: Le contenu du document Word
+    """
+    # Copie du document de base
+    doc = Document(BytesIO(_octets_modele()))
+
+    # Titre
+    title = doc.add_heading(f"Devis N°{devis.numero}", level=1)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Date
+    date_para = doc.add_paragraph(f"Date: {devis.date_creation.strftime('%d/%m/%Y')}")
+    date_para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+
+    # Informations client
+    doc.add_heading("Client:", level=2)
+    doc.add_paragraph(devis.client.nom)
+    doc.add_paragraph(devis.client.adresse)
+
+    # Tableau des lignes, en-têtes en gras
+    rangees = [ENTETE_LIGNES]
+    rangees.extend(
+        [ligne.description, str(ligne.quantite), f"{ligne.prix_unitaire:.2f} €", f"{ligne.montant:.2f} €"]
+        for ligne in lignes
+    )
+    _ajouter_tableau(doc, _xml_tableau(rangees, 4, lambda i, j: i == 0))
+
+    # Totaux, libellés en gras
+    doc.add_paragraph()
+    tva = devis.montant_ht * TAUX_TVA
+    totaux = [
+        ["Total HT:", f"{devis.montant_ht:.2f} €"],
+        ["TVA (20%):", f"{tva:.2f} €"],
+        ["Total TTC:", f"{devis.montant_ttc:.2f} €"],
+    ]
+    _ajouter_tableau(doc, _xml_tableau(totaux, 2, lambda i, j: j == 0))
+
+    # Pied de page
+    doc.add_paragraph()
+    footer = doc.add_paragraph("Ce devis est valable 30 jours à compter de sa date d'émission.")
+    footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    tampon = BytesIO()
+    doc.save(tampon)
+    return tampon.getvalue()
@@ -0,0 +1,81 @@
+"""
+Filtres de la liste des devis.
+
+Les paramètres de filtre (client, statut, date_debut, date_fin) sont
+partagés par la liste des devis et par les exports : ils sont traduits
+ici en conditions SQL appliquées au QuerySet.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Devis
+
+# Paramètres de filtre reconnus, dans l'ordre d'affichage
+PARAMETRES_FILTRE = ('client', 'statut', 'date_debut', 'date_fin')
+
+
+def _debut_de_journee(date):
+    """Retourne le début de la journée donnée, dans le fuseau horaire courant."""
+    return timezone.make_aware(datetime.combine(date, time.min))
+
+
+def _lire_date(valeur):
+    """Lit une date au format AAAA-MM-JJ ; retourne None si elle est invalide."""
+    try:
+        return parse_date(valeur or '')
+    except ValueError:
+        return None
+
+
+def lire_filtres(parametres):
+    """
+    Lit et valide les paramètres de filtre d'une requête.
+
+    Les valeurs invalides sont ignorées.
+
+    Args:
+        parametres: Les paramètres GET de la requête
+
+    Returns:
+        dict: Les filtres valides (client, statut, date_debut, date_fin)
+    """
+    filtres = {}
+
+    client = parametres.get('client', '')
+    if client.isdigit():
+        filtres['client'] = int(client)
+
+    statut = parametres.get('statut', '')
+    if statut in dict(Devis.STATUT_CHOICES):
+        filtres['statut'] = statut
+
+    for nom in ('date_debut', 'date_fin'):
+        date = _lire_date(parametres.get(nom))
+        if date is not None:
+            filtres[nom] = date
+
+    return filtres
+
+
+def filtrer_devis(queryset, filtres):
+    """
+    Applique les filtres lus par lire_filtres() à un QuerySet de devis.
+
+    Les bornes de dates sont converties en bornes de date et heure, pour que
+    la condition porte directement sur la colonne date_creation (et puisse
+    utiliser son index) ; la date de fin est incluse.
+    """
+    if 'client' in filtres:
+        queryset = queryset.filter(client_id=filtres['client'])
+    if 'statut' in filtres:
+        queryset = queryset.filter(statut=filtres['statut'])
+    if 'date_debut' in filtres:
+        queryset = queryset.filter(date_creation__gte=_debut_de_journee(filtres['date_debut']))
+    if 'date_fin' in filtres:
+        queryset = queryset.filter(
+            date_creation__lt=_debut_de_journee(filtres['date_fin'] + timedelta(days=1))
+        )
+    return queryset
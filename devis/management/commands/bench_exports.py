@@ -0,0 +1,314 @@
+"""
+Commande de mesure du temps de rendu des exports de devis.
+
+Rend des devis fictifs (non enregistrés, aucune requête en base) de
+différentes tailles et affiche le temps médian de rendu d'un document,
+avant et après optimisation du moteur de rendu :
+- pdf : « avant » reconstruit les styles ReportLab à chaque document et
+  place toutes les lignes dans un tableau unique, « après » utilise les
+  styles partagés et le mode flux au-delà du seuil des gros devis ;
+- excel : « avant » est l'ancien rendu (classeur complet en mémoire,
+  montants en texte, largeurs calculées en relisant toutes les cellules),
+  « après » le rendu write-only de devis.exports.excel ;
+- word : « avant » est l'ancien rendu (document créé par Document() et
+  tableau rempli cellule par cellule), « après » le rendu à partir du
+  document de base en cache et des tableaux générés en XML ;
+- classeur : les lignes sont réparties en devis de LIGNES_PAR_DEVIS lignes ;
+  « avant » produit un fichier Excel par devis, « plat » et « feuilles »
+  un classeur unique dans chacune des dispositions de devis.exports.classeur.
+
+Avec --memoire, le pic de mémoire allouée pendant un rendu (tracemalloc)
+est affiché à la place du temps.
+
+Usage :
+    python manage.py bench_exports
+    python manage.py bench_exports --format pdf --lignes 10 100 1000 --repetitions 5
+    python manage.py bench_exports --lignes 1000 5000 20000 --memoire
+    python manage.py bench_exports --format excel --lignes 100 1000 10000
+    python manage.py bench_exports --format word --lignes 10 100 500
+    python manage.py bench_exports --format classeur --lignes 5000 50000 --repetitions 1
+"""
+
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+from io import BytesIO
+
+import openpyxl
+from openpyxl.styles import Alignment, Font, PatternFill
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from clients.models import Client
+from devis.exports.classeur import rendre_classeur
+from devis.exports.excel import rendre_excel
+from devis.exports.pdf import construire_styles, rendre_pdf
+from devis.exports.word import rendre_word
+from devis.models import Devis, LigneDevis
+
+
+def rendre_excel_historique(devis, lignes):
+    """Ancien rendu Excel, conservé comme point de comparaison."""
+    # Création du classeur Excel
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = f"Devis {devis.numero}"
+
+    # Styles
+    header_font = Font(bold=True, size=12)
+    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+    title_font = Font(bold=True, size=14)
+
+    # Titre
+    ws['A1'] = f"Devis N°{devis.numero}"
+    ws['A1'].font = title_font
+    ws['A2'] = f"Date: {devis.date_creation.strftime('%d/%m/%Y')}"
+
+    # Informations client
+    ws['A4'] = "Client:"
+    ws['A4'].font = header_font
+    ws['A5'] = devis.client.nom
+    ws['A6'] = devis.client.adresse
+
+    # En-têtes du tableau
+    headers = ['Description', 'Quantité', 'Prix unitaire', 'Total']
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=8, column=col)
+        cell.value = header
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(horizontal='center')
+
+    # Données des lignes
+    row = 9
+    for ligne in lignes:
+        ws.cell(row=row, column=1).value = ligne.description
+        ws.cell(row=row, column=2).value = ligne.quantite
+        ws.cell(row=row, column=3).value = f"{ligne.prix_unitaire:.2f} €"
+        ws.cell(row=row, column=4).value = f"{ligne.montant:.2f} €"
+        row += 1
+
+    # Totaux
+    row += 1
+    ws.cell(row=row, column=1).value = "Total HT:"
+    ws.cell(row=row, column=2).value = f"{devis.montant_ht:.2f} €"
+    ws.cell(row=row, column=1).font = header_font
+
+    row += 1
+    tva = devis.montant_ht * Decimal('0.20')
+    ws.cell(row=row, column=1).value = "TVA (20%):"
+    ws.cell(row=row, column=2).value = f"{tva:.2f} €"
+    ws.cell(row=row, column=1).font = header_font
+
+    row += 1
+    ws.cell(row=row, column=1).value = "Total TTC:"
+    ws.cell(row=row, column=2).value = f"{devis.montant_ttc:.2f} €"
+    ws.cell(row=row, column=1).font = header_font
+
+    # Ajustement des largeurs de colonnes
+    for col in ws.columns:
+        max_length = 0
+        column = col[0].column_letter
+        for cell in col:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        adjusted_width = (max_length + 2)
+        ws.column_dimensions[column].width = adjusted_width
+
+    tampon = BytesIO()
+    wb.save(tampon)
+    return tampon.getvalue()
+
+
+def rendre_word_historique(devis, lignes):
+    """Ancien rendu Word, conservé comme point de comparaison."""
+    # Création du document Word
+    doc = Document()
+
+    # Titre
+    title = doc.add_heading(f"Devis N°{devis.numero}", level=1)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Date
+    date_para = doc.add_paragraph(f"Date: {devis.date_creation.strftime('%d/%m/%Y')}")
+    date_para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+
+    # Informations client
+    doc.add_heading("Client:", level=2)
+    doc.add_paragraph(devis.client.nom)
+    doc.add_paragraph(devis.client.adresse)
+
+    # Tableau des lignes
+    table = doc.add_table(rows=1, cols=4)
+    table.style = 'Table Grid'
+
+    # En-têtes
+    header_cells = table.rows[0].cells
+    headers = ['Description', 'Quantité', 'Prix unitaire', 'Total']
+    for i, header in enumerate(headers):
+        header_cells[i].text = header
+        header_cells[i].paragraphs[0].runs[0].bold = True
+
+    # Données des lignes
+    for ligne in lignes:
+        row_cells = table.add_row().cells
+        row_cells[0].text = ligne.description
+        row_cells[1].text = str(ligne.quantite)
+        row_cells[2].text = f"{ligne.prix_unitaire:.2f} €"
+        row_cells[3].text = f"{ligne.montant:.2f} €"
+
+    # Totaux
+    doc.add_paragraph()
+    totals = doc.add_table(rows=3, cols=2)
+    totals.style = 'Table Grid'
+
+    # Total HT
+    totals.rows[0].cells[0].text = "Total HT:"
+    totals.rows[0].cells[1].text = f"{devis.montant_ht:.2f} €"
+    totals.rows[0].cells[0].paragraphs[0].runs[0].bold = True
+
+    # TVA
+    tva = devis.montant_ht * Decimal('0.20')
+    totals.rows[1].cells[0].text = "TVA (20%):"
+    totals.rows[1].cells[1].text = f"{tva:.2f} €"
+    totals.rows[1].cells[0].paragraphs[0].runs[0].bold = True
+
+    # Total TTC
+    totals.rows[2].cells[0].text = "Total TTC:"
+    totals.rows[2].cells[1].text = f"{devis.montant_ttc:.2f} €"
+    totals.rows[2].cells[0].paragraphs[0].runs[0].bold = True
+
+    # Pied de page
+    doc.add_paragraph()
+    footer = doc.add_paragraph("Ce devis est valable 30 jours à compter de sa date d'émission.")
+    footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    tampon = BytesIO()
+    doc.save(tampon)
+    return tampon.getvalue()
+
+
+# Nombre de lignes par devis pour le format classeur
+LIGNES_PAR_DEVIS = 50
+
+
+def _par_devis(devis, lignes):
+    """Répartit les lignes en devis de LIGNES_PAR_DEVIS lignes (même objet devis)."""
+    for debut in range(0, len(lignes), LIGNES_PAR_DEVIS):
+        yield devis, lignes[debut:debut + LIGNES_PAR_DEVIS]
+
+
+def rendre_un_fichier_par_devis(devis, lignes):
+    """Un fichier Excel par devis, comme avant l'export en classeur unique."""
+    return [rendre_excel(un_devis, lignes_devis) for un_devis, lignes_devis in _par_devis(devis, lignes)]
+
+
+# Variantes de rendu comparées, par format
+VARIANTES = {
+    'pdf': {
+        'avant': lambda devis, lignes: rendre_pdf(devis, lignes, styles=construire_styles(), flux=False),
+        'après': rendre_pdf,
+    },
+    'excel': {
+        'avant': rendre_excel_historique,
+        'après': rendre_excel,
+    },
+    'word': {
+        'avant': rendre_word_historique,
+        'après': rendre_word,
+    },
+    'classeur': {
+        'avant': rendre_un_fichier_par_devis,
+        'plat': lambda devis, lignes: rendre_classeur(_par_devis(devis, lignes), 'plat'),
+        'feuilles': lambda devis, lignes: rendre_classeur(_par_devis(devis, lignes), 'feuilles'),
+    },
+}
+
+
+def devis_fictif(nombre_lignes):
+    """
+    Construit un devis non enregistré et ses lignes.
+
+    Les lignes sont construites avant les mesures : ni leur création ni
+    leur mémoire ne sont comptées dans le rendu.
+
+    Returns:
+        tuple: (devis, lignes)
+    """
+    client = Client(nom="Client de test", adresse="1 rue de la Paix\n75000 Paris")
+    lignes = [
+        LigneDevis(
+            description=f"Prestation n°{numero} - développement et intégration",
+            quantite=numero % 7 + 1,
+            prix_unitaire=Decimal('125.50'),
+            montant=(numero % 7 + 1) * Decimal('125.50'),
+        )
+        for numero in range(1, nombre_lignes + 1)
+    ]
+    devis = Devis(
+        numero='DEV-000000-0001',
+        client=client,
+        date_creation=timezone.now(),
+        montant_ht=sum((ligne.montant for ligne in lignes), Decimal('0')),
+    )
+    return devis, lignes
+
+
+def mesurer(rendu, devis, lignes, repetitions):
+    """Retourne le temps médian (en secondes) d'un rendu, après un rendu de chauffe."""
+    rendu(devis, lignes)
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        rendu(devis, lignes)
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees)
+
+
+def mesurer_memoire(rendu, devis, lignes):
+    """Retourne le pic de mémoire allouée (en octets) pendant un rendu."""
+    tracemalloc.start()
+    try:
+        rendu(devis, lignes)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps de rendu des exports de devis selon le nombre de lignes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(VARIANTES), default='pdf')
+        parser.add_argument('--lignes', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--repetitions', type=int, default=5)
+        parser.add_argument('--memoire', action='store_true', help="Mesure le pic de mémoire au lieu du temps")
+
+    def handle(self, *args, **options):
+        variantes = VARIANTES[options['format']]
+        noms = list(variantes)
+        if options['memoire']:
+            self.stdout.write(f"Format {options['format']} - pic de mémoire par document (Mo)")
+        else:
+            self.stdout.write(f"Format {options['format']} - temps médian par document (ms)")
+        self.stdout.write(f"{'Lignes':>8}" + ''.join(f"{nom:>12}" for nom in noms) + f"{'Gain':>10}")
+
+        for nombre_lignes in options['lignes']:
+            devis, lignes = devis_fictif(nombre_lignes)
+            if options['memoire']:
+                mesures = [mesurer_memoire(variantes[nom], devis, lignes) / 1024 / 1024 for nom in noms]
+            else:
+                mesures = [
+                    mesurer(variantes[nom], devis, lignes, options['repetitions']) * 1000
+                    for nom in noms
+                ]
+            ligne = f"{nombre_lignes:>8}" + ''.join(f"{mesure:>12.1f}" for mesure in mesures)
+            if len(mesures) > 1:
+                ligne += f"{(1 - mesures[-1] / mesures[0]) * 100:>9.1f}%"
+            self.stdout.write(ligne)
@@ -0,0 +1,325 @@
+"""
+Commande de mesure des performances de l'application.
+
+Mesure, sur les données présentes en base (voir generer_donnees) :
+- chaque URL des applications clients et devis, appelée en GET par un
+  utilisateur connecté (les exports passent par le cache des rendus),
+  d'abord sans cache Django (clé url:<nom>), puis avec le cache configuré
+  (clé url:<nom>:cache). Après l'appel de chauffe, les fragments mis en
+  cache masquent le coût de leurs requêtes : seule la première mesure
+  reflète le rendu complet d'une page ;
+- chaque moteur d'export, appelé directement (sans cache) sur un devis
+  typique et sur le devis qui compte le plus de lignes.
+
+Pour chaque mesure : temps médian, 90e centile et minimum, nombre de
+requêtes SQL (minimum et maximum sur les répétitions : un cache ou un
+compteur peut le faire varier d'un appel à l'autre) et temps médian passé
+en base, pic de mémoire allouée (tracemalloc) et taille de la réponse. Les requêtes exécutées par les processus de
+rendu (exports ZIP) ne sont pas comptées.
+
+Les résultats sont écrits au format JSON avec le commit git et la taille du
+jeu de données ; --comparer affiche l'évolution par rapport à un fichier de
+résultats précédent et signale les régressions.
+
+Usage :
+    python manage.py benchmark
+    python manage.py benchmark --repetitions 10 --sortie avant.json
+    python manage.py benchmark --comparer avant.json --echec-si-regression
+    python manage.py benchmark --filtre devis:devis_list --filtre export:pdf
+"""
+
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from importlib import import_module
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client as ClientHttp, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from clients.models import Client
+from devis.exports import FORMATS
+from devis.exports.classeur import devis_avec_lignes, rendre_classeur
+from devis.exports.lignes import charger_lignes
+from devis.models import Devis, TacheExport
+from generateur_de_devis.instrumentation import Mesure
+
+# Applications dont les URLs sont mesurées
+APPLICATIONS = ['clients', 'devis']
+
+# URLs non mesurées (accessibles uniquement en POST)
+URLS_EXCLUES = {'devis:devis_export_tache'}
+
+# Paramètres GET des URLs d'export groupé, limitées aux devis d'un client
+URLS_PAR_CLIENT = {'devis:devis_export_zip', 'devis:devis_export_classeur'}
+
+# Cache désactivé pendant les mesures des URLs sans cache
+SANS_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def commit_git():
+    """
+    Retourne le commit courant et l'existence de modifications non commitées.
+
+    Returns:
+        tuple: (hash du commit ou None, True si l'arbre de travail est modifié)
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        modifications = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, bool(modifications)
+
+
+def mesurer(fonction, repetitions):
+    """
+    Mesure une fonction après un appel de chauffe.
+
+    Args:
+        fonction: Fonction sans argument retournant (statut, taille en octets)
+        repetitions: Nombre d'appels chronométrés
+
+    Returns:
+        dict: Les mesures
+    """
+    fonction()
+    durees, requetes, durees_bdd = [], [], []
+    for _ in range(repetitions):
+        mesure = Mesure()
+        with connection.execute_wrapper(mesure):
+            debut = time.perf_counter()
+            statut, taille = fonction()
+            durees.append(time.perf_counter() - debut)
+        requetes.append(mesure.requetes)
+        durees_bdd.append(mesure.duree_bdd)
+
+    tracemalloc.start()
+    try:
+        fonction()
+        pic_memoire = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    durees.sort()
+    return {
+        'statut': statut,
+        'mediane_ms': round(statistics.median(durees) * 1000, 3),
+        'p90_ms': round(durees[min(len(durees) - 1, int(0.9 * len(durees)))] * 1000, 3),
+        'min_ms': round(durees[0] * 1000, 3),
+        # Nombre de requêtes le plus élevé, celui comparé entre deux résultats
+        'requetes': max(requetes),
+        'requetes_min': min(requetes),
+        'requetes_max': max(requetes),
+        'bdd_ms': round(statistics.median(durees_bdd) * 1000, 3),
+        'memoire_pic_ko': round(pic_memoire / 1024, 1),
+        'taille_octets': taille,
+    }
+
+
+class Command(BaseCommand):
+    help = "Mesure les URLs et les exports de devis et écrit les résultats au format JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repetitions', type=int, default=5,
+                            help="Nombre d'appels chronométrés par mesure (défaut : 5)")
+        parser.add_argument('--utilisateur',
+                            help="Utilisateur connecté pour appeler les URLs (défaut : premier super-utilisateur)")
+        parser.add_argument('--filtre', action='append', default=[],
+                            help="Ne mesure que les clés contenant ce texte (répétable)")
+        parser.add_argument('--sortie',
+                            help="Fichier JSON des résultats (défaut : benchmark-<commit>.json)")
+        parser.add_argument('--comparer',
+                            help="Fichier JSON de résultats précédents à comparer")
+        parser.add_argument('--tolerance', type=float, default=10.0,
+                            help="Hausse du temps médian tolérée avant régression, en %% (défaut : 10)")
+        parser.add_argument('--echec-si-regression', action='store_true',
+                            help="Termine en erreur si une régression est détectée")
+
+    def handle(self, *args, **options):
+        if options['repetitions'] < 1:
+            raise CommandError("--repetitions doit être positif.")
+        devis = Devis.objects.select_related('client').order_by('numero').first()
+        if devis is None:
+            raise CommandError("Aucun devis en base : lancez d'abord generer_donnees.")
+
+        self.options = options
+        self.utilisateur = self.trouver_utilisateur(options['utilisateur'])
+        self.http = ClientHttp(HTTP_HOST=self.hote())
+        self.http.force_login(self.utilisateur)
+        gros_devis = (
+            Devis.objects.select_related('client')
+            .annotate(nombre_lignes=Count('lignes'))
+            .order_by('-nombre_lignes', 'pk')
+            .first()
+        )
+
+        commit, modifie = commit_git()
+        self.resultats = {}
+        self.mesurer_urls(devis)
+        self.mesurer_exports({'typique': devis, 'gros': gros_devis})
+
+        donnees = {
+            'meta': {
+                'commit': commit,
+                'arbre_modifie': modifie,
+                'date': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'base': connection.vendor,
+                'repetitions': options['repetitions'],
+                'donnees': {
+                    'clients': Client.objects.count(),
+                    'devis': Devis.objects.count(),
+                    'lignes_gros_devis': gros_devis.nombre_lignes,
+                },
+            },
+            'resultats': self.resultats,
+        }
+        sortie = options['sortie'] or f"benchmark-{(commit or 'inconnu')[:12]}.json"
+        with open(sortie, 'w', encoding='utf-8') as fichier:
+            json.dump(donnees, fichier, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {sortie}"))
+
+        if options['comparer']:
+            self.comparer(options['comparer'])
+
+    def trouver_utilisateur(self, nom):
+        if nom:
+            try:
+                return User.objects.get(username=nom)
+            except User.DoesNotExist:
+                raise CommandError(f"Utilisateur inconnu : {nom}")
+        utilisateur = User.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+        if utilisateur is None:
+            raise CommandError("Aucun super-utilisateur : précisez --utilisateur.")
+        return utilisateur
+
+    def hote(self):
+        """Retourne un nom d'hôte accepté par ALLOWED_HOSTS."""
+        for hote in settings.ALLOWED_HOSTS:
+            if hote != '*' and not hote.startswith('.'):
+                return hote
+        return 'localhost'
+
+    def selectionne(self, cle):
+        return not self.options['filtre'] or any(filtre in cle for filtre in self.options['filtre'])
+
+    def enregistrer(self, cle, fonction):
+        if not self.selectionne(cle):
+            return
+        resultat = mesurer(fonction, self.options['repetitions'])
+        self.resultats[cle] = resultat
+        requetes = str(resultat['requetes_max'])
+        if resultat['requetes_min'] != resultat['requetes_max']:
+            requetes = f"{resultat['requetes_min']}-{requetes}"
+        self.stdout.write(
+            f"{cle:<45} {resultat['statut'] or '-'!s:>5} {resultat['mediane_ms']:>10.1f} ms"
+            f" {requetes:>7} req. {resultat['memoire_pic_ko']:>10.0f} Ko"
+        )
+
+    def mesurer_urls(self, devis):
+        """Mesure chaque URL en GET, sans puis avec le cache Django."""
+        urls = list(self.urls(devis))
+        with override_settings(CACHES=SANS_CACHE):
+            for nom, url, donnees in urls:
+                self.enregistrer(f'url:{nom}', lambda url=url, donnees=donnees: self.appeler(url, donnees))
+        for nom, url, donnees in urls:
+            self.enregistrer(f'url:{nom}:cache', lambda url=url, donnees=donnees: self.appeler(url, donnees))
+
+    def urls(self, devis):
+        """
+        Liste les URLs mesurées.
+
+        Yields:
+            tuple: (nom de l'URL, URL, paramètres GET)
+        """
+        tache = TacheExport.objects.order_by('pk').first()
+        objets = {'client': devis.client_id, 'tache': tache.pk if tache else None}
+
+        for application in APPLICATIONS:
+            for motif in import_module(f'{application}.urls').urlpatterns:
+                nom = f'{application}:{motif.name}'
+                if nom in URLS_EXCLUES:
+                    continue
+                parametres = {}
+                for parametre in motif.pattern.converters:
+                    if parametre == 'format_export':
+                        parametres[parametre] = 'pdf'
+                    else:
+                        parametres[parametre] = objets.get(motif.name.split('_')[0], devis.pk)
+                if None in parametres.values():
+                    continue
+                url = reverse(nom, kwargs=parametres)
+                donnees = {'client': devis.client_id} if nom in URLS_PAR_CLIENT else {}
+                yield nom, url, donnees
+
+    def appeler(self, url, donnees):
+        """Appelle une URL et lit la réponse complète."""
+        reponse = self.http.get(url, donnees)
+        if reponse.streaming:
+            taille = sum(len(morceau) for morceau in reponse.streaming_content)
+        else:
+            taille = len(reponse.content)
+        reponse.close()
+        return reponse.status_code, taille
+
+    def mesurer_exports(self, devis_mesures):
+        """Mesure chaque moteur d'export sur les devis donnés, sans cache."""
+        for format_export, export in FORMATS.items():
+            for libelle, devis in devis_mesures.items():
+                def rendre(export=export, devis=devis):
+                    return None, len(export.rendre(devis, charger_lignes(devis)))
+                self.enregistrer(f'export:{format_export}:{libelle}', rendre)
+
+        client = devis_mesures['typique'].client
+        for disposition in ('plat', 'feuilles'):
+            def rendre(disposition=disposition):
+                contenu = rendre_classeur(devis_avec_lignes(client.devis.all()), disposition)
+                return None, len(contenu)
+            self.enregistrer(f'export:classeur:{disposition}', rendre)
+
+    def comparer(self, chemin):
+        """Compare les résultats à ceux d'un fichier précédent."""
+        with open(chemin, encoding='utf-8') as fichier:
+            precedent = json.load(fichier)
+        self.stdout.write(f"\nComparaison avec {chemin} (commit {precedent['meta'].get('commit')})")
+
+        regressions = []
+        for cle, resultat in self.resultats.items():
+            avant = precedent['resultats'].get(cle)
+            if avant is None:
+                continue
+            evolution = (resultat['mediane_ms'] / avant['mediane_ms'] - 1) * 100 if avant['mediane_ms'] else 0
+            requetes = resultat['requetes'] - avant['requetes']
+            regression = evolution > self.options['tolerance'] or requetes > 0
+            if regression:
+                regressions.append(cle)
+            ligne = (
+                f"{cle:<45} {avant['mediane_ms']:>10.1f} -> {resultat['mediane_ms']:>10.1f} ms"
+                f" ({evolution:+.1f} %), requêtes {requetes:+d}"
+            )
+            self.stdout.write(self.style.ERROR(ligne) if regression else ligne)
+
+        if regressions:
+            message = f"{len(regressions)} régression(s) détectée(s)."
+            if self.options['echec_si_regression']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("Aucune régression détectée."))
@@ -0,0 +1,148 @@
+"""
+Commande d'affichage des plans d'exécution des requêtes des vues.
+
+Chaque vue de liste, de détail et de recherche est appelée en GET par un
+utilisateur connecté, sur les données présentes en base (voir
+generer_donnees) ; les requêtes SQL qu'elle exécute sur les tables des
+clients et des devis sont relancées avec EXPLAIN (ANALYZE, BUFFERS) et leur
+plan est affiché. Les parcours séquentiels (Seq Scan) de ces tables sont
+signalés : sur un jeu de données volumineux, ils indiquent une requête
+qu'aucun index ne sert.
+
+Le cache est désactivé pendant les appels, afin que les requêtes masquées
+par les fragments de templates en cache (lignes d'un devis, devis d'un
+client) soient exécutées et expliquées.
+
+Usage :
+    python manage.py expliquer_requetes
+    python manage.py expliquer_requetes --filtre devis:devis_en_cours --sans-analyze
+    python manage.py expliquer_requetes --echec-si-sequentiel
+"""
+
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client as ClientHttp
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from devis.models import Devis
+
+# Tables dont les requêtes sont expliquées
+PREFIXES_TABLES = ('"clients_', '"devis_')
+
+# Parcours séquentiel d'une table des clients ou des devis
+PARCOURS_SEQUENTIEL = re.compile(r'Seq Scan on ((?:clients|devis)_\w+)')
+
+# Cache désactivé pendant les appels
+SANS_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = "Affiche le plan d'exécution (EXPLAIN ANALYZE) des requêtes de chaque vue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--utilisateur',
+                            help="Utilisateur connecté pour appeler les vues (défaut : premier super-utilisateur)")
+        parser.add_argument('--filtre', action='append', default=[],
+                            help="N'explique que les vues dont le nom contient ce texte (répétable)")
+        parser.add_argument('--sans-analyze', action='store_true',
+                            help="Affiche les plans estimés, sans exécuter les requêtes")
+        parser.add_argument('--echec-si-sequentiel', action='store_true',
+                            help="Termine en erreur si une table des clients ou des devis est parcourue en entier")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Les plans d'exécution sont lus avec EXPLAIN (ANALYZE) de PostgreSQL.")
+        devis = (
+            Devis.objects.select_related('client')
+            .annotate(nombre_lignes=Count('lignes'))
+            .order_by('-nombre_lignes', 'pk')
+            .first()
+        )
+        if devis is None:
+            raise CommandError("Aucun devis en base : lancez d'abord generer_donnees.")
+
+        self.options = options
+        self.explain = 'EXPLAIN (BUFFERS)' if options['sans_analyze'] else 'EXPLAIN (ANALYZE, BUFFERS)'
+        self.http = ClientHttp(HTTP_HOST='localhost')
+        self.http.force_login(self.trouver_utilisateur(options['utilisateur']))
+
+        sequentiels = []
+        with override_settings(CACHES=SANS_CACHE, ALLOWED_HOSTS=['localhost']):
+            for nom, arguments, parametres in self.vues(devis):
+                if self.options['filtre'] and not any(filtre in nom for filtre in self.options['filtre']):
+                    continue
+                sequentiels += [(nom, table) for table in self.expliquer(nom, arguments, parametres)]
+
+        if not sequentiels:
+            self.stdout.write(self.style.SUCCESS("Aucun parcours séquentiel des tables des clients et des devis."))
+            return
+        resume = ', '.join(f'{nom} ({table})' for nom, table in sequentiels)
+        if options['echec_si_sequentiel']:
+            raise CommandError(f"Parcours séquentiels : {resume}")
+        self.stdout.write(self.style.WARNING(f"Parcours séquentiels : {resume}"))
+
+    def trouver_utilisateur(self, nom):
+        if nom:
+            try:
+                return User.objects.get(username=nom)
+            except User.DoesNotExist:
+                raise CommandError(f"Utilisateur inconnu : {nom}")
+        utilisateur = User.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+        if utilisateur is None:
+            raise CommandError("Aucun super-utilisateur : précisez --utilisateur.")
+        return utilisateur
+
+    def vues(self, devis):
+        """
+        Retourne les vues expliquées, avec les formes de requêtes à vérifier.
+
+        Le devis de référence est celui qui compte le plus de lignes.
+
+        Returns:
+            list: (nom de l'URL, arguments de l'URL, paramètres GET)
+        """
+        return [
+            ('devis:devis_list', [], {}),
+            ('devis:devis_list', [], {'statut': devis.statut}),
+            ('devis:devis_list', [], {'client': devis.client_id}),
+            ('devis:devis_en_cours', [], {}),
+            ('devis:devis_termines', [], {}),
+            ('devis:devis_detail', [devis.pk], {}),
+            ('clients:client_list', [], {}),
+            ('clients:client_detail', [devis.client_id], {}),
+            # Début d'un numéro : recherche par préfixe
+            ('devis:recherche_suggestions', [], {'q': devis.numero[:8]}),
+        ]
+
+    def expliquer(self, nom, arguments, parametres):
+        """
+        Appelle une vue et affiche le plan de chacune de ses requêtes.
+
+        Returns:
+            list: Les tables parcourues séquentiellement
+        """
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.http.get(reverse(nom, args=arguments), parametres)
+        if reponse.status_code != 200:
+            raise CommandError(f"{nom} : réponse {reponse.status_code}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{nom} {parametres or ''}".rstrip()))
+        sequentiels = []
+        for requete in requetes:
+            sql = requete['sql']
+            if not sql.startswith('SELECT') or not any(prefixe in sql for prefixe in PREFIXES_TABLES):
+                continue
+            # Requête déjà interpolée par le pilote : exécutée sans paramètres
+            with connection.cursor() as curseur:
+                curseur.execute(f'{self.explain} {sql}')
+                plan = '\n'.join(ligne for ligne, in curseur.fetchall())
+            self.stdout.write(f"\n{sql}\n")
+            self.stdout.write(plan)
+            sequentiels += PARCOURS_SEQUENTIEL.findall(plan)
+        self.stdout.write('')
+        return sequentiels
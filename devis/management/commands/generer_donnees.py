@@ -0,0 +1,243 @@
+"""
+Commande de génération d'un jeu de données synthétique.
+
+Crée des clients, des devis et leurs lignes par insertions groupées
+(bulk_create), à l'échelle choisie, pour les mesures de performance
+(voir la commande benchmark). Les données sont reproductibles : une même
+graine produit les mêmes clients, devis et lignes.
+
+Les devis sont répartis sur les derniers mois et numérotés à la suite des
+compteurs existants, mis à jour à chaque lot ; les statistiques par client
+et, sous PostgreSQL, les agrégats mensuels sont reconstruits en fin de
+génération. Les insertions groupées
+ne déclenchent pas les signaux : les clients générés ne sont pas ajoutés
+au fichier CSV des clients.
+
+Les clients générés ont une adresse email en @DOMAINE, ce qui permet de
+les supprimer (avec leurs devis) par l'option --purger.
+
+Usage :
+    python manage.py generer_donnees --echelle 10k
+    python manage.py generer_donnees --echelle 1m --graine 7
+    python manage.py generer_donnees --devis 2500 --lignes-max 40
+    python manage.py generer_donnees --purger
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from clients.cache import invalider_clients
+from devis.analyses import rafraichir_agregats
+from devis.cache import invalider_devis
+from clients.models import Client
+from devis.models import CompteurDevis, Devis, LigneDevis
+from devis.numerotation import formater_numero
+from devis.statistiques import reconstruire_statistiques
+
+# Nombre de devis par échelle
+ECHELLES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+# Nombre de lignes par requête INSERT (PostgreSQL limite le nombre de paramètres)
+TAILLE_INSERTION = 2000
+
+# Domaine des adresses email des clients générés
+DOMAINE = 'exemple.test'
+
+# Répartition des statuts des devis générés
+STATUTS = ['brouillon', 'envoye', 'accepte', 'refuse']
+POIDS_STATUTS = [30, 30, 25, 15]
+
+PRESTATIONS = [
+    "Développement", "Intégration", "Maintenance", "Formation", "Audit",
+    "Hébergement", "Conception graphique", "Rédaction", "Support", "Conseil",
+]
+SOCIETES = ["Atelier", "Bureau", "Cabinet", "Garage", "Boulangerie", "Studio", "Agence", "Ferme"]
+VILLES = ["Fort-de-France", "Paris", "Lyon", "Marseille", "Lille", "Nantes", "Bordeaux", "Rennes"]
+
+
+@contextmanager
+def dates_imposees(*modeles):
+    """
+    Désactive auto_now_add sur date_creation pendant la génération, pour
+    que les insertions groupées conservent les dates générées.
+    """
+    champs = [modele._meta.get_field('date_creation') for modele in modeles]
+    for champ in champs:
+        champ.auto_now_add = False
+    try:
+        yield
+    finally:
+        for champ in champs:
+            champ.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Génère des clients, devis et lignes de devis synthétiques par insertions groupées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--echelle', choices=sorted(ECHELLES), default='10k',
+                            help="Nombre de devis à générer (défaut : 10k)")
+        parser.add_argument('--devis', type=int,
+                            help="Nombre exact de devis à générer (remplace --echelle)")
+        parser.add_argument('--clients', type=int,
+                            help="Nombre de clients (défaut : un pour dix devis)")
+        parser.add_argument('--lignes-max', type=int, default=10,
+                            help="Nombre maximal de lignes par devis (défaut : 10)")
+        parser.add_argument('--mois', type=int, default=24,
+                            help="Nombre de mois sur lesquels répartir les devis (défaut : 24)")
+        parser.add_argument('--graine', type=int, default=42,
+                            help="Graine du générateur aléatoire (défaut : 42)")
+        parser.add_argument('--lot', type=int, default=5000,
+                            help="Nombre de devis insérés par transaction (défaut : 5000)")
+        parser.add_argument('--utilisateur',
+                            help="Nom de l'utilisateur indiqué comme créateur des données")
+        parser.add_argument('--purger', action='store_true',
+                            help="Supprime les données générées au lieu d'en créer")
+
+    def handle(self, *args, **options):
+        if options['purger']:
+            nombre, _ = Client.objects.filter(email__endswith=f'@{DOMAINE}').delete()
+            invalider_clients()
+            invalider_devis()
+            self.rafraichir_agregats()
+            self.stdout.write(self.style.SUCCESS(f"{nombre} objet(s) supprimé(s)."))
+            return
+
+        nombre_devis = options['devis'] or ECHELLES[options['echelle']]
+        nombre_clients = options['clients'] or max(1, nombre_devis // 10)
+        if options['lignes_max'] < 1 or options['mois'] < 1 or options['lot'] < 1:
+            raise CommandError("--lignes-max, --mois et --lot doivent être positifs.")
+
+        utilisateur = None
+        if options['utilisateur']:
+            try:
+                utilisateur = User.objects.get(username=options['utilisateur'])
+            except User.DoesNotExist:
+                raise CommandError(f"Utilisateur inconnu : {options['utilisateur']}")
+
+        self.aleatoire = random.Random(options['graine'])
+        self.maintenant = timezone.now()
+        self.duree = timedelta(days=30 * options['mois'])
+        debut = time.perf_counter()
+
+        with dates_imposees(Client, Devis):
+            clients = self.creer_clients(nombre_clients, utilisateur)
+            nombre_lignes = self.creer_devis(nombre_devis, clients, utilisateur, options)
+
+        reconstruire_statistiques()
+        invalider_clients()
+        invalider_devis()
+        self.rafraichir_agregats()
+        self.stdout.write(self.style.SUCCESS(
+            f"{nombre_clients} client(s), {nombre_devis} devis et {nombre_lignes} ligne(s) "
+            f"générés en {time.perf_counter() - debut:.1f} s."
+        ))
+
+    def rafraichir_agregats(self):
+        """Rafraîchit les agrégats mensuels (vue matérialisée PostgreSQL uniquement)."""
+        if connection.vendor == 'postgresql':
+            rafraichir_agregats(concurrent=False)
+
+    def date_aleatoire(self):
+        return self.maintenant - self.duree * self.aleatoire.random()
+
+    def creer_clients(self, nombre, utilisateur):
+        """Crée les clients et retourne leurs identifiants."""
+        premier = Client.objects.filter(email__endswith=f'@{DOMAINE}').count()
+        clients = [
+            Client(
+                nom=f"{self.aleatoire.choice(SOCIETES)} {numero:07d}",
+                email=f"client{numero}@{DOMAINE}",
+                téléphone=f"0{self.aleatoire.randint(100000000, 799999999)}",
+                adresse=f"{self.aleatoire.randint(1, 200)} rue des Tests\n{self.aleatoire.choice(VILLES)}",
+                date_creation=self.date_aleatoire(),
+                cree_par=utilisateur,
+            )
+            for numero in range(premier + 1, premier + nombre + 1)
+        ]
+        with transaction.atomic():
+            clients = Client.objects.bulk_create(clients, batch_size=TAILLE_INSERTION)
+        self.stdout.write(f"{len(clients)} client(s) créé(s).")
+        return [client.pk for client in clients]
+
+    def creer_devis(self, nombre, clients, utilisateur, options):
+        """
+        Crée les devis et leurs lignes, lot par lot.
+
+        Returns:
+            int: Le nombre de lignes créées
+        """
+        # Numérotation à la suite des compteurs existants, par période
+        derniers = dict(CompteurDevis.objects.values_list('periode', 'dernier_numero'))
+        nombre_lignes = 0
+
+        for debut_lot in range(0, nombre, options['lot']):
+            taille = min(options['lot'], nombre - debut_lot)
+            dates = sorted(self.date_aleatoire() for _ in range(taille))
+            devis, lignes_par_devis = [], []
+
+            for date_creation in dates:
+                periode = date_creation.strftime('%Y%m')
+                derniers[periode] = derniers.get(periode, 0) + 1
+                lignes = [self.ligne_aleatoire() for _ in range(self.aleatoire.randint(1, options['lignes_max']))]
+                devis.append(Devis(
+                    numero=formater_numero(periode, derniers[periode]),
+                    client_id=self.aleatoire.choice(clients),
+                    date_creation=date_creation,
+                    date_validite=date_creation.date() + timedelta(days=30),
+                    montant_ht=sum((ligne.montant for ligne in lignes), Decimal('0')),
+                    conditions_paiement="Paiement à 30 jours",
+                    statut=self.aleatoire.choices(STATUTS, POIDS_STATUTS)[0],
+                    cree_par=utilisateur,
+                ))
+                lignes_par_devis.append(lignes)
+
+            with transaction.atomic():
+                devis = Devis.objects.bulk_create(devis, batch_size=TAILLE_INSERTION)
+                for un_devis, lignes in zip(devis, lignes_par_devis):
+                    for ligne in lignes:
+                        ligne.devis_id = un_devis.pk
+                lignes = [ligne for lignes in lignes_par_devis for ligne in lignes]
+                LigneDevis.objects.bulk_create(lignes, batch_size=TAILLE_INSERTION)
+                self.mettre_a_jour_compteurs(derniers)
+
+            nombre_lignes += len(lignes)
+            self.stdout.write(f"{debut_lot + taille}/{nombre} devis créés.")
+        return nombre_lignes
+
+    def ligne_aleatoire(self):
+        """Construit une ligne de devis non enregistrée."""
+        quantite = self.aleatoire.randint(1, 20)
+        prix_unitaire = Decimal(self.aleatoire.randint(500, 150000)) / 100
+        return LigneDevis(
+            description=f"{self.aleatoire.choice(PRESTATIONS)} - lot {self.aleatoire.randint(1, 999)}",
+            quantite=quantite,
+            prix_unitaire=prix_unitaire,
+            montant=quantite * prix_unitaire,
+        )
+
+    def mettre_a_jour_compteurs(self, derniers):
+        """Reporte les derniers numéros attribués dans les compteurs mensuels."""
+        existants = set(CompteurDevis.objects.values_list('periode', flat=True))
+        CompteurDevis.objects.bulk_create([
+            CompteurDevis(periode=periode, dernier_numero=0)
+            for periode in derniers if periode not in existants
+        ])
+        for periode, dernier in derniers.items():
+            CompteurDevis.objects.filter(periode=periode).update(
+                dernier_numero=Greatest(F('dernier_numero'), dernier)
+            )
@@ -0,0 +1,40 @@
+"""
+Commande de rafraîchissement des agrégats mensuels des devis.
+
+Recalcule la vue matérialisée devis_agregats_mensuels, lue par le tableau de
+bord des analyses (voir devis/analyses.py). Par défaut, le rafraîchissement
+est concurrent : les lectures du tableau de bord ne sont pas bloquées.
+À planifier à intervalle régulier, par exemple toutes les heures :
+
+    0 * * * * python manage.py rafraichir_agregats
+
+Usage :
+    python manage.py rafraichir_agregats
+    python manage.py rafraichir_agregats --bloquant
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from devis.analyses import rafraichir_agregats
+from devis.models import AgregatMensuel
+
+
+class Command(BaseCommand):
+    help = "Rafraîchit la vue matérialisée des agrégats mensuels des devis"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bloquant', action='store_true',
+                            help="Rafraîchissement non concurrent : plus rapide, mais bloque les lectures")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Les agrégats mensuels nécessitent PostgreSQL.")
+
+        debut = time.perf_counter()
+        rafraichir_agregats(concurrent=not options['bloquant'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{AgregatMensuel.objects.count()} agrégat(s) rafraîchi(s) en {time.perf_counter() - debut:.1f} s."
+        ))
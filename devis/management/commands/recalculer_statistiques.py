@@ -0,0 +1,23 @@
+"""
+Commande de reconstruction des statistiques de devis par client.
+
+Recalcule entièrement la table StatistiquesClient à partir des devis,
+par exemple après un import de masse ou pour corriger une dérive.
+
+Usage :
+    python manage.py recalculer_statistiques
+"""
+
+from django.core.management.base import BaseCommand
+
+from devis.statistiques import reconstruire_statistiques
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les statistiques de devis de tous les clients"
+
+    def handle(self, *args, **options):
+        nombre = reconstruire_statistiques()
+        self.stdout.write(self.style.SUCCESS(
+            f"Statistiques reconstruites pour {nombre} client(s)."
+        ))
@@ -0,0 +1,66 @@
+"""
+Commande de relance et de purge des tâches d'export.
+
+Reprend d'abord les tâches restées en cours plus de DEVIS_EXPORTS_DELAI_MAX
+secondes (processus d'export arrêté pendant le rendu), puis relance les
+tâches en attente (par exemple après l'arrêt du processus web qui devait les
+exécuter) et attend leur fin. Avec --purger, supprime aussi les tâches
+terminées ou en échec plus anciennes que le nombre de jours indiqué, ainsi
+que leurs fichiers.
+
+La commande est à planifier (cron, timer systemd), par exemple toutes les
+dix minutes.
+
+Usage :
+    python manage.py relancer_exports
+    python manage.py relancer_exports --purger 7
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from devis.exports.taches import get_executeur, lancer_tache, reprendre_taches_bloquees
+from devis.models import TacheExport
+
+
+class Command(BaseCommand):
+    help = "Relance les tâches d'export en attente et purge les anciennes tâches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--purger', type=int, metavar='JOURS',
+            help="Supprime les tâches terminées depuis plus de JOURS jours"
+        )
+
+    def handle(self, *args, **options):
+        if options['purger'] is not None:
+            limite = timezone.now() - timedelta(days=options['purger'])
+            anciennes = TacheExport.objects.filter(
+                statut__in=['termine', 'echec'], date_creation__lt=limite
+            )
+            nombre = 0
+            for tache in anciennes.iterator():
+                if tache.fichier:
+                    tache.fichier.delete(save=False)
+                tache.delete()
+                nombre += 1
+            self.stdout.write(f"{nombre} tâche(s) purgée(s).")
+
+        reprises, echecs = reprendre_taches_bloquees()
+        if reprises or echecs:
+            self.stdout.write(
+                f"{reprises} tâche(s) bloquée(s) remise(s) en attente, {echecs} en échec."
+            )
+
+        en_attente = list(TacheExport.objects.filter(statut='en_attente').values_list('pk', flat=True))
+        for tache_id in en_attente:
+            lancer_tache(tache_id)
+        if en_attente:
+            get_executeur().shutdown(wait=True)
+
+        termine = TacheExport.objects.filter(pk__in=en_attente, statut='termine').count()
+        self.stdout.write(self.style.SUCCESS(
+            f"{termine}/{len(en_attente)} tâche(s) relancée(s) avec succès."
+        ))
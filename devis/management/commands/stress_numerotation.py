@@ -0,0 +1,121 @@
+"""
+Commande de test de charge de la numérotation des devis.
+
+Lance plusieurs workers en parallèle qui créent des devis simultanément,
+puis vérifie qu'aucun numéro n'a été attribué deux fois et affiche le débit
+par tranche de créations, pour contrôler qu'il reste stable lorsque le
+nombre de devis du mois augmente.
+
+Les devis sont réellement créés dans la base configurée et consomment des
+numéros du mois en cours : supprimés en fin de commande, ils laissent un
+trou dans la numérotation. La commande est donc réservée aux bases de test
+et exige l'option --je-sais. L'unicité des numéros sous créations
+concurrentes est vérifiée par les tests (devis/tests/test_numerotation.py),
+sur la base de test.
+
+Usage :
+    python manage.py stress_numerotation --je-sais --workers 8 --devis 500
+"""
+
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection
+
+from clients.models import Client
+from devis.models import Devis
+
+
+class Command(BaseCommand):
+    help = "Crée des devis en parallèle et vérifie l'unicité et le débit de la numérotation"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help="Nombre de workers simultanés (défaut : 8)")
+        parser.add_argument('--devis', type=int, default=200,
+                            help="Nombre de devis créés par worker (défaut : 200)")
+        parser.add_argument('--tranche', type=int, default=200,
+                            help="Taille des tranches pour le calcul du débit (défaut : 200)")
+        parser.add_argument('--conserver', action='store_true',
+                            help="Conserve les devis créés au lieu de les supprimer")
+        parser.add_argument('--je-sais', action='store_true',
+                            help="Confirme que la base n'est pas une base de production")
+
+    def handle(self, *args, **options):
+        if not options['je_sais']:
+            raise CommandError(
+                "Cette commande consomme des numéros de devis du mois en cours : "
+                "à lancer uniquement sur une base de test, avec --je-sais."
+            )
+        if connection.vendor == 'sqlite':
+            raise CommandError("SQLite ne supporte pas les écritures concurrentes ; utilisez PostgreSQL.")
+
+        nb_workers = options['workers']
+        nb_devis = options['devis']
+        client = Client.objects.create(
+            nom='Test de charge numérotation',
+            email='stress@example.com',
+            téléphone='0000000000',
+        )
+
+        numeros = []
+        horodatages = []
+        erreurs = []
+        verrou = threading.Lock()
+        depart = threading.Barrier(nb_workers)
+
+        def worker():
+            try:
+                depart.wait()
+                for _ in range(nb_devis):
+                    try:
+                        devis = Devis.objects.create(client=client, conditions_paiement='30 jours')
+                    except IntegrityError as e:
+                        with verrou:
+                            erreurs.append(str(e))
+                        continue
+                    with verrou:
+                        numeros.append(devis.numero)
+                        horodatages.append(time.perf_counter())
+            finally:
+                connection.close()
+
+        debut = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(nb_workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.perf_counter() - debut
+
+        try:
+            self._rapport(numeros, horodatages, erreurs, debut, duree, options['tranche'])
+        finally:
+            if not options['conserver']:
+                client.delete()
+
+        if erreurs or len(set(numeros)) != len(numeros):
+            raise CommandError("Des collisions de numérotation ont été détectées.")
+
+    def _rapport(self, numeros, horodatages, erreurs, debut, duree, tranche):
+        """Affiche le bilan des collisions et le débit par tranche de créations."""
+        doublons = [numero for numero, nombre in Counter(numeros).items() if nombre > 1]
+
+        self.stdout.write(f"Devis créés : {len(numeros)} en {duree:.2f} s "
+                          f"({len(numeros) / duree:.0f} devis/s)")
+        self.stdout.write(f"Erreurs d'intégrité : {len(erreurs)}")
+        self.stdout.write(f"Numéros en double : {len(doublons)}")
+
+        self.stdout.write("Débit par tranche :")
+        precedent = debut
+        horodatages = sorted(horodatages)
+        for fin in range(tranche, len(horodatages) + 1, tranche):
+            instant = horodatages[fin - 1]
+            self.stdout.write(f"  devis {fin - tranche + 1:>6} à {fin:>6} : "
+                              f"{tranche / (instant - precedent):.0f} devis/s")
+            precedent = instant
+
+        if not erreurs and not doublons:
+            self.stdout.write(self.style.SUCCESS("Aucune collision de numérotation."))
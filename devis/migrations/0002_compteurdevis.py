@@ -0,0 +1,49 @@
+import re
+
+from django.db import migrations, models
+
+
+def initialiser_compteurs(apps, schema_editor):
+    """
+    Initialise les compteurs mensuels à partir des numéros déjà attribués,
+    pour que la numérotation reprenne après le plus grand numéro existant.
+    """
+    Devis = apps.get_model('devis', 'Devis')
+    CompteurDevis = apps.get_model('devis', 'CompteurDevis')
+    motif = re.compile(r'^DEV-(\d{6})-(\d+)$')
+
+    derniers = {}
+    for numero in Devis.objects.filter(numero__startswith='DEV-').values_list('numero', flat=True).iterator():
+        correspondance = motif.match(numero)
+        if correspondance:
+            periode, sequence = correspondance.group(1), int(correspondance.group(2))
+            derniers[periode] = max(derniers.get(periode, 0), sequence)
+
+    CompteurDevis.objects.bulk_create([
+        CompteurDevis(periode=periode, dernier_numero=dernier)
+        for periode, dernier in derniers.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devis', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurDevis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periode', models.CharField(help_text='Période du compteur au format YYYYMM', max_length=6, unique=True, verbose_name='Période')),
+                ('dernier_numero', models.PositiveIntegerField(default=0, help_text='Dernier numéro séquentiel attribué sur la période', verbose_name='Dernier numéro')),
+            ],
+            options={
+                'verbose_name': 'Compteur de devis',
+                'verbose_name_plural': 'Compteurs de devis',
+                'ordering': ['-periode'],
+            },
+        ),
+        migrations.RunPython(initialiser_compteurs, migrations.RunPython.noop),
+    ]
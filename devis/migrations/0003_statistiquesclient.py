@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Round
+
+
+def calculer_statistiques(apps, schema_editor):
+    """
+    Calcule les statistiques des clients à partir des devis existants.
+    """
+    Devis = apps.get_model('devis', 'Devis')
+    StatistiquesClient = apps.get_model('devis', 'StatistiquesClient')
+    accepte = Q(statut='accepte')
+
+    lignes = (
+        Devis.objects.order_by()
+        .values('client_id')
+        .annotate(
+            nb_brouillon=Count('id', filter=Q(statut='brouillon')),
+            nb_envoye=Count('id', filter=Q(statut='envoye')),
+            nb_accepte=Count('id', filter=accepte),
+            nb_refuse=Count('id', filter=Q(statut='refuse')),
+            montant_accepte_ht=Sum('montant_ht', filter=accepte, default=Decimal('0')),
+            montant_accepte_ttc=Sum(
+                Round(F('montant_ht') * Decimal('1.20'), precision=2),
+                filter=accepte,
+                default=Decimal('0'),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+    )
+    StatistiquesClient.objects.bulk_create(
+        [StatistiquesClient(**ligne) for ligne in lignes.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0008_remove_montant_ttc_field'),
+        ('devis', '0002_compteurdevis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistiquesClient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nb_brouillon', models.IntegerField(default=0, verbose_name='Devis en brouillon')),
+                ('nb_envoye', models.IntegerField(default=0, verbose_name='Devis envoyés')),
+                ('nb_accepte', models.IntegerField(default=0, verbose_name='Devis acceptés')),
+                ('nb_refuse', models.IntegerField(default=0, verbose_name='Devis refusés')),
+                ('montant_accepte_ht', models.DecimalField(decimal_places=2, default=0, help_text='Montant HT cumulé des devis acceptés', max_digits=14, verbose_name='Montant HT accepté')),
+                ('montant_accepte_ttc', models.DecimalField(decimal_places=2, default=0, help_text='Montant TTC cumulé des devis acceptés', max_digits=14, verbose_name='Montant TTC accepté')),
+                ('client', models.OneToOneField(help_text='Client concerné par les statistiques', on_delete=django.db.models.deletion.CASCADE, related_name='statistiques', to='clients.client', verbose_name='Client')),
+            ],
+            options={
+                'verbose_name': 'Statistiques client',
+                'verbose_name_plural': 'Statistiques clients',
+            },
+        ),
+        migrations.RunPython(calculer_statistiques, migrations.RunPython.noop),
+    ]
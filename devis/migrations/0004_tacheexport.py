@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devis', '0003_statistiquesclient'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TacheExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('pdf', 'PDF'), ('excel', 'Excel'), ('word', 'Word')], help_text='Format du document exporté', max_length=10, verbose_name='Format')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('termine', 'Terminée'), ('echec', 'Échec')], default='en_attente', help_text="État d'avancement de la tâche", max_length=20, verbose_name='Statut')),
+                ('fichier', models.FileField(blank=True, help_text='Document produit par la tâche', upload_to='exports/%Y/%m/', verbose_name='Fichier')),
+                ('erreur', models.TextField(blank=True, help_text="Message d'erreur en cas d'échec", verbose_name='Erreur')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, help_text="Date et heure de la demande d'export", verbose_name='Date de création')),
+                ('date_fin', models.DateTimeField(blank=True, help_text="Date et heure de fin d'exécution", null=True, verbose_name='Date de fin')),
+                ('cree_par', models.ForeignKey(help_text="Utilisateur ayant demandé l'export", null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Créé par')),
+                ('devis', models.ForeignKey(help_text='Devis à exporter', on_delete=django.db.models.deletion.CASCADE, related_name='taches_export', to='devis.devis', verbose_name='Devis')),
+            ],
+            options={
+                'verbose_name': "Tâche d'export",
+                'verbose_name_plural': "Tâches d'export",
+                'ordering': ['-date_creation'],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:04
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Vecteurs de recherche des devis (numéro, notes) et des lignes (description),
+# recalculés à chaque écriture de ces champs
+CREER_TRIGGERS = """
+CREATE OR REPLACE FUNCTION devis_devis_recherche() RETURNS trigger AS $$
+BEGIN
+    NEW.recherche :=
+        setweight(to_tsvector('simple', coalesce(NEW.numero, '')), 'A') ||
+        setweight(to_tsvector('simple', unaccent(coalesce(NEW.notes, ''))), 'C');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER devis_devis_recherche
+    BEFORE INSERT OR UPDATE OF numero, notes ON devis_devis
+    FOR EACH ROW EXECUTE FUNCTION devis_devis_recherche();
+
+CREATE OR REPLACE FUNCTION devis_lignedevis_recherche() RETURNS trigger AS $$
+BEGIN
+    NEW.recherche := to_tsvector('simple', unaccent(coalesce(NEW.description, '')));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER devis_lignedevis_recherche
+    BEFORE INSERT OR UPDATE OF description ON devis_lignedevis
+    FOR EACH ROW EXECUTE FUNCTION devis_lignedevis_recherche();
+
+UPDATE devis_devis SET numero = numero;
+UPDATE devis_lignedevis SET description = description;
+"""
+
+SUPPRIMER_TRIGGERS = """
+DROP TRIGGER IF EXISTS devis_devis_recherche ON devis_devis;
+DROP FUNCTION IF EXISTS devis_devis_recherche();
+DROP TRIGGER IF EXISTS devis_lignedevis_recherche ON devis_lignedevis;
+DROP FUNCTION IF EXISTS devis_lignedevis_recherche();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0009_recherche'),
+        ('devis', '0004_tacheexport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='devis',
+            name='recherche',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lignedevis',
+            name='recherche',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREER_TRIGGERS, SUPPRIMER_TRIGGERS),
+        migrations.AddIndex(
+            model_name='devis',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['recherche'], name='devis_recherche_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='devis',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['numero'], name='devis_numero_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='lignedevis',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['recherche'], name='lignedevis_recherche_gin'),
+        ),
+    ]
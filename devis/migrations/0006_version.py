@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devis', '0005_recherche'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='devis',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True, help_text='Date et heure de la dernière modification', verbose_name='Date de modification'),
+        ),
+        migrations.AddField(
+            model_name='devis',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Incrémentée à chaque modification du devis ou de ses lignes', verbose_name='Version'),
+        ),
+    ]
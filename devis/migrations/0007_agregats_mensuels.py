@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Agrégats mensuels des devis par statut, client et créateur. Le mois est
+# celui de la date de création dans le fuseau horaire de l'application. La
+# clé id est dérivée des colonnes de regroupement : elle reste la même d'un
+# rafraîchissement à l'autre, et l'index unique qui la couvre permet le
+# rafraîchissement concurrent (REFRESH MATERIALIZED VIEW CONCURRENTLY).
+CREER_VUE = f"""
+CREATE MATERIALIZED VIEW devis_agregats_mensuels AS
+SELECT
+    concat_ws('-', to_char(mois, 'YYYYMM'), statut, client_id, cree_par_id) AS id,
+    mois, statut, client_id, cree_par_id, nombre, montant_ht
+FROM (
+    SELECT
+        date_trunc('month', date_creation AT TIME ZONE '{settings.TIME_ZONE}')::date AS mois,
+        statut,
+        client_id,
+        cree_par_id,
+        count(*)::integer AS nombre,
+        coalesce(sum(montant_ht), 0)::numeric(16, 2) AS montant_ht
+    FROM devis_devis
+    GROUP BY 1, 2, 3, 4
+) AS agregats;
+
+CREATE UNIQUE INDEX devis_agregats_mensuels_id ON devis_agregats_mensuels (id);
+CREATE INDEX devis_agregats_mensuels_mois ON devis_agregats_mensuels (mois);
+CREATE INDEX devis_agregats_mensuels_client ON devis_agregats_mensuels (client_id, mois);
+CREATE INDEX devis_agregats_mensuels_cree_par ON devis_agregats_mensuels (cree_par_id, mois);
+"""
+
+SUPPRIMER_VUE = "DROP MATERIALIZED VIEW IF EXISTS devis_agregats_mensuels;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devis', '0006_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREER_VUE, SUPPRIMER_VUE),
+        migrations.CreateModel(
+            name='AgregatMensuel',
+            fields=[
+                ('id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('mois', models.DateField(verbose_name='Mois')),
+                ('statut', models.CharField(choices=[('brouillon', 'Brouillon'), ('envoye', 'Envoyé'), ('accepte', 'Accepté'), ('refuse', 'Refusé')], max_length=20, verbose_name='Statut')),
+                ('nombre', models.IntegerField(verbose_name='Nombre de devis')),
+                ('montant_ht', models.DecimalField(decimal_places=2, max_digits=16, verbose_name='Montant HT')),
+            ],
+            options={
+                'verbose_name': 'Agrégat mensuel',
+                'verbose_name_plural': 'Agrégats mensuels',
+                'db_table': 'devis_agregats_mensuels',
+                'ordering': ['mois'],
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:15
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Index créés et supprimés sans verrouiller les tables en écriture
+    # (CREATE/DROP INDEX CONCURRENTLY, impossible dans une transaction)
+    atomic = False
+
+    dependencies = [
+        ('clients', '0011_version'),
+        ('devis', '0007_agregats_mensuels'),
+    ]
+
+    operations = [
+        # Nouveaux index, créés avant la suppression des index qu'ils remplacent
+        AddIndexConcurrently(
+            model_name='devis',
+            index=models.Index(fields=['-date_creation', '-id'], name='devis_date_id'),
+        ),
+        AddIndexConcurrently(
+            model_name='devis',
+            index=models.Index(fields=['statut', '-date_creation', '-id'], name='devis_statut_date'),
+        ),
+        AddIndexConcurrently(
+            model_name='devis',
+            index=models.Index(fields=['client', '-date_creation', '-id'], name='devis_client_date'),
+        ),
+        AddIndexConcurrently(
+            model_name='devis',
+            index=models.Index(condition=models.Q(('statut__in', ['brouillon', 'envoye'])), fields=['-date_creation', '-id'], name='devis_en_cours_date'),
+        ),
+        AddIndexConcurrently(
+            model_name='devis',
+            index=models.Index(condition=models.Q(('statut__in', ['accepte', 'refuse'])), fields=['-date_creation', '-id'], name='devis_termines_date'),
+        ),
+        AddIndexConcurrently(
+            model_name='devis',
+            index=models.Index(fields=['numero'], name='devis_numero_prefixe', opclasses=['varchar_pattern_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='lignedevis',
+            index=models.Index(fields=['devis', 'id'], name='lignedevis_devis_id'),
+        ),
+        # Index devenus redondants : numero (contrainte d'unicité), date_creation
+        # et statut (préfixes des index composites), clés étrangères client et devis
+        RemoveIndexConcurrently(
+            model_name='devis',
+            name='devis_devis_numero_eb145b_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='devis',
+            name='devis_devis_date_cr_43b26d_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='devis',
+            name='devis_devis_statut_a30d19_idx',
+        ),
+        migrations.AlterField(
+            model_name='devis',
+            name='client',
+            field=models.ForeignKey(db_index=False, help_text='Client concerné par le devis', on_delete=django.db.models.deletion.CASCADE, related_name='devis', to='clients.client', verbose_name='Client'),
+        ),
+        migrations.AlterField(
+            model_name='lignedevis',
+            name='devis',
+            field=models.ForeignKey(db_index=False, help_text='Devis parent', on_delete=django.db.models.deletion.CASCADE, related_name='lignes', to='devis.devis', verbose_name='Devis'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devis', '0008_index_composites'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tacheexport',
+            name='date_debut',
+            field=models.DateTimeField(blank=True, help_text='Date et heure du début de la dernière exécution', null=True, verbose_name='Date de début'),
+        ),
+        migrations.AddField(
+            model_name='tacheexport',
+            name='tentatives',
+            field=models.PositiveSmallIntegerField(default=0, help_text="Nombre d'exécutions commencées", verbose_name='Tentatives'),
+        ),
+    ]
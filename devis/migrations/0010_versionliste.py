@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devis', '0009_tacheexport_reprise'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionListe',
+            fields=[
+                ('nom', models.CharField(help_text="Nom de l'ensemble de données versionné", max_length=20, primary_key=True, serialize=False, verbose_name='Nom')),
+                ('valeur', models.BigIntegerField(default=0, help_text='Version courante, incrémentée à chaque modification', verbose_name='Valeur')),
+            ],
+            options={
+                'verbose_name': 'Version de liste',
+                'verbose_name_plural': 'Versions de liste',
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Fuseau horaire du mois de création des devis. Il est fixé dans le SQL de
+# la vue et non lu dans les paramètres (la migration 0007 utilisait
+# settings.TIME_ZONE) : la vue est la même dans tous les environnements.
+# Changer de fuseau demande une nouvelle migration qui recrée la vue.
+FUSEAU = 'Europe/Paris'
+
+RECREER_VUE = f"""
+DROP MATERIALIZED VIEW IF EXISTS devis_agregats_mensuels;
+
+CREATE MATERIALIZED VIEW devis_agregats_mensuels AS
+SELECT
+    concat_ws('-', to_char(mois, 'YYYYMM'), statut, client_id, cree_par_id) AS id,
+    mois, statut, client_id, cree_par_id, nombre, montant_ht
+FROM (
+    SELECT
+        date_trunc('month', date_creation AT TIME ZONE '{FUSEAU}')::date AS mois,
+        statut,
+        client_id,
+        cree_par_id,
+        count(*)::integer AS nombre,
+        coalesce(sum(montant_ht), 0)::numeric(16, 2) AS montant_ht
+    FROM devis_devis
+    GROUP BY 1, 2, 3, 4
+) AS agregats;
+
+CREATE UNIQUE INDEX devis_agregats_mensuels_id ON devis_agregats_mensuels (id);
+CREATE INDEX devis_agregats_mensuels_mois ON devis_agregats_mensuels (mois);
+CREATE INDEX devis_agregats_mensuels_client ON devis_agregats_mensuels (client_id, mois);
+CREATE INDEX devis_agregats_mensuels_cree_par ON devis_agregats_mensuels (cree_par_id, mois);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0011_version'),
+        ('devis', '0010_versionliste'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # En arrière, la vue reste dans le fuseau fixé ici : c'est aussi
+        # celui des paramètres du projet
+        migrations.RunSQL(RECREER_VUE, migrations.RunSQL.noop),
+        # Modèle non géré : seul l'état des migrations est modifié, les
+        # colonnes client_id et cree_par_id étant fournies par la vue
+        migrations.AddField(
+            model_name='agregatmensuel',
+            name='client',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='clients.client', verbose_name='Client'),
+        ),
+        migrations.AddField(
+            model_name='agregatmensuel',
+            name='cree_par',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Créé par'),
+        ),
+    ]
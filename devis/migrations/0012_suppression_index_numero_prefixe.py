@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Index supprimé sans verrouiller la table en écriture
+    # (DROP INDEX CONCURRENTLY, impossible dans une transaction)
+    atomic = False
+
+    dependencies = [
+        ('devis', '0011_agregats_mensuels_fuseau'),
+    ]
+
+    operations = [
+        # Index créé par la migration 0008, redondant avec l'index
+        # varchar_pattern_ops de la contrainte d'unicité du numéro
+        RemoveIndexConcurrently(
+            model_name='devis',
+            name='devis_numero_prefixe',
+        ),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
-from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from clients.models import Client
 from datetime import timedelta
 from django.utils import timezone
@@ -21,6 +22,11 @@ def get_default_numero():
     year_month = timezone.now().strftime('%Y%m')
     return f'DEV-{year_month}-0001'
 
+# Statuts des listes de devis en cours et terminés (chacune servie par un index partiel)
+STATUTS_EN_COURS = ['brouillon', 'envoye']
+STATUTS_TERMINES = ['accepte', 'refuse']
+
+
 class Devis(models.Model):
     """
     Modèle représentant un devis dans le système.
@@ -39,6 +45,10 @@ class Devis(models.Model):
         notes (TextField): Notes additionnelles sur le devis
         statut (CharField): État du devis (brouillon, envoyé, accepté, refusé)
         cree_par (ForeignKey): Utilisateur ayant créé le devis
+        version (int): Version du devis, incrémentée à chaque modification
+                       du devis ou de ses lignes
+        date_modification (DateTimeField): Date et heure de la dernière modification
+        recherche (SearchVectorField): Vecteur de recherche plein texte
     """
     
     # Choix possibles pour le statut du devis
@@ -62,6 +72,8 @@ class Devis(models.Model):
         Client,
         on_delete=models.CASCADE,
         related_name='devis',
+        # Index composite (client, date_creation) déclaré dans Meta.indexes
+        db_index=False,
         verbose_name="Client",
         help_text="Client concerné par le devis"
     )
@@ -115,42 +127,98 @@ class Devis(models.Model):
         help_text="Utilisateur ayant créé le devis"
     )
     
+    # Version du devis, pour les requêtes conditionnelles et le cache des
+    # fragments (voir generateur_de_devis/conditionnel.py). Les lignes
+    # modifiées recalculent le montant du devis, ce qui l'enregistre.
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="Version",
+        help_text="Incrémentée à chaque modification du devis ou de ses lignes"
+    )
+    date_modification = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de modification",
+        help_text="Date et heure de la dernière modification"
+    )
+    
+    # Vecteur de recherche (numéro, notes), calculé par un trigger PostgreSQL
+    # à chaque écriture (voir devis/recherche.py)
+    recherche = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         """Métadonnées du modèle"""
         verbose_name = "Devis"
         verbose_name_plural = "Devis"
         ordering = ['-date_creation']  # Tri par date de création décroissante
+        # Index alignés sur les requêtes des listes, toutes triées par
+        # (-date_creation, -id) : pagination par curseur, filtres par statut
+        # ou par client, listes des devis en cours et terminés
         indexes = [
-            models.Index(fields=['numero']),
-            models.Index(fields=['date_creation']),
-            models.Index(fields=['statut']),
+            models.Index(fields=['-date_creation', '-id'], name='devis_date_id'),
+            models.Index(fields=['statut', '-date_creation', '-id'], name='devis_statut_date'),
+            models.Index(fields=['client', '-date_creation', '-id'], name='devis_client_date'),
+            models.Index(
+                fields=['-date_creation', '-id'],
+                condition=models.Q(statut__in=STATUTS_EN_COURS),
+                name='devis_en_cours_date',
+            ),
+            models.Index(
+                fields=['-date_creation', '-id'],
+                condition=models.Q(statut__in=STATUTS_TERMINES),
+                name='devis_termines_date',
+            ),
+            # Recherche plein texte et recherche approchée (pg_trgm)
+            GinIndex(fields=['recherche'], name='devis_recherche_gin'),
+            GinIndex(fields=['numero'], name='devis_numero_trgm', opclasses=['gin_trgm_ops']),
         ]
     
     def __str__(self):
         """Représentation textuelle du devis"""
         return f"Devis {self.numero} - {self.client.nom}"
     
+    def etat_statistiques(self):
+        """
+        Retourne le triplet (client_id, statut, montant_ht) pris en compte
+        dans les statistiques clients, ou None si l'un des champs n'est pas chargé.
+        """
+        champs = ('client_id', 'statut', 'montant_ht')
+        if any(champ not in self.__dict__ for champ in champs):
+            return None
+        return tuple(self.__dict__[champ] for champ in champs)
+    
     def save(self, *args, **kwargs):
         """
         Surcharge de la méthode save pour générer automatiquement le numéro de devis
-        si celui-ci n'existe pas encore.
+        si celui-ci n'existe pas encore, et incrémenter la version du devis
+        à chaque modification.
+        
+        L'enregistrement et la mise à jour des statistiques clients (signaux
+        pre_save et post_save) forment une seule transaction : l'état
+        précédent du devis y est lu sous verrou (voir devis/signals.py).
         """
+        with transaction.atomic():
+            self._enregistrer(*args, **kwargs)
+    
+    def _enregistrer(self, *args, **kwargs):
+        """Attribue le numéro, incrémente la version et enregistre le devis."""
         if not self.numero:
-            # Format: DEV-YYYYMM-XXXX où XXXX est un numéro séquentiel
-            year_month = timezone.now().strftime('%Y%m')
-            last_devis = Devis.objects.filter(
-                numero__startswith=f'DEV-{year_month}'
-            ).order_by('-numero').first()
-            
-            if last_devis:
-                last_num = int(last_devis.numero.split('-')[-1])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-                
-            self.numero = f'DEV-{year_month}-{new_num:04d}'
+            # Format: DEV-YYYYMM-XXXX où XXXX est attribué par le compteur mensuel
+            from .numerotation import attribuer_numero
+            self.numero = attribuer_numero()
+        
+        modification = not self._state.adding
+        if modification:
+            # Incrément réalisé par la base : deux enregistrements simultanés
+            # ne peuvent pas écrire la même version
+            self.version = models.F('version') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version', 'date_modification'}
         
         super().save(*args, **kwargs)
+        if modification:
+            self.refresh_from_db(fields=['version'])
     
     @property
     def montant_ttc(self):
@@ -160,6 +228,141 @@ class Devis(models.Model):
         """
         return self.montant_ht * Decimal('1.20')
 
+class CompteurDevis(models.Model):
+    """
+    Modèle représentant le compteur mensuel des numéros de devis.
+    
+    Une ligne par période (mois) conserve le dernier numéro attribué.
+    L'incrément se fait en base sous verrou de ligne, ce qui évite
+    les doublons lorsque plusieurs devis sont créés simultanément.
+    
+    Attributs:
+        periode (str): Période au format YYYYMM
+        dernier_numero (int): Dernier numéro séquentiel attribué sur la période
+    """
+    
+    periode = models.CharField(
+        max_length=6,
+        unique=True,
+        verbose_name="Période",
+        help_text="Période du compteur au format YYYYMM"
+    )
+    dernier_numero = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Dernier numéro",
+        help_text="Dernier numéro séquentiel attribué sur la période"
+    )
+    
+    class Meta:
+        """Métadonnées du modèle"""
+        verbose_name = "Compteur de devis"
+        verbose_name_plural = "Compteurs de devis"
+        ordering = ['-periode']
+    
+    def __str__(self):
+        """Représentation textuelle du compteur"""
+        return f"{self.periode} : {self.dernier_numero}"
+
+class VersionListe(models.Model):
+    """
+    Modèle représentant la version d'un ensemble de données affiché par des
+    pages de liste (devis, clients).
+    
+    Les ETag des listes et les clés des fragments mis en cache sont dérivés
+    de ces versions (voir devis/cache.py et clients/cache.py). Elles sont
+    conservées en base et non dans le cache Django : une modification faite
+    par un processus web est vue par tous les autres, quel que soit le
+    backend de cache.
+    
+    Attributs:
+        nom (str): Nom de l'ensemble de données ('devis', 'clients')
+        valeur (int): Version courante, incrémentée à chaque modification
+    """
+    
+    nom = models.CharField(
+        max_length=20,
+        primary_key=True,
+        verbose_name="Nom",
+        help_text="Nom de l'ensemble de données versionné"
+    )
+    valeur = models.BigIntegerField(
+        default=0,
+        verbose_name="Valeur",
+        help_text="Version courante, incrémentée à chaque modification"
+    )
+    
+    class Meta:
+        """Métadonnées du modèle"""
+        verbose_name = "Version de liste"
+        verbose_name_plural = "Versions de liste"
+    
+    def __str__(self):
+        """Représentation textuelle de la version"""
+        return f"{self.nom} : {self.valeur}"
+
+class StatistiquesClient(models.Model):
+    """
+    Modèle représentant les statistiques de devis d'un client.
+    
+    Ces compteurs sont dénormalisés : ils sont tenus à jour de façon
+    incrémentale à chaque création, modification ou suppression de devis
+    (voir devis/statistiques.py), ce qui permet de les lire en une seule
+    requête. La commande recalculer_statistiques les reconstruit entièrement.
+    
+    Attributs:
+        client (OneToOneField): Client concerné
+        nb_brouillon (int): Nombre de devis en brouillon
+        nb_envoye (int): Nombre de devis envoyés
+        nb_accepte (int): Nombre de devis acceptés
+        nb_refuse (int): Nombre de devis refusés
+        montant_accepte_ht (Decimal): Montant HT cumulé des devis acceptés
+        montant_accepte_ttc (Decimal): Montant TTC cumulé des devis acceptés
+    """
+    
+    client = models.OneToOneField(
+        Client,
+        on_delete=models.CASCADE,
+        related_name='statistiques',
+        verbose_name="Client",
+        help_text="Client concerné par les statistiques"
+    )
+    
+    # Nombre de devis par statut
+    nb_brouillon = models.IntegerField(default=0, verbose_name="Devis en brouillon")
+    nb_envoye = models.IntegerField(default=0, verbose_name="Devis envoyés")
+    nb_accepte = models.IntegerField(default=0, verbose_name="Devis acceptés")
+    nb_refuse = models.IntegerField(default=0, verbose_name="Devis refusés")
+    
+    # Montants cumulés des devis acceptés
+    montant_accepte_ht = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name="Montant HT accepté",
+        help_text="Montant HT cumulé des devis acceptés"
+    )
+    montant_accepte_ttc = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name="Montant TTC accepté",
+        help_text="Montant TTC cumulé des devis acceptés"
+    )
+    
+    class Meta:
+        """Métadonnées du modèle"""
+        verbose_name = "Statistiques client"
+        verbose_name_plural = "Statistiques clients"
+    
+    def __str__(self):
+        """Représentation textuelle des statistiques"""
+        return f"Statistiques de {self.client_id}"
+    
+    @property
+    def nombre_devis(self):
+        """Nombre total de devis du client."""
+        return self.nb_brouillon + self.nb_envoye + self.nb_accepte + self.nb_refuse
+
 class LigneDevis(models.Model):
     """
     Modèle représentant une ligne dans un devis.
@@ -173,6 +376,7 @@ class LigneDevis(models.Model):
         quantite (IntegerField): Quantité commandée
         prix_unitaire (DecimalField): Prix unitaire hors taxes
         montant (DecimalField): Montant total de la ligne (quantité * prix unitaire)
+        recherche (SearchVectorField): Vecteur de recherche plein texte
     """
     
     # Relations
@@ -180,6 +384,8 @@ class LigneDevis(models.Model):
         Devis,
         on_delete=models.CASCADE,
         related_name='lignes',
+        # Index composite (devis, id) déclaré dans Meta.indexes
+        db_index=False,
         verbose_name="Devis",
         help_text="Devis parent"
     )
@@ -209,11 +415,20 @@ class LigneDevis(models.Model):
         help_text="Montant total de la ligne (calculé automatiquement)"
     )
     
+    # Vecteur de recherche (description), calculé par un trigger PostgreSQL
+    # à chaque écriture (voir devis/recherche.py)
+    recherche = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         """Métadonnées du modèle"""
         verbose_name = "Ligne de devis"
         verbose_name_plural = "Lignes de devis"
         ordering = ['id']  # Tri par ordre d'ajout
+        indexes = [
+            # Lignes d'un devis dans l'ordre d'ajout
+            models.Index(fields=['devis', 'id'], name='lignedevis_devis_id'),
+            GinIndex(fields=['recherche'], name='lignedevis_recherche_gin'),
+        ]
     
     def __str__(self):
         """Représentation textuelle de la ligne de devis"""
@@ -230,6 +445,176 @@ class LigneDevis(models.Model):
         # Sauvegarde de la ligne
         super().save(*args, **kwargs)
         
-        # Mise à jour du montant total du devis
-        self.devis.montant_ht = sum(ligne.montant for ligne in self.devis.lignes.all())
-        self.devis.save()
+        # Mise à jour du montant total du devis (agrégat calculé en base)
+        from .services import recalculer_montant_ht
+        recalculer_montant_ht(self.devis)
+    
+    def delete(self, *args, **kwargs):
+        """
+        Surcharge de la méthode delete pour mettre à jour le montant total
+        (et la version) du devis après la suppression de la ligne.
+        """
+        resultat = super().delete(*args, **kwargs)
+        from .services import recalculer_montant_ht
+        recalculer_montant_ht(self.devis)
+        return resultat
+
+class TacheExport(models.Model):
+    """
+    Modèle représentant une tâche d'export de devis exécutée en arrière-plan.
+    
+    La tâche est créée par la requête web puis exécutée par le pool de
+    processus d'export (voir devis/exports/taches.py). Le document produit
+    est enregistré dans le champ fichier et téléchargé une fois la tâche
+    terminée.
+    
+    Attributs:
+        devis (ForeignKey): Devis à exporter
+        format (str): Format du document (pdf, excel, word)
+        statut (str): État de la tâche (en attente, en cours, terminée, échec)
+        fichier (FileField): Document produit
+        erreur (str): Message d'erreur en cas d'échec
+        cree_par (ForeignKey): Utilisateur ayant demandé l'export
+        date_creation (DateTimeField): Date de la demande
+        date_debut (DateTimeField): Date du début de la dernière exécution
+        tentatives (int): Nombre d'exécutions commencées
+        date_fin (DateTimeField): Date de fin d'exécution
+    """
+    
+    FORMAT_CHOICES = [
+        ('pdf', 'PDF'),
+        ('excel', 'Excel'),
+        ('word', 'Word'),
+    ]
+    
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminée'),
+        ('echec', 'Échec'),
+    ]
+    
+    devis = models.ForeignKey(
+        Devis,
+        on_delete=models.CASCADE,
+        related_name='taches_export',
+        verbose_name="Devis",
+        help_text="Devis à exporter"
+    )
+    format = models.CharField(
+        max_length=10,
+        choices=FORMAT_CHOICES,
+        verbose_name="Format",
+        help_text="Format du document exporté"
+    )
+    statut = models.CharField(
+        max_length=20,
+        choices=STATUT_CHOICES,
+        default='en_attente',
+        verbose_name="Statut",
+        help_text="État d'avancement de la tâche"
+    )
+    fichier = models.FileField(
+        upload_to='exports/%Y/%m/',
+        blank=True,
+        verbose_name="Fichier",
+        help_text="Document produit par la tâche"
+    )
+    erreur = models.TextField(
+        blank=True,
+        verbose_name="Erreur",
+        help_text="Message d'erreur en cas d'échec"
+    )
+    cree_par = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        verbose_name="Créé par",
+        help_text="Utilisateur ayant demandé l'export"
+    )
+    date_creation = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date de création",
+        help_text="Date et heure de la demande d'export"
+    )
+    date_debut = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Date de début",
+        help_text="Date et heure du début de la dernière exécution"
+    )
+    tentatives = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Tentatives",
+        help_text="Nombre d'exécutions commencées"
+    )
+    date_fin = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Date de fin",
+        help_text="Date et heure de fin d'exécution"
+    )
+    
+    class Meta:
+        """Métadonnées du modèle"""
+        verbose_name = "Tâche d'export"
+        verbose_name_plural = "Tâches d'export"
+        ordering = ['-date_creation']
+    
+    def __str__(self):
+        """Représentation textuelle de la tâche"""
+        return f"Export {self.format} du devis {self.devis_id} ({self.statut})"
+
+class AgregatMensuel(models.Model):
+    """
+    Agrégats mensuels des devis, par statut, client et créateur.
+    
+    Ce modèle est en lecture seule : il est adossé à la vue matérialisée
+    PostgreSQL devis_agregats_mensuels (migration 0007), rafraîchie par la
+    commande rafraichir_agregats. Les tableaux de bord (voir devis/analyses.py)
+    ne lisent que ces agrégats, jamais la table des devis.
+    
+    Attributs:
+        id (str): Clé de l'agrégat (mois-statut-client-créateur), stable
+                  d'un rafraîchissement à l'autre
+        mois (DateField): Premier jour du mois de création des devis, à
+                          l'heure de Paris (voir la migration 0011)
+        statut (str): Statut des devis
+        client (ForeignKey): Client des devis
+        cree_par (ForeignKey): Utilisateur ayant créé les devis
+        nombre (int): Nombre de devis
+        montant_ht (Decimal): Montant HT cumulé des devis
+    """
+    
+    id = models.CharField(max_length=64, primary_key=True)
+    mois = models.DateField(verbose_name="Mois")
+    statut = models.CharField(max_length=20, choices=Devis.STATUT_CHOICES, verbose_name="Statut")
+    client = models.ForeignKey(
+        Client,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name="Client"
+    )
+    cree_par = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='+',
+        verbose_name="Créé par"
+    )
+    nombre = models.IntegerField(verbose_name="Nombre de devis")
+    montant_ht = models.DecimalField(max_digits=16, decimal_places=2, verbose_name="Montant HT")
+    
+    class Meta:
+        """Métadonnées du modèle"""
+        managed = False
+        db_table = 'devis_agregats_mensuels'
+        verbose_name = "Agrégat mensuel"
+        verbose_name_plural = "Agrégats mensuels"
+        ordering = ['mois']
+    
+    def __str__(self):
+        """Représentation textuelle de l'agrégat"""
+        return f"{self.mois:%Y-%m} {self.statut} client {self.client_id} : {self.nombre} devis"
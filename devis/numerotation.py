@@ -0,0 +1,114 @@
+"""
+Numérotation des devis.
+
+Ce module attribue les numéros de devis au format DEV-YYYYMM-XXXX.
+Le numéro séquentiel est fourni par un backend interchangeable, configuré
+via le paramètre DEVIS_NUMEROTATION_BACKEND (chemin Python pointé).
+
+Le backend par défaut s'appuie sur la table CompteurDevis : une ligne par
+mois, incrémentée en base sous verrou de ligne. L'attribution coûte donc
+un nombre constant de requêtes, quel que soit le nombre de devis du mois,
+et deux créations simultanées ne peuvent pas obtenir le même numéro.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+BACKEND_PAR_DEFAUT = 'devis.numerotation.CompteurBaseDeDonnees'
+
+
+class BaseNumerotation:
+    """
+    Classe de base des backends de numérotation.
+
+    Un backend doit fournir la méthode prochain_numero(periode), qui retourne
+    le prochain numéro séquentiel (entier) pour la période donnée (YYYYMM).
+    """
+
+    def prochain_numero(self, periode):
+        raise NotImplementedError(
+            "Les backends de numérotation doivent implémenter prochain_numero()"
+        )
+
+
+class CompteurBaseDeDonnees(BaseNumerotation):
+    """
+    Backend de numérotation s'appuyant sur la table CompteurDevis.
+
+    Le compteur de la période est verrouillé (select_for_update) puis
+    incrémenté avec une expression F() : l'incrément est réalisé par la base
+    et la transaction sérialise les attributions concurrentes.
+    """
+
+    def prochain_numero(self, periode):
+        from .models import CompteurDevis
+
+        with transaction.atomic():
+            compteur = self._verrouiller(CompteurDevis, periode)
+            CompteurDevis.objects.filter(pk=compteur.pk).update(
+                dernier_numero=F('dernier_numero') + 1
+            )
+            return compteur.dernier_numero + 1
+
+    def _verrouiller(self, modele, periode):
+        """
+        Retourne le compteur de la période, verrouillé jusqu'à la fin de la
+        transaction. Le compteur est créé au premier devis du mois ; si deux
+        transactions le créent en même temps, la perdante relit celui de l'autre.
+        """
+        compteurs = modele.objects.select_for_update()
+        try:
+            return compteurs.get(periode=periode)
+        except modele.DoesNotExist:
+            pass
+
+        try:
+            with transaction.atomic():
+                return modele.objects.create(periode=periode)
+        except IntegrityError:
+            return compteurs.get(periode=periode)
+
+
+@lru_cache(maxsize=None)
+def _charger_backend(chemin):
+    """Instancie une seule fois le backend configuré."""
+    return import_string(chemin)()
+
+
+def get_backend():
+    """
+    Retourne le backend de numérotation configuré dans les paramètres.
+    """
+    chemin = getattr(settings, 'DEVIS_NUMEROTATION_BACKEND', BACKEND_PAR_DEFAUT)
+    return _charger_backend(chemin)
+
+
+def periode_courante():
+    """
+    Retourne la période courante au format YYYYMM.
+    """
+    return timezone.now().strftime('%Y%m')
+
+
+def formater_numero(periode, sequence):
+    """
+    Construit un numéro de devis à partir d'une période et d'un numéro séquentiel.
+    """
+    return f'DEV-{periode}-{sequence:04d}'
+
+
+def attribuer_numero(periode=None):
+    """
+    Attribue le prochain numéro de devis pour la période donnée
+    (la période courante par défaut).
+
+    Returns:
+        str: Numéro au format DEV-YYYYMM-XXXX
+    """
+    periode = periode or periode_courante()
+    return formater_numero(periode, get_backend().prochain_numero(periode))
@@ -0,0 +1,156 @@
+"""
+Pagination par curseur (keyset) de la liste des devis.
+
+Au lieu de sauter N lignes avec OFFSET, chaque page est repérée par le
+couple (date_creation, id) de sa première ou dernière ligne : la page
+suivante est lue avec une condition « strictement avant ce couple » sur
+l'ordre (-date_creation, -id). Le coût d'une page ne dépend donc pas de sa
+position dans la liste, et le COUNT(*) du Paginator n'est exécuté que si
+le total est explicitement demandé.
+
+La condition est une comparaison de lignes SQL, (date_creation, id) < (d, i),
+et non son équivalent « date_creation < d OR (date_creation = d AND id < i) » :
+PostgreSQL n'utilise la comparaison de lignes comme borne d'un parcours de
+l'index (date_creation, id), au lieu de filtrer toutes les lignes qui
+précèdent le curseur, que sous cette forme.
+"""
+
+import base64
+import binascii
+
+from django.db.models import F, Field, Func, Value
+from django.utils.dateparse import parse_datetime
+
+# Nombre de devis affichés par page
+DEVIS_PAR_PAGE = 10
+
+
+class Ligne(Func):
+    """Valeur de ligne SQL (a, b), comparée élément par élément dans l'ordre."""
+
+    template = '(%(expressions)s)'
+    output_field = Field()
+
+
+def ligne_curseur(date, identifiant):
+    """Position (date_creation, id) d'un curseur, comparable à Ligne('date_creation', 'id')."""
+    return Ligne(Value(date), Value(identifiant))
+
+
+def encoder_curseur(devis):
+    """Encode la position (date_creation, id) d'un devis dans un curseur opaque."""
+    valeur = f'{devis.date_creation.isoformat()}|{devis.pk}'
+    return base64.urlsafe_b64encode(valeur.encode()).decode().rstrip('=')
+
+
+def decoder_curseur(curseur):
+    """
+    Décode un curseur produit par encoder_curseur().
+
+    Returns:
+        tuple: (date_creation, id), ou None si le curseur est invalide
+    """
+    if not curseur:
+        return None
+    try:
+        valeur = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4)).decode()
+        date, identifiant = valeur.split('|')
+        date = parse_datetime(date)
+        identifiant = int(identifiant)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return date, identifiant
+
+
+class PageCurseur:
+    """
+    Page de résultats obtenue par pagination par curseur.
+
+    Attributs:
+        object_list (list): Les devis de la page
+        has_next (bool): Une page suivante existe
+        has_previous (bool): Une page précédente existe
+        total (int): Nombre total de devis, ou None s'il n'a pas été demandé
+        parametres_suivants (str): Paramètres GET menant à la page suivante
+        parametres_precedents (str): Paramètres GET menant à la page précédente
+    """
+
+    def __init__(self, object_list, has_next, has_previous, parametres, total=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.total = total
+        self.parametres_suivants = ''
+        self.parametres_precedents = ''
+        if object_list:
+            self.parametres_suivants = self._parametres(parametres, 'apres', object_list[-1])
+            self.parametres_precedents = self._parametres(parametres, 'avant', object_list[0])
+
+    @staticmethod
+    def _parametres(parametres, sens, devis):
+        """Construit les paramètres GET (filtres conservés) vers une page voisine."""
+        parametres = parametres.copy()
+        parametres.pop('apres', None)
+        parametres.pop('avant', None)
+        parametres[sens] = encoder_curseur(devis)
+        return parametres.urlencode()
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginer_par_curseur(queryset, parametres, par_page=DEVIS_PAR_PAGE, compter=False):
+    """
+    Retourne une page de devis triés du plus récent au plus ancien.
+
+    La position est lue dans les paramètres GET : `apres` (page suivante) ou
+    `avant` (page précédente). Sans curseur valide, la première page est
+    retournée.
+
+    Args:
+        queryset: Les devis à paginer (filtres déjà appliqués)
+        parametres: Les paramètres GET de la requête
+        par_page: Nombre de devis par page
+        compter: Calcule aussi le nombre total de devis (COUNT(*))
+
+    Returns:
+        PageCurseur: La page demandée
+    """
+    total = queryset.count() if compter else None
+    queryset = queryset.alias(position=Ligne(F('date_creation'), F('id')))
+    apres = decoder_curseur(parametres.get('apres'))
+    avant = None if apres else decoder_curseur(parametres.get('avant'))
+
+    if avant:
+        date, identifiant = avant
+        lignes = list(
+            queryset.filter(position__gt=ligne_curseur(date, identifiant))
+            .order_by('date_creation', 'id')[:par_page + 1]
+        )
+        if lignes:
+            has_previous = len(lignes) > par_page
+            lignes = lignes[:par_page][::-1]
+            has_next = True
+            return PageCurseur(lignes, has_next, has_previous, parametres, total)
+        # Page précédente vide (curseur périmé) : renvoi à la première page,
+        # sans recompter le total
+        parametres = parametres.copy()
+        parametres.pop('avant', None)
+
+    if apres:
+        date, identifiant = apres
+        queryset = queryset.filter(position__lt=ligne_curseur(date, identifiant))
+    lignes = list(queryset.order_by('-date_creation', '-id')[:par_page + 1])
+    has_next = len(lignes) > par_page
+    lignes = lignes[:par_page]
+    has_previous = apres is not None
+
+    return PageCurseur(lignes, has_next, has_previous, parametres, total)
@@ -0,0 +1,174 @@
+"""
+Recherche dans les clients et les devis.
+
+Les vecteurs de recherche plein texte sont stockés dans une colonne
+« recherche » de chaque table, calculée par un trigger PostgreSQL à chaque
+écriture (migrations clients 0009 et devis 0005) et indexée par un index GIN :
+- clients : nom (poids A), email et téléphone (B), adresse (C) ;
+- devis : numéro (A) et notes (C), le numéro étant aussi cherché par
+  préfixe (index varchar_pattern_ops créé par Django avec la contrainte
+  d'unicité du numéro) ;
+- lignes de devis : description.
+
+Les textes sont indexés avec la configuration « simple » (sans
+racinisation, adaptée aux noms, emails et numéros) et sans accents
+(extension unaccent). Chaque mot recherché est un préfixe : « dup mar »
+trouve « Dupont Marie ».
+
+Lorsque la recherche plein texte trouve trop peu de clients ou de devis,
+elle est complétée par une recherche approchée (pg_trgm, index GIN
+gin_trgm_ops) sur le nom du client et le numéro du devis, qui tolère les
+fautes de frappe.
+"""
+
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Q
+
+from clients.models import Client
+
+from .models import Devis, LigneDevis
+
+# Configuration de recherche plein texte des vecteurs
+CONFIGURATION = 'simple'
+
+# Longueur minimale d'une recherche, et de la recherche approchée
+LONGUEUR_MIN = 2
+LONGUEUR_MIN_APPROCHEE = 3
+
+# Nombre maximal de mots pris en compte dans une recherche
+MOTS_MAX = 8
+
+LIMITE_SUGGESTIONS = 8
+LIMITE_RESULTATS = 50
+
+
+def normaliser(texte):
+    """Met un texte en minuscules et retire ses accents, comme unaccent()."""
+    decompose = unicodedata.normalize('NFKD', texte.lower())
+    return ''.join(caractere for caractere in decompose if not unicodedata.combining(caractere))
+
+
+def requete_prefixes(texte):
+    """
+    Construit la requête plein texte d'une recherche : chaque mot est un
+    préfixe et tous les mots doivent être présents.
+
+    Returns:
+        SearchQuery: La requête, ou None si le texte ne contient aucun mot
+    """
+    mots = re.findall(r'\w+', normaliser(texte))[:MOTS_MAX]
+    if not mots:
+        return None
+    # Les mots ne contiennent que des lettres, chiffres et « _ » : aucun
+    # opérateur tsquery ne peut y être injecté
+    return SearchQuery(' & '.join(f'{mot}:*' for mot in mots), search_type='raw', config=CONFIGURATION)
+
+
+def _completer(trouves, approches, limite):
+    """Complète une liste de résultats par des résultats approchés."""
+    if len(trouves) >= limite:
+        return trouves
+    deja_trouves = {objet.pk for objet in trouves}
+    for objet in approches[:limite]:
+        if objet.pk not in deja_trouves:
+            trouves.append(objet)
+            if len(trouves) >= limite:
+                break
+    return trouves
+
+
+def chercher_clients(texte, limite, classer=False):
+    """
+    Recherche des clients.
+
+    Args:
+        texte: Le texte recherché
+        limite: Le nombre maximal de clients retournés
+        classer: Trie par pertinence au lieu de l'ordre alphabétique
+                 (plus coûteux : toutes les correspondances sont classées)
+
+    Returns:
+        list: Les clients trouvés
+    """
+    requete = requete_prefixes(texte)
+    if requete is None:
+        return []
+    clients = Client.objects.filter(recherche=requete)
+    if classer:
+        clients = clients.annotate(rang=SearchRank(F('recherche'), requete)).order_by('-rang', 'nom')
+    else:
+        clients = clients.order_by('nom')
+    trouves = list(clients.defer('recherche')[:limite])
+
+    if len(texte) >= LONGUEUR_MIN_APPROCHEE:
+        approches = (
+            Client.objects.filter(nom__trigram_word_similar=texte)
+            .annotate(similarite=TrigramWordSimilarity(texte, 'nom'))
+            .order_by('-similarite')
+            .defer('recherche')
+        )
+        trouves = _completer(trouves, approches, limite)
+    return trouves
+
+
+def chercher_devis(texte, limite, lignes=False):
+    """
+    Recherche des devis, du plus récent au plus ancien.
+
+    Args:
+        texte: Le texte recherché
+        limite: Le nombre maximal de devis retournés
+        lignes: Cherche aussi dans la description des lignes
+
+    Returns:
+        list: Les devis trouvés, avec leur client
+    """
+    requete = requete_prefixes(texte)
+    if requete is None:
+        return []
+    # Numéro saisi depuis son début (« DEV-2024 ») : index devis_devis_numero_…_like
+    condition = Q(recherche=requete) | Q(numero__startswith=texte.strip().upper())
+    if lignes:
+        condition |= Q(pk__in=LigneDevis.objects.filter(recherche=requete).values('devis_id'))
+    devis = Devis.objects.select_related('client').defer('recherche', 'client__recherche')
+    trouves = list(devis.filter(condition).order_by('-date_creation', '-id')[:limite])
+
+    if len(texte) >= LONGUEUR_MIN_APPROCHEE:
+        approches = (
+            devis.filter(numero__trigram_word_similar=texte)
+            .annotate(similarite=TrigramWordSimilarity(texte, 'numero'))
+            .order_by('-similarite')
+        )
+        trouves = _completer(trouves, approches, limite)
+    return trouves
+
+
+def rechercher(texte, limite=LIMITE_RESULTATS):
+    """
+    Recherche complète, pour la page de résultats : clients classés par
+    pertinence, devis trouvés par leur numéro, leurs notes ou leurs lignes.
+
+    Returns:
+        dict: {'clients': [...], 'devis': [...]}
+    """
+    return {
+        'clients': chercher_clients(texte, limite, classer=True),
+        'devis': chercher_devis(texte, limite, lignes=True),
+    }
+
+
+def suggestions(texte, limite=LIMITE_SUGGESTIONS):
+    """
+    Recherche rapide, pour les suggestions pendant la saisie : clients par
+    ordre alphabétique, devis par leur numéro ou leurs notes.
+
+    Returns:
+        dict: {'clients': [...], 'devis': [...]}
+    """
+    return {
+        'clients': chercher_clients(texte, limite),
+        'devis': chercher_devis(texte, limite),
+    }
@@ -0,0 +1,259 @@
+"""
+Services métier de l'application devis.
+
+Ce module regroupe l'écriture des lignes de devis à partir des données
+postées par le formulaire. Les lignes sont validées en une passe, insérées
+en une seule requête (bulk_create) et le montant HT du devis est recalculé
+une seule fois par un agrégat en base, au lieu de la cascade de sauvegardes
+déclenchée par LigneDevis.save() pour chaque ligne.
+
+Lors d'une modification, les lignes soumises sont comparées aux lignes
+existantes grâce à leur identifiant : seules les lignes modifiées, ajoutées
+ou retirées donnent lieu à une écriture. De même, l'en-tête du devis n'est
+enregistré que si l'un de ses champs a changé (voir champs_modifies()).
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import Devis, LigneDevis
+
+# Nombre de lignes insérées par requête lors des insertions groupées
+TAILLE_LOT = 500
+
+# Champs d'une ligne comparés et mis à jour lors d'une modification
+CHAMPS_LIGNE = ['description', 'quantite', 'prix_unitaire', 'montant']
+
+# Champs de l'en-tête du devis saisis dans le formulaire
+CHAMPS_ENTETE = ['date_validite', 'conditions_paiement', 'notes']
+
+# Montant maximal représentable par les champs DecimalField(max_digits=10, decimal_places=2)
+MONTANT_MAX = Decimal('99999999.99')
+
+
+def lire_entete(donnees):
+    """
+    Lit et valide les champs de l'en-tête du devis postés par le formulaire.
+
+    Args:
+        donnees: Les données POST de la requête
+
+    Returns:
+        dict: Les champs de l'en-tête (date_validite, conditions_paiement, notes)
+
+    Raises:
+        ValidationError: Si la date de validité est absente ou invalide
+    """
+    date_validite = donnees.get('date_validite', '').strip()
+    if not date_validite:
+        raise ValidationError("La date de validité est requise.")
+    try:
+        date_validite = Devis._meta.get_field('date_validite').to_python(date_validite)
+    except ValidationError:
+        raise ValidationError("La date de validité est invalide.")
+
+    return {
+        'date_validite': date_validite,
+        'conditions_paiement': donnees.get('conditions_paiement', ''),
+        'notes': donnees.get('notes', ''),
+    }
+
+
+def champs_modifies(devis, entete):
+    """
+    Retourne les champs de l'en-tête dont la valeur soumise diffère de celle
+    du devis (des notes vides et absentes sont équivalentes).
+
+    Args:
+        devis: Le devis enregistré
+        entete: Les champs soumis (voir lire_entete()), et éventuellement le client
+
+    Returns:
+        list: Les noms des champs modifiés
+    """
+    modifies = []
+    for champ, valeur in entete.items():
+        actuelle = getattr(devis, champ)
+        if champ == 'notes':
+            actuelle, valeur = actuelle or '', valeur or ''
+        if actuelle != valeur:
+            modifies.append(champ)
+    return modifies
+
+
+def lire_lignes(donnees):
+    """
+    Lit et valide les lignes postées par le formulaire de devis.
+
+    Les champs description[], quantite[] et prix_unitaire[] sont lus en
+    parallèle, ainsi que ligne_id[] qui identifie les lignes déjà enregistrées
+    (vide pour une nouvelle ligne). Les lignes entièrement vides sont ignorées ;
+    toute autre ligne incomplète ou invalide est signalée.
+
+    Args:
+        donnees: Les données POST de la requête
+
+    Returns:
+        list: Les lignes validées, sous forme de dictionnaires
+              (id, description, quantite, prix_unitaire, montant)
+
+    Raises:
+        ValidationError: Si au moins une ligne est invalide, ou si le montant
+                         total des lignes dépasse MONTANT_MAX
+    """
+    descriptions = donnees.getlist('description[]')
+    quantites = donnees.getlist('quantite[]')
+    prix_unitaires = donnees.getlist('prix_unitaire[]')
+    identifiants = donnees.getlist('ligne_id[]')
+    identifiants += [''] * (len(descriptions) - len(identifiants))
+
+    lignes = []
+    erreurs = []
+    for numero, (identifiant, description, quantite, prix_unitaire) in enumerate(
+        zip(identifiants, descriptions, quantites, prix_unitaires), start=1
+    ):
+        description = description.strip()
+        if not (description or quantite or prix_unitaire):
+            continue
+
+        try:
+            ligne = _valider_ligne(description, quantite, prix_unitaire)
+        except ValidationError as e:
+            erreurs.append(f"Ligne {numero} : {e.messages[0]}")
+            continue
+        ligne['id'] = int(identifiant) if identifiant.isdigit() else None
+        lignes.append(ligne)
+
+    if erreurs:
+        raise ValidationError(erreurs)
+    # Les lignes soumises sont toutes les lignes du devis : leur somme est son montant HT
+    if sum(ligne['montant'] for ligne in lignes) > MONTANT_MAX:
+        raise ValidationError("Le montant total du devis est trop élevé.")
+    return lignes
+
+
+def _valider_ligne(description, quantite, prix_unitaire):
+    """Valide une ligne et calcule son montant."""
+    if not description:
+        raise ValidationError("la description est requise.")
+
+    try:
+        quantite = int(quantite)
+    except (TypeError, ValueError):
+        raise ValidationError("la quantité doit être un nombre entier.")
+    if quantite < 1:
+        raise ValidationError("la quantité doit être supérieure à 0.")
+
+    try:
+        prix_unitaire = Decimal(prix_unitaire).quantize(Decimal('0.01'))
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValidationError("le prix unitaire doit être un nombre.")
+    if not prix_unitaire.is_finite() or prix_unitaire < 0:
+        raise ValidationError("le prix unitaire doit être positif.")
+
+    montant = quantite * prix_unitaire
+    if prix_unitaire > MONTANT_MAX or montant > MONTANT_MAX:
+        raise ValidationError("le montant de la ligne est trop élevé.")
+
+    return {
+        'description': description,
+        'quantite': quantite,
+        'prix_unitaire': prix_unitaire,
+        'montant': montant,
+    }
+
+
+def creer_lignes(devis, lignes):
+    """
+    Insère les lignes d'un devis en une seule transaction puis recalcule
+    son montant HT.
+
+    Les lignes sont insérées par lots de TAILLE_LOT avec bulk_create, ce qui
+    contourne LigneDevis.save() : le montant de chaque ligne est donc fourni
+    par lire_lignes().
+
+    Args:
+        devis: Le devis auquel rattacher les lignes
+        lignes: Les lignes validées par lire_lignes()
+    """
+    with transaction.atomic():
+        LigneDevis.objects.bulk_create(
+            [_nouvelle_ligne(devis, ligne) for ligne in lignes],
+            batch_size=TAILLE_LOT,
+        )
+        recalculer_montant_ht(devis)
+
+
+def synchroniser_lignes(devis, lignes):
+    """
+    Met à jour les lignes d'un devis existant à partir des lignes soumises.
+
+    Les lignes soumises sont rapprochées des lignes existantes par leur
+    identifiant. Seules les lignes dont un champ a changé sont mises à jour
+    (bulk_update), les lignes sans identifiant connu sont insérées
+    (bulk_create) et les lignes absentes de la soumission sont supprimées.
+    Le montant HT n'est recalculé que si au moins une ligne a changé.
+
+    Args:
+        devis: Le devis à mettre à jour
+        lignes: Les lignes validées par lire_lignes()
+
+    Returns:
+        bool: True si au moins une ligne a été écrite ou supprimée
+    """
+    with transaction.atomic():
+        existantes = {
+            ligne.pk: ligne
+            for ligne in LigneDevis.objects.filter(devis=devis).only('id', *CHAMPS_LIGNE)
+        }
+
+        a_modifier = []
+        a_creer = []
+        conservees = set()
+        for ligne in lignes:
+            existante = existantes.get(ligne['id'])
+            if existante is None or existante.pk in conservees:
+                a_creer.append(_nouvelle_ligne(devis, ligne))
+                continue
+
+            conservees.add(existante.pk)
+            if any(getattr(existante, champ) != ligne[champ] for champ in CHAMPS_LIGNE):
+                for champ in CHAMPS_LIGNE:
+                    setattr(existante, champ, ligne[champ])
+                a_modifier.append(existante)
+
+        a_supprimer = existantes.keys() - conservees
+        if a_supprimer:
+            LigneDevis.objects.filter(pk__in=a_supprimer).delete()
+        if a_modifier:
+            LigneDevis.objects.bulk_update(a_modifier, CHAMPS_LIGNE, batch_size=TAILLE_LOT)
+        if a_creer:
+            LigneDevis.objects.bulk_create(a_creer, batch_size=TAILLE_LOT)
+
+        modifie = bool(a_supprimer or a_modifier or a_creer)
+        if modifie:
+            recalculer_montant_ht(devis)
+        return modifie
+
+
+def _nouvelle_ligne(devis, ligne):
+    """Construit une ligne non enregistrée à partir d'une ligne validée."""
+    return LigneDevis(devis=devis, **{champ: ligne[champ] for champ in CHAMPS_LIGNE})
+
+
+def recalculer_montant_ht(devis):
+    """
+    Recalcule le montant HT du devis par un agrégat sur ses lignes
+    et l'enregistre.
+
+    Raises:
+        ValidationError: Si le total dépasse MONTANT_MAX (le devis n'est pas modifié)
+    """
+    total = LigneDevis.objects.filter(devis=devis).aggregate(total=Sum('montant'))['total']
+    if total is not None and total > MONTANT_MAX:
+        raise ValidationError("Le montant total du devis est trop élevé.")
+    devis.montant_ht = total or Decimal('0')
+    devis.save(update_fields=['montant_ht'])
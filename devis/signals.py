@@ -0,0 +1,79 @@
+# devis/signals.py
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from clients.models import Client
+from .cache import invalider_devis
+from .models import Devis
+from .statistiques import appliquer_variation
+
+def marquer_pages_modifiees(clients):
+    """
+    Change la version des pages qui affichent un devis modifié : fiches des
+    clients et listes de devis. Les versions sont écrites dans la même
+    transaction que le devis : elles deviennent visibles en même temps que
+    les données qu'elles désignent, et sont annulées avec elles.
+    """
+    Client.marquer_modifies(clients)
+    invalider_devis()
+
+def lire_etat_verrouille(pk):
+    """
+    Lit l'état enregistré (client_id, statut, montant_ht) d'un devis en
+    verrouillant sa ligne jusqu'à la fin de la transaction.
+
+    L'état lu est celui de la base et non celui de l'instance chargée
+    auparavant : deux enregistrements simultanés du même devis sont
+    sérialisés, et le second calcule sa variation à partir de l'état écrit
+    par le premier. Les statistiques ne dérivent donc pas.
+    """
+    return Devis.objects.select_for_update().filter(pk=pk).values_list(
+        'client_id', 'statut', 'montant_ht'
+    ).first()
+
+@receiver(pre_save, sender=Devis)
+def memoriser_etat_devis(sender, instance, **kwargs):
+    """
+    Mémorise l'état enregistré d'un devis avant sa modification
+    (dans la transaction ouverte par Devis.save()).
+    """
+    instance._etat_initial = lire_etat_verrouille(instance.pk) if instance.pk else None
+
+@receiver(pre_delete, sender=Devis)
+def memoriser_etat_devis_supprime(sender, instance, **kwargs):
+    """
+    Mémorise l'état enregistré d'un devis supprimé (dans la transaction
+    ouverte par la suppression).
+    """
+    instance._etat_initial = lire_etat_verrouille(instance.pk)
+
+@receiver(post_save, sender=Devis)
+def mettre_a_jour_statistiques(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Répercute la création ou la modification d'un devis sur les statistiques
+    du client et sur la version des pages qui l'affichent.
+    """
+    avant = None if created else getattr(instance, '_etat_initial', None)
+    apres = instance.etat_statistiques()
+    if apres is None:
+        apres = Devis.objects.filter(pk=instance.pk).values_list(
+            'client_id', 'statut', 'montant_ht'
+        ).first()
+
+    # Les champs non enregistrés conservent leur valeur précédente en base
+    if avant is not None and apres is not None and update_fields is not None:
+        champs = ('client_id', 'statut', 'montant_ht')
+        apres = tuple(
+            nouveau if champ in update_fields or champ.removesuffix('_id') in update_fields else ancien
+            for champ, ancien, nouveau in zip(champs, avant, apres)
+        )
+
+    appliquer_variation(avant, apres)
+    # Fiches de l'ancien et du nouveau client du devis
+    marquer_pages_modifiees({instance.client_id, avant and avant[0]})
+
+@receiver(post_delete, sender=Devis)
+def retirer_des_statistiques(sender, instance, **kwargs):
+    """Retire un devis supprimé des statistiques et des pages de son client."""
+    appliquer_variation(getattr(instance, '_etat_initial', None), None, creer=False)
+    instance._etat_initial = None
+    marquer_pages_modifiees({instance.client_id})
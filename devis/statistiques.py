@@ -0,0 +1,121 @@
+"""
+Maintenance des statistiques de devis par client.
+
+Chaque devis contribue aux statistiques de son client selon son état
+(client, statut, montant HT). Lorsqu'un devis est créé, modifié ou supprimé,
+la contribution de l'ancien état est retirée et celle du nouvel état ajoutée,
+par une mise à jour incrémentale (expressions F()) de StatistiquesClient.
+
+Les mises à jour de masse (QuerySet.update(), bulk_create) ne déclenchent
+pas les signaux : après ce type d'opération, reconstruire les statistiques
+avec la commande recalculer_statistiques.
+"""
+
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Round
+
+from .models import Devis, StatistiquesClient
+
+# Taux de TVA appliqué au calcul des montants TTC (voir Devis.montant_ttc)
+TAUX_TTC = Decimal('1.20')
+
+# Correspondance entre statut de devis et compteur des statistiques
+COMPTEURS = {
+    'brouillon': 'nb_brouillon',
+    'envoye': 'nb_envoye',
+    'accepte': 'nb_accepte',
+    'refuse': 'nb_refuse',
+}
+
+
+def _contribution(variations, etat, signe):
+    """Ajoute (signe=1) ou retire (signe=-1) la contribution d'un état de devis."""
+    if etat is None:
+        return
+    client_id, statut, montant_ht = etat
+    compteur = COMPTEURS.get(statut)
+    if compteur is None:
+        return
+    variations[client_id][compteur] += signe
+    if statut == 'accepte':
+        montant_ht = Decimal(montant_ht or 0)
+        montant_ttc = (montant_ht * TAUX_TTC).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        variations[client_id]['montant_accepte_ht'] += signe * montant_ht
+        variations[client_id]['montant_accepte_ttc'] += signe * montant_ttc
+
+
+def appliquer_variation(avant, apres, creer=True):
+    """
+    Met à jour les statistiques clients pour un devis passé de l'état
+    `avant` à l'état `apres` (None pour un devis inexistant).
+
+    Args:
+        avant: État précédent (client_id, statut, montant_ht) ou None
+        apres: Nouvel état (client_id, statut, montant_ht) ou None
+        creer: Crée les statistiques du client si elles n'existent pas encore
+    """
+    if avant == apres:
+        return
+
+    variations = defaultdict(lambda: defaultdict(int))
+    _contribution(variations, avant, -1)
+    _contribution(variations, apres, 1)
+
+    for client_id, champs in variations.items():
+        champs = {champ: valeur for champ, valeur in champs.items() if valeur}
+        if not champs:
+            continue
+        expressions = {champ: F(champ) + valeur for champ, valeur in champs.items()}
+        statistiques = StatistiquesClient.objects.filter(client_id=client_id)
+        if statistiques.update(**expressions) or not creer:
+            continue
+        with transaction.atomic():
+            StatistiquesClient.objects.get_or_create(client_id=client_id)
+            statistiques.update(**expressions)
+
+
+def calculer_statistiques():
+    """
+    Calcule les statistiques de tous les clients en une seule requête agrégée.
+
+    Returns:
+        list: Les statistiques (non enregistrées) des clients ayant au moins un devis
+    """
+    accepte = Q(statut='accepte')
+    lignes = (
+        Devis.objects.order_by()
+        .values('client_id')
+        .annotate(
+            **{
+                compteur: Count('id', filter=Q(statut=statut))
+                for statut, compteur in COMPTEURS.items()
+            },
+            montant_accepte_ht=Sum('montant_ht', filter=accepte, default=Decimal('0')),
+            # Le TTC est arrondi devis par devis, comme dans appliquer_variation()
+            montant_accepte_ttc=Sum(
+                Round(F('montant_ht') * TAUX_TTC, precision=2),
+                filter=accepte,
+                default=Decimal('0'),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+    )
+    return [StatistiquesClient(**ligne) for ligne in lignes.iterator()]
+
+
+def reconstruire_statistiques():
+    """
+    Reconstruit entièrement les statistiques de tous les clients.
+
+    Returns:
+        int: Nombre de clients dont les statistiques ont été enregistrées
+    """
+    statistiques = calculer_statistiques()
+    with transaction.atomic():
+        StatistiquesClient.objects.all().delete()
+        StatistiquesClient.objects.bulk_create(statistiques, batch_size=1000)
+    return len(statistiques)
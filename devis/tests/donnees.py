@@ -0,0 +1,32 @@
+"""
+Données de test partagées par les tests de l'application devis.
+
+Les clients sont créés par insertion groupée (bulk_create) : les signaux
+ne sont pas déclenchés et le journal CSV des clients n'est pas modifié.
+"""
+
+from decimal import Decimal
+
+from clients.models import Client
+from devis.models import Devis, LigneDevis
+
+
+def creer_clients(nombre, prefixe='Test', cree_par=None):
+    """Crée `nombre` clients de test."""
+    return Client.objects.bulk_create([
+        Client(nom=f"{prefixe} {i}", email=f"{prefixe.lower()}{i}@exemple.test",
+               téléphone="0000000000", cree_par=cree_par)
+        for i in range(nombre)
+    ])
+
+
+def creer_devis(client, lignes=0, statut='brouillon', cree_par=None, prix=Decimal('10.00')):
+    """Crée un devis de test et ses `lignes` lignes à prix unitaire `prix`."""
+    devis = Devis.objects.create(
+        client=client, conditions_paiement="30 jours", statut=statut, cree_par=cree_par,
+    )
+    LigneDevis.objects.bulk_create([
+        LigneDevis(devis=devis, description=f"Ligne {k}", quantite=1, prix_unitaire=prix, montant=prix)
+        for k in range(lignes)
+    ])
+    return devis
@@ -0,0 +1,30 @@
+"""
+Tests des agrégats mensuels des devis (vue matérialisée PostgreSQL).
+"""
+
+import unittest
+from datetime import date, datetime, timezone as fuseau
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from devis.analyses import rafraichir_agregats
+from devis.models import AgregatMensuel, Devis
+
+from .donnees import creer_clients, creer_devis
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Vue matérialisée PostgreSQL")
+class AgregatsMensuelsTests(TestCase):
+    def test_mois_a_l_heure_de_paris_et_relations(self):
+        utilisateur = User.objects.create_user('analyste')
+        client = creer_clients(1)[0]
+        devis = creer_devis(client, cree_par=utilisateur)
+        # 31 janvier 23 h 30 UTC : 1er février à Paris
+        Devis.objects.filter(pk=devis.pk).update(date_creation=datetime(2024, 1, 31, 23, 30, tzinfo=fuseau.utc))
+        rafraichir_agregats(concurrent=False)
+
+        agregat = AgregatMensuel.objects.select_related('client', 'cree_par').get()
+        self.assertEqual(agregat.mois, date(2024, 2, 1))
+        self.assertEqual((agregat.client.nom, agregat.cree_par.username), (client.nom, 'analyste'))
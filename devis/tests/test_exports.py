@@ -0,0 +1,123 @@
+"""
+Tests des exports : rendu Excel des gros devis, reprise des tâches d'export
+et borne globale des rendus.
+"""
+
+import threading
+import unittest
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+import openpyxl
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from devis.exports import taches
+from devis.exports.excel import rendre_excel
+from devis.exports.lignes import LignesEnFlux, charger_lignes
+from devis.models import TacheExport
+
+from .donnees import creer_clients, creer_devis
+
+
+@override_settings(DEVIS_EXPORTS_SEUIL_GROS_DEVIS=50)
+class ExportExcelTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.devis = creer_devis(creer_clients(1)[0], lignes=300)
+
+    def test_gros_devis_lu_en_un_seul_parcours(self):
+        lignes = charger_lignes(self.devis)
+        self.assertIsInstance(lignes, LignesEnFlux)
+        with CaptureQueriesContext(connection) as requetes:
+            contenu = rendre_excel(self.devis, lignes)
+        lectures = [r for r in requetes if 'FROM "devis_lignedevis"' in r['sql']]
+        self.assertEqual(len(lectures), 1)
+
+        feuille = openpyxl.load_workbook(BytesIO(contenu)).active
+        descriptions = [ligne[0] for ligne in feuille.iter_rows(min_row=9, max_row=308, values_only=True)]
+        self.assertEqual(descriptions, [f"Ligne {k}" for k in range(300)])
+
+
+class RepriseTachesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.devis = creer_devis(creer_clients(1)[0])
+
+    def creer_tache(self, statut, depuis, tentatives=1):
+        return TacheExport.objects.create(
+            devis=self.devis, format='pdf', statut=statut, tentatives=tentatives,
+            date_debut=timezone.now() - timedelta(seconds=depuis),
+        )
+
+    @override_settings(DEVIS_EXPORTS_DELAI_MAX=600)
+    def test_taches_bloquees_remises_en_attente(self):
+        bloquee = self.creer_tache('en_cours', depuis=601)
+        recente = self.creer_tache('en_cours', depuis=60)
+        abandonnee = self.creer_tache('en_cours', depuis=601, tentatives=taches.TENTATIVES_MAX)
+        terminee = self.creer_tache('termine', depuis=3600)
+
+        self.assertEqual(taches.reprendre_taches_bloquees(), (1, 1))
+
+        statuts = dict(TacheExport.objects.values_list('pk', 'statut'))
+        self.assertEqual(statuts, {
+            bloquee.pk: 'en_attente', recente.pk: 'en_cours',
+            abandonnee.pk: 'echec', terminee.pk: 'termine',
+        })
+
+    def test_reservation_compte_les_tentatives(self):
+        tache = self.creer_tache('en_attente', depuis=0, tentatives=0)
+        with mock.patch.object(taches, 'obtenir_rendu', side_effect=RuntimeError("arrêt")), \
+                self.assertLogs('devis.exports.taches', 'ERROR'), \
+                mock.patch.object(taches, 'close_old_connections'):
+            taches.executer_tache(tache.pk)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives), ('echec', 1))
+        self.assertIsNotNone(tache.date_debut)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Verrous consultatifs PostgreSQL")
+@override_settings(DEVIS_EXPORTS_SIMULTANES=2)
+class PlacesDeRenduTests(TestCase):
+    def test_rendus_simultanes_bornes(self):
+        places = []
+        liberer = threading.Event()
+        occupees = threading.Barrier(3)
+
+        def occuper():
+            try:
+                places.append(taches._prendre_place())
+                occupees.wait()
+                liberer.wait()
+                taches._liberer_place(places[-1])
+            finally:
+                connection.close()
+
+        def attendre(obtenue):
+            try:
+                obtenue['place'] = taches._prendre_place()
+                taches._liberer_place(obtenue['place'])
+            finally:
+                connection.close()
+
+        occupants = [threading.Thread(target=occuper) for _ in range(2)]
+        for thread in occupants:
+            thread.start()
+        occupees.wait()
+        self.assertEqual(sorted(places), [0, 1])
+
+        obtenue = {}
+        with mock.patch.object(taches, 'ATTENTE_PLACE', 0.05):
+            suivant = threading.Thread(target=attendre, args=(obtenue,))
+            suivant.start()
+            suivant.join(0.5)
+            # Les deux places sont occupées : le rendu attend
+            self.assertTrue(suivant.is_alive())
+            liberer.set()
+            suivant.join(5)
+        for thread in occupants:
+            thread.join()
+        self.assertIn(obtenue.get('place'), (0, 1))
@@ -0,0 +1,70 @@
+"""
+Tests de la numérotation des devis.
+"""
+
+import threading
+import unittest
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from devis.models import CompteurDevis, Devis
+from devis.numerotation import attribuer_numero, formater_numero, periode_courante
+
+from .donnees import creer_clients
+
+
+class NumerotationTests(TestCase):
+    def test_numeros_consecutifs_par_periode(self):
+        self.assertEqual(attribuer_numero('202401'), 'DEV-202401-0001')
+        self.assertEqual(attribuer_numero('202401'), 'DEV-202401-0002')
+        self.assertEqual(attribuer_numero('202402'), 'DEV-202402-0001')
+
+    def test_attribution_en_nombre_constant_de_requetes(self):
+        attribuer_numero('202401')
+        CompteurDevis.objects.filter(periode='202401').update(dernier_numero=50000)
+        with self.assertNumQueries(4):
+            self.assertEqual(attribuer_numero('202401'), 'DEV-202401-50001')
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Écritures concurrentes : PostgreSQL requis")
+class NumerotationConcurrenteTests(TransactionTestCase):
+    """Créations simultanées de devis : chaque numéro n'est attribué qu'une fois."""
+
+    THREADS = 8
+    DEVIS_PAR_THREAD = 25
+
+    def test_aucun_numero_en_double(self):
+        client = creer_clients(1)[0]
+        numeros = []
+        erreurs = []
+        verrou = threading.Lock()
+        depart = threading.Barrier(self.THREADS)
+
+        def creer():
+            try:
+                depart.wait()
+                for _ in range(self.DEVIS_PAR_THREAD):
+                    devis = Devis.objects.create(client=client, conditions_paiement="30 jours")
+                    with verrou:
+                        numeros.append(devis.numero)
+            except Exception as e:
+                with verrou:
+                    erreurs.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=creer) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        total = self.THREADS * self.DEVIS_PAR_THREAD
+        self.assertEqual(erreurs, [])
+        self.assertEqual(len(set(numeros)), total)
+        periode = periode_courante()
+        self.assertEqual(
+            sorted(numeros), [formater_numero(periode, sequence) for sequence in range(1, total + 1)]
+        )
+        self.assertEqual(CompteurDevis.objects.get(periode=periode).dernier_numero, total)
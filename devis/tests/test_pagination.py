@@ -0,0 +1,78 @@
+"""
+Tests de la pagination par curseur de la liste des devis.
+"""
+
+import unittest
+from datetime import timedelta
+
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from devis.models import Devis
+from devis.pagination import paginer_par_curseur
+
+from .donnees import creer_clients, creer_devis
+
+
+class PaginationCurseurTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        client = creer_clients(1)[0]
+        for _ in range(25):
+            creer_devis(client)
+        # Dates identiques par groupes de 4 : l'identifiant départage les devis
+        maintenant = timezone.now().replace(microsecond=0)
+        for rang, devis in enumerate(Devis.objects.order_by('pk')):
+            Devis.objects.filter(pk=devis.pk).update(
+                date_creation=maintenant - timedelta(days=rang // 4)
+            )
+        cls.ordre = list(Devis.objects.order_by('-date_creation', '-id').values_list('pk', flat=True))
+
+    def page(self, parametres=''):
+        return paginer_par_curseur(Devis.objects.all(), QueryDict(parametres), par_page=7)
+
+    def test_parcours_complet_dans_les_deux_sens(self):
+        pages = [self.page()]
+        while pages[-1].has_next:
+            pages.append(self.page(pages[-1].parametres_suivants))
+        self.assertEqual([devis.pk for page in pages for devis in page], self.ordre)
+
+        retour = [pages[-1]]
+        while retour[-1].has_previous:
+            retour.append(self.page(retour[-1].parametres_precedents))
+        self.assertEqual([devis.pk for page in reversed(retour) for devis in page], self.ordre)
+
+    def test_condition_par_comparaison_de_lignes(self):
+        premiere = self.page()
+        for sens, operateur in (('suivants', '<'), ('precedents', '>')):
+            with CaptureQueriesContext(connection) as requetes:
+                self.page(getattr(premiere, f'parametres_{sens}'))
+            condition = f'("devis_devis"."date_creation", "devis_devis"."id") {operateur} ('
+            self.assertIn(condition, requetes[0]['sql'])
+            self.assertNotIn(' OR ', requetes[0]['sql'])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', "Plan d'exécution PostgreSQL")
+    def test_condition_bornant_le_parcours_d_index(self):
+        premiere = self.page()
+        with CaptureQueriesContext(connection) as requetes:
+            self.page(premiere.parametres_suivants)
+        with connection.cursor() as curseur:
+            # Table de test minuscule : le parcours séquentiel serait toujours choisi
+            curseur.execute('SET LOCAL enable_seqscan = off')
+            curseur.execute(f"EXPLAIN {requetes[0]['sql']}")
+            plan = '\n'.join(ligne for ligne, in curseur.fetchall())
+        self.assertIn('Index Cond: (ROW(date_creation, id) < ROW(', plan)
+
+    def test_curseur_avant_perime_renvoie_a_la_premiere_page(self):
+        premiere = self.page()
+        with self.assertNumQueries(3):  # total, page précédente vide, première page
+            page = paginer_par_curseur(
+                Devis.objects.all(), QueryDict(premiere.parametres_precedents), par_page=7, compter=True
+            )
+        self.assertEqual([devis.pk for devis in page], self.ordre[:7])
+        self.assertEqual(page.total, 25)
+        self.assertFalse(page.has_previous)
+        self.assertTrue(page.has_next)
@@ -0,0 +1,87 @@
+"""
+Détection des requêtes N+1 dans les vues de liste et de détail.
+
+Chaque vue est rendue sur deux jeux de données de tailles différentes
+(nombre de clients, de devis et de lignes) ; le nombre de requêtes SQL doit
+être le même dans les deux cas. Une vue dont le nombre de requêtes augmente
+avec les données accède à une relation non chargée (select_related ou
+prefetch_related manquant) : le test affiche alors les requêtes répétées.
+
+Les vues sont rendues sans cache (DummyCache) : un fragment de gabarit mis
+en cache masquerait les requêtes de son contenu.
+"""
+
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .donnees import creer_clients, creer_devis
+
+SANS_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+# Vues vérifiées : (nom de l'URL, objet désigné par pk, filtré sur le client de test)
+VUES = [
+    ('devis:devis_list', None, True),
+    ('devis:devis_en_cours', None, True),
+    ('devis:devis_termines', None, True),
+    ('devis:devis_detail', 'devis', False),
+    ('clients:client_list', None, False),
+    ('clients:client_detail', 'client', False),
+]
+
+STATUTS = ['brouillon', 'envoye', 'accepte', 'refuse']
+
+
+@override_settings(CACHES=SANS_CACHE)
+class RequetesNPlusUnTests(TestCase):
+    PETIT = 2
+    GRAND = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.utilisateur = User.objects.create_user('verification-n-plus-un', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.utilisateur)
+
+    def creer_donnees(self, taille):
+        """
+        Crée `taille` clients ayant chacun `taille` devis de `taille` lignes.
+
+        Returns:
+            dict: Le client et le devis à afficher dans les vues de détail
+        """
+        clients = creer_clients(taille, prefixe=f"Verification{taille}", cree_par=self.utilisateur)
+        for client in clients:
+            for j in range(taille):
+                devis = creer_devis(client, lignes=taille, statut=STATUTS[j % len(STATUTS)],
+                                    cree_par=self.utilisateur)
+        return {'client': clients[0], 'devis': devis}
+
+    def mesurer(self, objets):
+        """Requêtes SQL de chaque vue, après un rendu de chauffe (session, compteurs)."""
+        mesures = {}
+        for nom, objet, filtree in VUES:
+            url = reverse(nom, args=[objets[objet].pk] if objet else [])
+            parametres = {'client': objets['client'].pk} if filtree else {}
+            self.client.get(url, parametres)
+            with CaptureQueriesContext(connection) as requetes:
+                reponse = self.client.get(url, parametres)
+            self.assertEqual(reponse.status_code, 200, nom)
+            mesures[nom] = [requete['sql'] for requete in requetes]
+        return mesures
+
+    def test_nombre_de_requetes_independant_du_volume(self):
+        petit = self.mesurer(self.creer_donnees(self.PETIT))
+        grand = self.mesurer(self.creer_donnees(self.GRAND))
+        for nom, _, _ in VUES:
+            with self.subTest(vue=nom):
+                repetees = '\n'.join(
+                    f"    {nombre} x {sql}"
+                    for sql, nombre in Counter(grand[nom]).most_common() if nombre > 1
+                )
+                self.assertEqual(len(petit[nom]), len(grand[nom]), f"Requêtes répétées :\n{repetees}")
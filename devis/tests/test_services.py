@@ -0,0 +1,173 @@
+"""
+Tests de l'écriture groupée des lignes de devis.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from devis.models import Devis
+from devis.services import MONTANT_MAX, lire_lignes
+
+from .donnees import creer_clients, creer_devis
+
+
+def donnees_lignes(nombre, prix='12.34', quantite='3'):
+    """Données POST de `nombre` lignes identiques."""
+    donnees = QueryDict(mutable=True)
+    for i in range(nombre):
+        donnees.appendlist('description[]', f"Prestation {i}")
+        donnees.appendlist('quantite[]', quantite)
+        donnees.appendlist('prix_unitaire[]', prix)
+    return donnees
+
+
+class LireLignesTests(TestCase):
+    def test_total_superieur_au_maximum(self):
+        # Chaque ligne est valide, mais pas leur somme
+        with self.assertRaisesMessage(ValidationError, "montant total du devis est trop élevé"):
+            lire_lignes(donnees_lignes(2, prix=str(MONTANT_MAX), quantite='1'))
+
+    def test_total_egal_au_maximum(self):
+        lignes = lire_lignes(donnees_lignes(1, prix=str(MONTANT_MAX), quantite='1'))
+        self.assertEqual(lignes[0]['montant'], MONTANT_MAX)
+
+
+class CreationDevisTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.utilisateur = User.objects.create_user('createur')
+        cls.client_devis = creer_clients(1)[0]
+
+    def setUp(self):
+        self.client.force_login(self.utilisateur)
+
+    def creer(self, donnees):
+        for champ, valeur in {'client': self.client_devis.pk, 'date_validite': '2030-01-31',
+                              'conditions_paiement': '30 jours', 'notes': ''}.items():
+            donnees.setdefault(champ, valeur)
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.client.post(reverse('devis:devis_create'), donnees.urlencode(),
+                                       content_type='application/x-www-form-urlencoded')
+        return reponse, len(requetes)
+
+    def test_nombre_de_requetes_independant_du_nombre_de_lignes(self):
+        # Premier devis : compteur du mois et statistiques du client créés
+        self.creer(donnees_lignes(1))
+        nombres_requetes = {}
+        for nombre in (1, 50, 500):
+            reponse, nombres_requetes[nombre] = self.creer(donnees_lignes(nombre))
+            self.assertEqual(reponse.status_code, 302)
+            devis = Devis.objects.latest('pk')
+            self.assertEqual(devis.lignes.count(), nombre)
+            self.assertEqual(devis.montant_ht, Decimal('37.02') * nombre)
+        self.assertEqual(len(set(nombres_requetes.values())), 1, nombres_requetes)
+
+    def test_total_trop_eleve_refuse_sans_ecriture(self):
+        reponse, _ = self.creer(donnees_lignes(3, prix='50000000.00', quantite='1'))
+        self.assertEqual(reponse.status_code, 200)
+        self.assertContains(reponse, "montant total du devis est trop élevé")
+        self.assertFalse(Devis.objects.exists())
+
+    def test_saisie_conservee_apres_erreur(self):
+        donnees = donnees_lignes(50)
+        quantites = donnees.getlist('quantite[]')
+        quantites[30] = 'trois'
+        donnees.setlist('quantite[]', quantites)
+        donnees['notes'] = "Accès par la cour"
+        reponse, _ = self.creer(donnees)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertContains(reponse, "Ligne 31 : la quantité doit être un nombre entier.")
+        self.assertContains(reponse, 'id="description_50"')
+        self.assertNotContains(reponse, 'id="description_51"')
+        self.assertContains(reponse, 'value="Prestation 49"')
+        self.assertContains(reponse, 'value="trois"')
+        self.assertContains(reponse, 'value="2030-01-31"')
+        self.assertContains(reponse, "Accès par la cour</textarea>")
+        self.assertFalse(Devis.objects.exists())
+
+    def test_date_de_validite_invalide(self):
+        donnees = donnees_lignes(2)
+        donnees.update({'client': self.client_devis.pk, 'conditions_paiement': '30 jours', 'notes': ''})
+        for date_validite in ('garbage', '2030-02-30', ''):
+            donnees['date_validite'] = date_validite
+            reponse = self.client.post(reverse('devis:devis_create'), donnees.urlencode(),
+                                       content_type='application/x-www-form-urlencoded')
+            self.assertEqual(reponse.status_code, 200, date_validite)
+            self.assertContains(reponse, "La date de validité est")
+        self.assertFalse(Devis.objects.exists())
+
+
+class ModificationDevisTests(TestCase):
+    NOMBRE_LIGNES = 300
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.utilisateur = User.objects.create_user('modificateur')
+        cls.devis = creer_devis(creer_clients(1)[0], lignes=cls.NOMBRE_LIGNES)
+
+    def setUp(self):
+        self.client.force_login(self.utilisateur)
+
+    def donnees_formulaire(self):
+        """Données postées par le formulaire de modification, sans changement."""
+        donnees = QueryDict(mutable=True)
+        donnees.update({'client': self.devis.client_id,
+                        'date_validite': self.devis.date_validite.isoformat(),
+                        'conditions_paiement': self.devis.conditions_paiement, 'notes': ''})
+        for ligne in self.devis.lignes.order_by('pk'):
+            donnees.appendlist('ligne_id[]', str(ligne.pk))
+            donnees.appendlist('description[]', ligne.description)
+            donnees.appendlist('quantite[]', str(ligne.quantite))
+            donnees.appendlist('prix_unitaire[]', str(ligne.prix_unitaire))
+        return donnees
+
+    def modifier(self, donnees):
+        """Poste le formulaire et retourne les écritures SQL, par table."""
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.client.post(reverse('devis:devis_update', args=[self.devis.pk]),
+                                       donnees.urlencode(), content_type='application/x-www-form-urlencoded')
+        self.assertEqual(reponse.status_code, 302)
+        ecritures = {}
+        for requete in requetes:
+            sql = requete['sql']
+            for verbe, mot in (('INSERT', 'INTO'), ('UPDATE', ''), ('DELETE', 'FROM')):
+                if sql.startswith(verbe):
+                    table = sql[len(verbe):].split()[1 if mot else 0].strip('"')
+                    ecritures.setdefault((verbe, table), []).append(sql)
+        return ecritures
+
+    def test_une_ligne_modifiee_une_seule_ecriture(self):
+        donnees = self.donnees_formulaire()
+        descriptions = donnees.getlist('description[]')
+        descriptions[150] = "Description modifiée"
+        donnees.setlist('description[]', descriptions)
+
+        ecritures = self.modifier(donnees)
+        lignes = {verbe: len(sql) for (verbe, table), sql in ecritures.items() if table == 'devis_lignedevis'}
+        self.assertEqual(lignes, {'UPDATE': 1})
+        self.assertEqual(self.devis.lignes.filter(description="Description modifiée").count(), 1)
+        # Montant HT inchangé, mais la version du devis change (tableau des lignes)
+        self.assertEqual(len(ecritures.get(('UPDATE', 'devis_devis'), [])), 1)
+
+    def test_formulaire_inchange_aucune_ecriture(self):
+        version = self.devis.version
+        ecritures = self.modifier(self.donnees_formulaire())
+        tables = {table for _, table in ecritures if table.startswith(('devis_', 'clients_'))}
+        self.assertEqual(tables, set())
+        self.devis.refresh_from_db()
+        self.assertEqual(self.devis.version, version)
+
+    def test_entete_modifie_enregistre(self):
+        donnees = self.donnees_formulaire()
+        donnees['notes'] = "Livraison en deux fois"
+        ecritures = self.modifier(donnees)
+        self.assertNotIn(('UPDATE', 'devis_lignedevis'), ecritures)
+        self.devis.refresh_from_db()
+        self.assertEqual(self.devis.notes, "Livraison en deux fois")
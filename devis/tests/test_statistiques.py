@@ -0,0 +1,117 @@
+"""
+Tests des statistiques de devis par client : les statistiques maintenues
+de façon incrémentale doivent toujours être égales à un recalcul complet.
+"""
+
+import io
+import threading
+import unittest
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from devis.models import Devis, StatistiquesClient
+from devis.statistiques import calculer_statistiques
+
+from .donnees import creer_clients, creer_devis
+
+CHAMPS = ['nb_brouillon', 'nb_envoye', 'nb_accepte', 'nb_refuse', 'montant_accepte_ht', 'montant_accepte_ttc']
+
+
+class VerificationStatistiques:
+    """Compare les statistiques enregistrées à un recalcul complet."""
+
+    def assertStatistiquesExactes(self):
+        def lire(statistiques):
+            return {
+                s.client_id: tuple(getattr(s, champ) for champ in CHAMPS)
+                for s in statistiques
+                if any(getattr(s, champ) for champ in CHAMPS)
+            }
+        self.assertEqual(lire(StatistiquesClient.objects.all()), lire(calculer_statistiques()))
+
+
+class StatistiquesTests(VerificationStatistiques, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_a, cls.client_b = creer_clients(2)
+
+    def test_creations_modifications_et_suppressions(self):
+        devis = creer_devis(self.client_a)
+        devis.statut = 'accepte'
+        devis.montant_ht = Decimal('100.05')
+        devis.save()
+        self.assertStatistiquesExactes()
+
+        devis.client = self.client_b
+        devis.save()
+        autre = creer_devis(self.client_a, statut='envoye')
+        Devis.objects.get(pk=autre.pk).delete()
+        self.assertStatistiquesExactes()
+
+        devis.montant_ht = Decimal('20.00')
+        devis.save(update_fields=['montant_ht'])
+        self.assertStatistiquesExactes()
+
+    def test_instance_perimee(self):
+        creer_devis(self.client_a)
+        premiere, seconde = Devis.objects.get(), Devis.objects.get()
+        premiere.statut = 'accepte'
+        premiere.save()
+        # Chargée avant la modification : son état initial est périmé
+        seconde.statut = 'refuse'
+        seconde.save()
+        self.assertStatistiquesExactes()
+
+        premiere.delete()
+        self.assertStatistiquesExactes()
+
+    def test_lignes_du_devis(self):
+        devis = creer_devis(self.client_a, statut='accepte')
+        devis.lignes.create(description="Ligne", quantite=2, prix_unitaire=Decimal('7.50'))
+        self.assertStatistiquesExactes()
+
+    def test_commande_de_reconstruction(self):
+        devis = creer_devis(self.client_a, statut='accepte')
+        Devis.objects.filter(pk=devis.pk).update(montant_ht=Decimal('42.00'))
+        call_command('recalculer_statistiques', stdout=io.StringIO())
+        self.assertStatistiquesExactes()
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Écritures concurrentes : PostgreSQL requis")
+class StatistiquesConcurrentesTests(VerificationStatistiques, TransactionTestCase):
+    """Enregistrements simultanés d'un même devis, depuis des instances chargées en même temps."""
+
+    THREADS = 6
+    TOURS = 10
+
+    def test_aucune_derive(self):
+        devis = creer_devis(creer_clients(1)[0])
+        statuts = ['brouillon', 'envoye', 'accepte', 'refuse']
+        erreurs = []
+        depart = threading.Barrier(self.THREADS)
+
+        def modifier(rang):
+            try:
+                for tour in range(self.TOURS):
+                    instance = Devis.objects.get(pk=devis.pk)
+                    instance.statut = statuts[(rang + tour) % len(statuts)]
+                    instance.montant_ht = Decimal(rang * 10 + tour)
+                    if tour == 0:
+                        depart.wait()
+                    instance.save()
+            except Exception as e:
+                erreurs.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=modifier, args=(rang,)) for rang in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erreurs, [])
+        self.assertStatistiquesExactes()
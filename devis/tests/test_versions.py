@@ -0,0 +1,97 @@
+"""
+Tests des versions qui servent d'estampille aux ETag et aux clés de cache.
+"""
+
+import threading
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from clients.cache import version_clients
+from clients.models import Client
+from devis.cache import version_devis
+from devis.models import Devis, VersionListe
+
+from .donnees import creer_clients, creer_devis
+
+
+class VersionsListesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.utilisateur = User.objects.create_user('lecteur')
+        cls.client_devis = creer_clients(1)[0]
+
+    def test_versions_conservees_en_base(self):
+        avant = version_devis(), version_clients()
+        with self.captureOnCommitCallbacks(execute=True):
+            creer_devis(self.client_devis)
+        self.assertGreater(version_devis(), avant[0])
+        self.assertEqual(version_clients(), avant[1])
+        self.assertEqual(VersionListe.objects.get(nom='devis').valeur, version_devis())
+
+    def test_version_ecrite_dans_la_transaction_du_devis(self):
+        avant = version_devis()
+        with self.captureOnCommitCallbacks() as rappels:
+            creer_devis(self.client_devis)
+        self.assertEqual(rappels, [])
+        self.assertGreater(version_devis(), avant)
+
+        avant = version_devis()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            creer_devis(self.client_devis)
+            raise RuntimeError
+        self.assertEqual(version_devis(), avant)
+
+    def test_etag_de_la_liste_change_apres_modification(self):
+        self.client.force_login(self.utilisateur)
+        url = reverse('devis:devis_list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            creer_devis(self.client_devis)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_version_du_devis_incrementee_en_base(self):
+        devis = creer_devis(self.client_devis)
+        perime = Devis.objects.get(pk=devis.pk)
+        devis.save()
+        perime.save()
+        perime.refresh_from_db()
+        self.assertEqual(perime.version, devis.version + 1)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Écritures concurrentes : PostgreSQL requis")
+class VersionsConcurrentesTests(TransactionTestCase):
+    """Enregistrements simultanés d'un même client depuis des instances chargées en même temps."""
+
+    THREADS = 6
+
+    def test_aucune_version_perdue(self):
+        client = creer_clients(1)[0]
+        version_initiale = client.version
+        erreurs = []
+        depart = threading.Barrier(self.THREADS)
+
+        def modifier():
+            try:
+                instance = Client.objects.get(pk=client.pk)
+                depart.wait()
+                instance.save()
+            except Exception as e:
+                erreurs.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=modifier) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erreurs, [])
+        client.refresh_from_db()
+        self.assertEqual(client.version, version_initiale + self.THREADS)
@@ -39,6 +39,26 @@ urlpatterns = [
     path('<int:pk>/export/excel/', views.devis_export_excel, name='devis_export_excel'),
     # Export d'un devis au format Word
     path('<int:pk>/export/word/', views.devis_export_word, name='devis_export_word'),
+    # Export d'un devis en arrière-plan (pdf, excel ou word)
+    path('<int:pk>/export/<str:format_export>/tache/', views.devis_export_tache, name='devis_export_tache'),
+    # État d'une tâche d'export
+    path('export/taches/<int:pk>/', views.tache_export_statut, name='tache_export_statut'),
+    # Téléchargement du document produit par une tâche d'export
+    path('export/taches/<int:pk>/telecharger/', views.tache_export_telecharger, name='tache_export_telecharger'),
     # Export de la liste des devis au format CSV
     path('export/csv/', views.devis_export_csv, name='devis_export_csv'),
+    # Export groupé des devis filtrés dans une archive ZIP
+    path('export/zip/', views.devis_export_zip, name='devis_export_zip'),
+    # Export des devis filtrés dans un classeur Excel unique
+    path('export/classeur/', views.devis_export_classeur, name='devis_export_classeur'),
+    
+    # Recherche dans les clients et les devis
+    path('recherche/', views.recherche, name='recherche'),
+    path('recherche/suggestions/', views.recherche_suggestions, name='recherche_suggestions'),
+    
+    # Analyses (agrégats mensuels)
+    # Tableau de bord : chiffre d'affaires, taux d'acceptation, montant moyen
+    path('analyses/', views.analyses, name='analyses'),
+    # Mêmes indicateurs au format JSON
+    path('analyses/donnees/', views.analyses_donnees, name='analyses_donnees'),
 ]
@@ -10,37 +10,95 @@ que seuls les utilisateurs authentifiés peuvent y accéder.
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, HttpResponseRedirect
+from django.views.decorators.http import require_POST
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
-from django.utils import timezone
-from django.core.paginator import Paginator
-from django.db.models import Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.conf import settings
+from django.db import transaction
+from django.core.exceptions import ValidationError
 from decimal import Decimal
-import csv
 from datetime import datetime
-from .models import Devis, LigneDevis
-from .forms import DevisForm
+from itertools import zip_longest
+from .models import STATUTS_EN_COURS, STATUTS_TERMINES, Devis, TacheExport
+from .services import CHAMPS_ENTETE, champs_modifies, creer_lignes, lire_entete, lire_lignes, synchroniser_lignes
+from .filtres import lire_filtres, filtrer_devis
+from .pagination import paginer_par_curseur
+from .recherche import LONGUEUR_MIN, rechercher, suggestions
+from .analyses import REGROUPEMENTS, analyser, date_rafraichissement, lire_parametres, totaux
+from .cache import VERSION_DEVIS, lire_versions
+from clients.cache import VERSION_CLIENTS
 from clients.models import Client
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from .exports import FORMATS
+from .exports.archive import generer_zip
+from .exports.cache import empreinte, obtenir_rendu
+from .exports.classeur import DISPOSITIONS, devis_avec_lignes, rendre_classeur
+from .exports.lignes import charger_lignes
+from .exports.taches import soumettre_export
+from generateur_de_devis.conditionnel import page_conditionnelle
+from generateur_de_devis.csv_streaming import reponse_csv
+
+# Nombre de devis lus par aller-retour avec la base lors des exports
+TAILLE_MORCEAU_EXPORT = 2000
+
+def _estampille_listes(request):
+    """Versions des données affichées par les listes de devis (devis et noms des clients)."""
+    return lire_versions(VERSION_DEVIS, VERSION_CLIENTS)
+
+def _estampille_devis(request, pk):
+    """Versions des données affichées par la page d'un devis, ou None s'il n'existe pas."""
+    return Devis.objects.filter(pk=pk).values_list('version', 'date_modification', 'client__version').first()
+
+def _liste_devis(request, devis, titre=None):
+    """
+    Filtre, pagine et affiche une liste de devis.
+    
+    Les filtres de la requête (client, statut, date_debut, date_fin) sont
+    appliqués en SQL, puis la liste est paginée par curseur sur
+    (date_creation, id). Le nombre total de devis n'est calculé que si
+    DEVIS_LISTE_COMPTER est activé ou si la requête contient compter=1.
+    
+    Args:
+        request: La requête HTTP
+        devis: Le QuerySet de départ
+        titre: Le titre de la page (optionnel)
+        
+    Returns:
+        HttpResponse: La page HTML avec la liste paginée des devis
+    """
+    filtres = lire_filtres(request.GET)
+    compter = getattr(settings, 'DEVIS_LISTE_COMPTER', False) or request.GET.get('compter') == '1'
+    # Client et créateur chargés par jointure : nombre de requêtes constant
+    devis = devis.select_related('client', 'cree_par')
+    page = paginer_par_curseur(filtrer_devis(devis, filtres), request.GET, compter=compter)
+    
+    # Paramètres de la première page : filtres conservés, curseur retiré
+    parametres = request.GET.copy()
+    parametres.pop('apres', None)
+    parametres.pop('avant', None)
+    
+    contexte = {
+        'devis': page,
+        'filtres': filtres,
+        'filtres_querystring': parametres.urlencode(),
+        'statuts': Devis.STATUT_CHOICES,
+        # Seul le client filtré est affiché : les autres sont proposés par autocomplétion
+        'client_filtre': (
+            Client.objects.only('nom').filter(pk=filtres['client']).first() if 'client' in filtres else None
+        ),
+    }
+    if titre:
+        contexte['titre'] = titre
+    return render(request, 'devis/devis_list.html', contexte)
 
 @login_required
+@page_conditionnelle(_estampille_listes)
 def devis_list(request):
     """
     Vue pour afficher la liste de tous les devis.
     
-    Cette vue affiche une liste paginée de tous les devis dans le système,
+    Cette vue affiche une liste paginée et filtrable de tous les devis,
     triés par date de création décroissante (les plus récents en premier).
     
     Args:
@@ -49,10 +107,10 @@ def devis_list(request):
     Returns:
         HttpResponse: La page HTML avec la liste des devis
     """
-    devis = Devis.objects.all().order_by('-date_creation')
-    return render(request, 'devis/devis_list.html', {'devis': devis})
+    return _liste_devis(request, Devis.objects.all())
 
 @login_required
+@page_conditionnelle(_estampille_listes)
 def devis_en_cours(request):
     """
     Vue pour afficher la liste des devis en cours.
@@ -67,16 +125,11 @@ def devis_en_cours(request):
     Returns:
         HttpResponse: La page HTML avec la liste des devis en cours
     """
-    devis = Devis.objects.filter(statut__in=['brouillon', 'envoye']).order_by('-date_creation')
-    paginator = Paginator(devis, 10)  # 10 devis par page
-    page = request.GET.get('page')
-    devis = paginator.get_page(page)
-    return render(request, 'devis/devis_list.html', {
-        'devis': devis,
-        'titre': 'Devis en cours'
-    })
+    devis = Devis.objects.filter(statut__in=STATUTS_EN_COURS)
+    return _liste_devis(request, devis, 'Devis en cours')
 
 @login_required
+@page_conditionnelle(_estampille_listes)
 def devis_termines(request):
     """
     Vue pour afficher la liste des devis terminés.
@@ -91,16 +144,11 @@ def devis_termines(request):
     Returns:
         HttpResponse: La page HTML avec la liste des devis terminés
     """
-    devis = Devis.objects.filter(statut__in=['accepte', 'refuse']).order_by('-date_creation')
-    paginator = Paginator(devis, 10)  # 10 devis par page
-    page = request.GET.get('page')
-    devis = paginator.get_page(page)
-    return render(request, 'devis/devis_list.html', {
-        'devis': devis,
-        'titre': 'Devis terminés'
-    })
+    devis = Devis.objects.filter(statut__in=STATUTS_TERMINES)
+    return _liste_devis(request, devis, 'Devis terminés')
 
 @login_required
+@page_conditionnelle(_estampille_devis)
 def devis_detail(request, pk):
     """
     Vue pour afficher les détails d'un devis spécifique.
@@ -111,6 +159,10 @@ def devis_detail(request, pk):
     - Les informations du client associé
     - Les calculs des montants (HT, TTC, TVA)
     
+    Une page inchangée depuis la dernière visite est servie par une réponse
+    304. Le tableau des lignes est mis en cache par version du devis : les
+    lignes ne sont lues que si le tableau doit être rendu.
+    
     Args:
         request: La requête HTTP
         pk: L'identifiant unique du devis
@@ -118,13 +170,56 @@ def devis_detail(request, pk):
     Returns:
         HttpResponse: La page HTML avec les détails du devis
     """
-    devis = get_object_or_404(Devis, pk=pk)
+    devis = get_object_or_404(Devis.objects.select_related('client', 'cree_par'), pk=pk)
+    # QuerySet paresseux : évalué uniquement hors du cache du fragment
     lignes = devis.lignes.all()
     return render(request, 'devis/devis_detail.html', {
         'devis': devis,
         'lignes': lignes
     })
 
+def _formulaire_devis(request, devis=None, client=None, donnees=None):
+    """
+    Affiche le formulaire de création ou de modification d'un devis.
+    
+    Le formulaire est pré-rempli par les données postées lorsqu'il est
+    réaffiché après une erreur de validation (la saisie n'est pas perdue),
+    sinon par le devis modifié.
+    
+    Args:
+        request: La requête HTTP
+        devis: Le devis modifié (optionnel)
+        client: Le client choisi (optionnel)
+        donnees: Les données POST à réafficher (optionnel)
+        
+    Returns:
+        HttpResponse: Le formulaire de devis
+    """
+    if donnees is not None:
+        entete = {champ: donnees.get(champ, '') for champ in CHAMPS_ENTETE}
+        lignes = [
+            {'pk': identifiant, 'description': description, 'quantite': quantite, 'prix_unitaire': prix_unitaire}
+            for identifiant, description, quantite, prix_unitaire in zip_longest(
+                donnees.getlist('ligne_id[]'), donnees.getlist('description[]'),
+                donnees.getlist('quantite[]'), donnees.getlist('prix_unitaire[]'), fillvalue=''
+            )
+        ]
+    elif devis is not None:
+        entete = {
+            'date_validite': devis.date_validite.isoformat(),
+            'conditions_paiement': devis.conditions_paiement,
+            'notes': devis.notes or '',
+        }
+        lignes = devis.lignes.all()
+    else:
+        entete, lignes = {}, []
+    return render(request, 'devis/devis_form.html', {
+        'devis': devis,
+        'client_choisi': client,
+        'entete': entete,
+        'lignes': lignes,
+    })
+
 @login_required
 def devis_create(request):
     """
@@ -147,45 +242,26 @@ def devis_create(request):
     if request.method == 'POST':
         # Récupération des données du formulaire
         client_id = request.POST.get('client')
-        date_validite = request.POST.get('date_validite')
-        conditions_paiement = request.POST.get('conditions_paiement')
-        notes = request.POST.get('notes')
-        
-        # Création du devis
         client = get_object_or_404(Client, id=client_id)
-        devis = Devis.objects.create(
-            client=client,
-            date_validite=date_validite,
-            conditions_paiement=conditions_paiement,
-            notes=notes,
-            cree_par=request.user
-        )
         
-        # Traitement des lignes du devis
-        descriptions = request.POST.getlist('description[]')
-        quantites = request.POST.getlist('quantite[]')
-        prix_unitaires = request.POST.getlist('prix_unitaire[]')
+        # Validation de l'en-tête et des lignes du devis avant toute écriture
+        try:
+            entete = lire_entete(request.POST)
+            lignes = lire_lignes(request.POST)
+        except ValidationError as e:
+            for erreur in e.messages:
+                messages.error(request, erreur)
+            return _formulaire_devis(request, client=client, donnees=request.POST)
         
-        montant_total_ht = 0
-        for i in range(len(descriptions)):
-            if descriptions[i] and quantites[i] and prix_unitaires[i]:
-                ligne = LigneDevis.objects.create(
-                    devis=devis,
-                    description=descriptions[i],
-                    quantite=int(quantites[i]),
-                    prix_unitaire=float(prix_unitaires[i])
-                )
-                montant_total_ht += ligne.montant
-        
-        # Mise à jour du montant total
-        devis.montant_ht = montant_total_ht
-        devis.save()
+        # Création du devis et de ses lignes en une seule transaction
+        with transaction.atomic():
+            devis = Devis.objects.create(client=client, cree_par=request.user, **entete)
+            creer_lignes(devis, lignes)
         
         messages.success(request, 'Devis créé avec succès!')
         return redirect('devis:devis_detail', pk=devis.pk)
     
-    clients = Client.objects.all()
-    return render(request, 'devis/devis_form.html', {'clients': clients})
+    return _formulaire_devis(request)
 
 @login_required
 def devis_update(request, pk):
@@ -195,11 +271,10 @@ def devis_update(request, pk):
     Cette vue gère le processus de modification d'un devis :
     1. Affiche le formulaire pré-rempli si la méthode est GET
     2. Traite les données soumises si la méthode est POST :
-       - Met à jour les informations générales du devis
-       - Supprime les anciennes lignes
-       - Crée les nouvelles lignes
-       - Recalcule le montant total HT
-       - Met à jour le devis avec le nouveau montant
+       - Met à jour les informations générales du devis, si elles ont changé
+       - Compare les lignes soumises aux lignes existantes
+       - Met à jour, crée ou supprime uniquement les lignes concernées
+       - Recalcule le montant total HT si les lignes ont changé
     
     Args:
         request: La requête HTTP
@@ -208,45 +283,37 @@ def devis_update(request, pk):
     Returns:
         HttpResponse: Le formulaire de modification ou redirection vers le détail
     """
-    devis = get_object_or_404(Devis, pk=pk)
+    devis = get_object_or_404(Devis.objects.select_related('client'), pk=pk)
     if request.method == 'POST':
-        # Mise à jour des informations du devis
         client_id = request.POST.get('client')
         client = get_object_or_404(Client, id=client_id)
-        devis.client = client
-        devis.date_validite = request.POST.get('date_validite')
-        devis.conditions_paiement = request.POST.get('conditions_paiement')
-        devis.notes = request.POST.get('notes')
         
-        # Suppression des anciennes lignes
-        devis.lignes.all().delete()
+        # Validation de l'en-tête et des lignes du devis avant toute écriture
+        try:
+            entete = lire_entete(request.POST)
+            lignes = lire_lignes(request.POST)
+        except ValidationError as e:
+            for erreur in e.messages:
+                messages.error(request, erreur)
+            return _formulaire_devis(request, devis, client, request.POST)
         
-        # Création des nouvelles lignes
-        descriptions = request.POST.getlist('description[]')
-        quantites = request.POST.getlist('quantite[]')
-        prix_unitaires = request.POST.getlist('prix_unitaire[]')
+        # L'en-tête n'est enregistré que s'il a changé : un enregistrement
+        # incrémente la version du devis et celle de la fiche du client
+        entete['client'] = client
+        modifies = champs_modifies(devis, entete)
+        for champ in modifies:
+            setattr(devis, champ, entete[champ])
         
-        montant_total_ht = 0
-        for i in range(len(descriptions)):
-            if descriptions[i] and quantites[i] and prix_unitaires[i]:
-                ligne = LigneDevis.objects.create(
-                    devis=devis,
-                    description=descriptions[i],
-                    quantite=int(quantites[i]),
-                    prix_unitaire=float(prix_unitaires[i])
-                )
-                montant_total_ht += ligne.montant
-        
-        devis.montant_ht = montant_total_ht
-        devis.save()
+        with transaction.atomic():
+            if modifies:
+                devis.save(update_fields=modifies)
+            # Seules les lignes modifiées, ajoutées ou retirées sont écrites
+            synchroniser_lignes(devis, lignes)
         
         messages.success(request, 'Devis mis à jour avec succès!')
         return redirect('devis:devis_detail', pk=devis.pk)
     
-    return render(request, 'devis/devis_form.html', {
-        'devis': devis,
-        'clients': Client.objects.all()
-    })
+    return _formulaire_devis(request, devis, devis.client)
 
 @login_required
 def devis_delete(request, pk):
@@ -272,6 +339,39 @@ def devis_delete(request, pk):
     
     return render(request, 'devis/devis_confirm_delete.html', {'devis': devis})
 
+def _servir_export(request, pk, format_export):
+    """
+    Sert le document exporté d'un devis dans le format demandé.
+
+    L'empreinte du contenu du devis sert d'ETag : si le navigateur possède
+    déjà le document (If-None-Match), une réponse 304 est retournée sans
+    rendu. Sinon le document est lu dans le cache des exports, ou rendu puis
+    mis en cache (voir devis/exports/cache.py).
+
+    Args:
+        request: La requête HTTP
+        pk: L'identifiant unique du devis à exporter
+        format_export: Le format d'export ('pdf', 'excel', 'word')
+
+    Returns:
+        HttpResponse: Le document, ou une réponse 304
+    """
+    devis = get_object_or_404(Devis.objects.select_related('client'), pk=pk)
+    lignes = charger_lignes(devis)
+    cle = empreinte(devis, lignes, format_export)
+    etag = quote_etag(cle)
+
+    reponse = get_conditional_response(request, etag=etag)
+    if reponse is None:
+        export = FORMATS[format_export]
+        reponse = HttpResponse(obtenir_rendu(devis, lignes, format_export, cle), content_type=export.content_type)
+        reponse['Content-Disposition'] = f'attachment; filename="devis_{devis.numero}.{export.extension}"'
+        reponse['ETag'] = etag
+    # Le navigateur doit revalider le document à chaque téléchargement
+    patch_cache_control(reponse, private=True, no_cache=True)
+    return reponse
+
+
 @login_required
 def devis_export_pdf(request, pk):
     """
@@ -287,141 +387,121 @@ def devis_export_pdf(request, pk):
     Returns:
         HttpResponse: Le fichier PDF généré
     """
-    devis = get_object_or_404(Devis, pk=pk)
-    
-    # Création du PDF
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="devis_{devis.numero}.pdf"'
-    
-    # Création du document
-    doc = SimpleDocTemplate(response, pagesize=letter)
-    styles = getSampleStyleSheet()
-    elements = []
-    
-    # Titre
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=1  # Centré
-    )
-    elements.append(Paragraph(f"Devis N°{devis.numero}", title_style))
-    elements.append(Paragraph(f"Date: {devis.date_creation.strftime('%d/%m/%Y')}", styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Informations client
-    elements.append(Paragraph("Client:", styles['Heading2']))
-    elements.append(Paragraph(f"{devis.client.nom}", styles['Normal']))
-    elements.append(Paragraph(f"{devis.client.adresse}", styles['Normal']))
-    elements.append(Spacer(1, 20))
-    
-    # Tableau des lignes
-    data = [['Description', 'Quantité', 'Prix unitaire', 'Total']]
-    for ligne in devis.lignes.all():
-        data.append([
-            ligne.description,
-            str(ligne.quantite),
-            f"{ligne.prix_unitaire:.2f} €",
-            f"{ligne.montant:.2f} €"
-        ])
-    
-    # Style du tableau
-    table_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ])
-    
-    # Création du tableau
-    table = Table(data)
-    table.setStyle(table_style)
-    elements.append(table)
-    elements.append(Spacer(1, 20))
-    
-    # Calcul de la TVA avec Decimal
-    tva_rate = Decimal('0.20')  # 20% TVA
-    montant_tva = devis.montant_ht * tva_rate
-    montant_ttc = devis.montant_ht + montant_tva
-    
-    # Totaux
-    totals_data = [
-        ['Total HT:', f"{devis.montant_ht:.2f} €"],
-        ['TVA (20%):', f"{montant_tva:.2f} €"],
-        ['Total TTC:', f"{montant_ttc:.2f} €"]
-    ]
-    
-    totals_table = Table(totals_data, colWidths=[2*inch, 2*inch])
-    totals_style = TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ])
-    totals_table.setStyle(totals_style)
-    elements.append(totals_table)
-    
-    # Pied de page
-    elements.append(Spacer(1, 30))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.grey,
-        alignment=1
-    )
-    elements.append(Paragraph("Ce devis est valable 30 jours à compter de sa date d'émission.", footer_style))
-    
-    # Génération du PDF
-    doc.build(elements)
-    return response
+    return _servir_export(request, pk, 'pdf')
+
 
 @login_required
 def devis_export_csv(request):
     """
     Exporte la liste des devis en format CSV.
     
-    Génère un fichier CSV contenant tous les devis avec leurs
-    informations principales, triés par date de création.
+    Génère un fichier CSV contenant les devis avec leurs informations
+    principales, triés par date de création. Les filtres de la liste des
+    devis (client, statut, date_debut, date_fin) sont appliqués.
+    
+    Les devis et leurs clients sont lus en une seule requête, par morceaux
+    (curseur côté serveur avec PostgreSQL), et le fichier est diffusé au fil
+    de l'eau : le premier octet part sans attendre la fin de la lecture.
     
     Args:
         request: La requête HTTP
         
     Returns:
-        HttpResponse: Le fichier CSV généré
-    """
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="devis_{datetime.now().strftime("%Y%m%d")}.csv"'
-    
-    writer = csv.writer(response)
-    # En-têtes du CSV
-    writer.writerow([
-        'Numéro', 'Client', 'Date création', 'Date validité',
-        'Montant HT', 'TVA', 'Montant TTC', 'Statut'
-    ])
-    
-    # Données des devis
-    devis = Devis.objects.all().order_by('-date_creation')
-    for devis in devis:
-        writer.writerow([
+        StreamingHttpResponse: Le fichier CSV généré
+    """
+    devis = (
+        filtrer_devis(Devis.objects.all(), lire_filtres(request.GET))
+        .select_related('client')
+        .only(
+            'numero', 'date_creation', 'date_validite', 'montant_ht', 'statut',
+            'client__nom'
+        )
+        .order_by('-date_creation', '-id')
+    )
+    
+    tva_rate = Decimal('0.20')
+    lignes = (
+        [
             devis.numero,
             devis.client.nom,
             devis.date_creation.strftime('%d/%m/%Y'),
             devis.date_validite.strftime('%d/%m/%Y'),
             f"{devis.montant_ht:.2f}",
-            f"{devis.montant_ht * Decimal('0.20'):.2f}",
+            f"{devis.montant_ht * tva_rate:.2f}",
             f"{devis.montant_ttc:.2f}",
             devis.get_statut_display()
-        ])
+        ]
+        for devis in devis.iterator(chunk_size=TAILLE_MORCEAU_EXPORT)
+    )
+    
+    return reponse_csv(
+        f'devis_{datetime.now().strftime("%Y%m%d")}.csv',
+        [
+            'Numéro', 'Client', 'Date création', 'Date validité',
+            'Montant HT', 'TVA', 'Montant TTC', 'Statut'
+        ],
+        lignes,
+    )
+
+@login_required
+def devis_export_zip(request):
+    """
+    Exporte plusieurs devis dans une archive ZIP.
     
+    Les devis correspondant aux filtres de la liste (client, statut,
+    date_debut, date_fin) sont rendus en parallèle par un pool de processus,
+    dans le format demandé par le paramètre format (pdf par défaut), et
+    l'archive est diffusée au fil des rendus (voir devis/exports/archive.py).
+    
+    Args:
+        request: La requête HTTP
+        
+    Returns:
+        StreamingHttpResponse: L'archive ZIP générée
+    """
+    format_export = request.GET.get('format', 'pdf')
+    if format_export not in FORMATS:
+        raise Http404("Format d'export inconnu")
+    
+    devis_ids = list(
+        filtrer_devis(Devis.objects.all(), lire_filtres(request.GET))
+        .order_by('-date_creation', '-id')
+        .values_list('id', flat=True)
+    )
+    
+    response = StreamingHttpResponse(generer_zip(devis_ids, format_export), content_type='application/zip')
+    response['Content-Disposition'] = (
+        f'attachment; filename="devis_{format_export}_{datetime.now().strftime("%Y%m%d")}.zip"'
+    )
+    return response
+
+@login_required
+def devis_export_classeur(request):
+    """
+    Exporte les devis d'une période dans un classeur Excel unique.
+    
+    Les filtres de la liste des devis (client, statut, date_debut, date_fin)
+    sont appliqués. Le paramètre disposition choisit la présentation :
+    'plat' (une ligne par ligne de devis, par défaut) ou 'feuilles' (une
+    feuille par devis). Voir devis/exports/classeur.py.
+    
+    Args:
+        request: La requête HTTP
+        
+    Returns:
+        HttpResponse: Le classeur Excel généré
+    """
+    disposition = request.GET.get('disposition', 'plat')
+    if disposition not in DISPOSITIONS:
+        raise Http404("Disposition inconnue")
+    
+    devis = filtrer_devis(Devis.objects.all(), lire_filtres(request.GET))
+    contenu = rendre_classeur(devis_avec_lignes(devis), disposition)
+    
+    response = HttpResponse(contenu, content_type=FORMATS['excel'].content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="devis_{disposition}_{datetime.now().strftime("%Y%m%d")}.xlsx"'
+    )
     return response
 
 @login_required
@@ -470,82 +550,8 @@ def devis_export_excel(request, pk):
     Returns:
         HttpResponse: Le fichier Excel généré
     """
-    devis = get_object_or_404(Devis, pk=pk)
-    
-    # Création du classeur Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Devis {devis.numero}"
-    
-    # Styles
-    header_font = Font(bold=True, size=12)
-    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-    title_font = Font(bold=True, size=14)
-    
-    # Titre
-    ws['A1'] = f"Devis N°{devis.numero}"
-    ws['A1'].font = title_font
-    ws['A2'] = f"Date: {devis.date_creation.strftime('%d/%m/%Y')}"
-    
-    # Informations client
-    ws['A4'] = "Client:"
-    ws['A4'].font = header_font
-    ws['A5'] = devis.client.nom
-    ws['A6'] = devis.client.adresse
-    
-    # En-têtes du tableau
-    headers = ['Description', 'Quantité', 'Prix unitaire', 'Total']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=8, column=col)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Données des lignes
-    row = 9
-    for ligne in devis.lignes.all():
-        ws.cell(row=row, column=1).value = ligne.description
-        ws.cell(row=row, column=2).value = ligne.quantite
-        ws.cell(row=row, column=3).value = f"{ligne.prix_unitaire:.2f} €"
-        ws.cell(row=row, column=4).value = f"{ligne.montant:.2f} €"
-        row += 1
-    
-    # Totaux
-    row += 1
-    ws.cell(row=row, column=1).value = "Total HT:"
-    ws.cell(row=row, column=2).value = f"{devis.montant_ht:.2f} €"
-    ws.cell(row=row, column=1).font = header_font
-    
-    row += 1
-    tva = devis.montant_ht * Decimal('0.20')
-    ws.cell(row=row, column=1).value = "TVA (20%):"
-    ws.cell(row=row, column=2).value = f"{tva:.2f} €"
-    ws.cell(row=row, column=1).font = header_font
-    
-    row += 1
-    ws.cell(row=row, column=1).value = "Total TTC:"
-    ws.cell(row=row, column=2).value = f"{devis.montant_ttc:.2f} €"
-    ws.cell(row=row, column=1).font = header_font
-    
-    # Ajustement des largeurs de colonnes
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    
-    # Création de la réponse
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="devis_{devis.numero}.xlsx"'
-    wb.save(response)
-    return response
+    return _servir_export(request, pk, 'excel')
+
 
 @login_required
 def devis_export_word(request, pk):
@@ -562,71 +568,197 @@ def devis_export_word(request, pk):
     Returns:
         HttpResponse: Le fichier Word généré
     """
+    return _servir_export(request, pk, 'word')
+
+
+def _etat_tache(tache):
+    """Décrit l'état d'une tâche d'export pour les réponses JSON."""
+    etat = {
+        'id': tache.pk,
+        'devis': tache.devis_id,
+        'format': tache.format,
+        'statut': tache.statut,
+        'url_statut': reverse('devis:tache_export_statut', args=[tache.pk]),
+    }
+    if tache.statut == 'termine':
+        etat['url_telechargement'] = reverse('devis:tache_export_telecharger', args=[tache.pk])
+    elif tache.statut == 'echec':
+        etat['erreur'] = tache.erreur
+    return etat
+
+
+@login_required
+@require_POST
+def devis_export_tache(request, pk, format_export):
+    """
+    Demande l'export d'un devis en arrière-plan.
+    
+    Crée une tâche d'export exécutée par le pool de processus d'export
+    et retourne immédiatement, sans attendre le rendu du document.
+    
+    Args:
+        request: La requête HTTP (POST)
+        pk: L'identifiant unique du devis à exporter
+        format_export: Le format d'export ('pdf', 'excel', 'word')
+        
+    Returns:
+        JsonResponse: L'état de la tâche créée (code 202)
+    """
+    if format_export not in FORMATS:
+        raise Http404("Format d'export inconnu")
     devis = get_object_or_404(Devis, pk=pk)
+    tache = soumettre_export(devis, format_export, request.user)
+    return JsonResponse(_etat_tache(tache), status=202)
+
+
+@login_required
+def tache_export_statut(request, pk):
+    """
+    Retourne l'état d'une tâche d'export.
     
-    # Création du document Word
-    doc = Document()
-    
-    # Titre
-    title = doc.add_heading(f"Devis N°{devis.numero}", level=1)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Date
-    date_para = doc.add_paragraph(f"Date: {devis.date_creation.strftime('%d/%m/%Y')}")
-    date_para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    
-    # Informations client
-    doc.add_heading("Client:", level=2)
-    doc.add_paragraph(devis.client.nom)
-    doc.add_paragraph(devis.client.adresse)
-    
-    # Tableau des lignes
-    table = doc.add_table(rows=1, cols=4)
-    table.style = 'Table Grid'
-    
-    # En-têtes
-    header_cells = table.rows[0].cells
-    headers = ['Description', 'Quantité', 'Prix unitaire', 'Total']
-    for i, header in enumerate(headers):
-        header_cells[i].text = header
-        header_cells[i].paragraphs[0].runs[0].bold = True
-    
-    # Données des lignes
-    for ligne in devis.lignes.all():
-        row_cells = table.add_row().cells
-        row_cells[0].text = ligne.description
-        row_cells[1].text = str(ligne.quantite)
-        row_cells[2].text = f"{ligne.prix_unitaire:.2f} €"
-        row_cells[3].text = f"{ligne.montant:.2f} €"
-    
-    # Totaux
-    doc.add_paragraph()
-    totals = doc.add_table(rows=3, cols=2)
-    totals.style = 'Table Grid'
-    
-    # Total HT
-    totals.rows[0].cells[0].text = "Total HT:"
-    totals.rows[0].cells[1].text = f"{devis.montant_ht:.2f} €"
-    totals.rows[0].cells[0].paragraphs[0].runs[0].bold = True
-    
-    # TVA
-    tva = devis.montant_ht * Decimal('0.20')
-    totals.rows[1].cells[0].text = "TVA (20%):"
-    totals.rows[1].cells[1].text = f"{tva:.2f} €"
-    totals.rows[1].cells[0].paragraphs[0].runs[0].bold = True
-    
-    # Total TTC
-    totals.rows[2].cells[0].text = "Total TTC:"
-    totals.rows[2].cells[1].text = f"{devis.montant_ttc:.2f} €"
-    totals.rows[2].cells[0].paragraphs[0].runs[0].bold = True
-    
-    # Pied de page
-    doc.add_paragraph()
-    footer = doc.add_paragraph("Ce devis est valable 30 jours à compter de sa date d'émission.")
-    footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Création de la réponse
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-    response['Content-Disposition'] = f'attachment; filename="devis_{devis.numero}.docx"'
-    doc.save(response)
-    return response
+    Args:
+        request: La requête HTTP
+        pk: L'identifiant unique de la tâche
+        
+    Returns:
+        JsonResponse: L'état de la tâche, avec l'URL de téléchargement
+                      une fois le document prêt
+    """
+    tache = get_object_or_404(TacheExport, pk=pk)
+    return JsonResponse(_etat_tache(tache))
+
+
+@login_required
+def tache_export_telecharger(request, pk):
+    """
+    Télécharge le document produit par une tâche d'export terminée.
+    
+    Args:
+        request: La requête HTTP
+        pk: L'identifiant unique de la tâche
+        
+    Returns:
+        FileResponse: Le document exporté
+    """
+    tache = get_object_or_404(TacheExport.objects.select_related('devis'), pk=pk, statut='termine')
+    export = FORMATS[tache.format]
+    return FileResponse(
+        tache.fichier.open('rb'),
+        as_attachment=True,
+        filename=f'devis_{tache.devis.numero}.{export.extension}',
+        content_type=export.content_type,
+    )
+
+@login_required
+def recherche(request):
+    """
+    Vue de recherche dans les clients et les devis.
+    
+    Les clients sont cherchés dans leur nom, email, téléphone et adresse,
+    les devis dans leur numéro, leurs notes et la description de leurs
+    lignes (voir devis/recherche.py).
+    
+    Args:
+        request: La requête HTTP (paramètre q : le texte recherché)
+        
+    Returns:
+        HttpResponse: La page de résultats
+    """
+    texte = request.GET.get('q', '').strip()
+    resultats = rechercher(texte) if len(texte) >= LONGUEUR_MIN else None
+    return render(request, 'devis/recherche.html', {
+        'q': texte,
+        'resultats': resultats,
+    })
+
+@login_required
+def recherche_suggestions(request):
+    """
+    Suggestions de clients et de devis pendant la saisie d'une recherche.
+    
+    Args:
+        request: La requête HTTP (paramètre q : le texte saisi)
+        
+    Returns:
+        JsonResponse: {'clients': [...], 'devis': [...]}
+    """
+    texte = request.GET.get('q', '').strip()
+    if len(texte) < LONGUEUR_MIN:
+        return JsonResponse({'clients': [], 'devis': []})
+    
+    trouves = suggestions(texte)
+    return JsonResponse({
+        'clients': [
+            {
+                'id': client.pk,
+                'nom': client.nom,
+                'email': client.email,
+                'url': reverse('clients:client_detail', args=[client.pk]),
+            }
+            for client in trouves['clients']
+        ],
+        'devis': [
+            {
+                'id': devis.pk,
+                'numero': devis.numero,
+                'client': devis.client.nom,
+                'statut': devis.get_statut_display(),
+                'url': reverse('devis:devis_detail', args=[devis.pk]),
+            }
+            for devis in trouves['devis']
+        ],
+    })
+
+@login_required
+def analyses(request):
+    """
+    Tableau de bord des analyses de devis.
+    
+    Affiche, pour la période et les filtres demandés, le chiffre d'affaires,
+    le taux d'acceptation et le montant moyen des devis par mois, par client
+    et par créateur. Seuls les agrégats mensuels sont lus (voir devis/analyses.py).
+    
+    Args:
+        request: La requête HTTP (paramètres debut, fin, client, utilisateur)
+        
+    Returns:
+        HttpResponse: Le tableau de bord
+    """
+    parametres = lire_parametres(request.GET)
+    par_mois = analyser('mois', **parametres)
+    return render(request, 'devis/analyses.html', {
+        'parametres': parametres,
+        'par_mois': par_mois,
+        'total': totaux(par_mois),
+        'par_client': analyser('client', **parametres),
+        'par_utilisateur': analyser('utilisateur', **parametres),
+        'rafraichi_le': date_rafraichissement(),
+    })
+
+@login_required
+def analyses_donnees(request):
+    """
+    Indicateurs des devis au format JSON, lus dans les agrégats mensuels.
+    
+    Args:
+        request: La requête HTTP (paramètres regroupement : mois, client ou
+                 utilisateur ; limite ; debut, fin, client, utilisateur)
+        
+    Returns:
+        JsonResponse: {'regroupement', 'rafraichi_le', 'lignes': [...], 'total'}
+    """
+    regroupement = request.GET.get('regroupement', 'mois')
+    if regroupement not in REGROUPEMENTS:
+        return JsonResponse({'erreur': f"Regroupement inconnu : {regroupement}"}, status=400)
+    limite = request.GET.get('limite', '')
+    
+    parametres = lire_parametres(request.GET)
+    lignes = analyser(regroupement, limite=int(limite) if limite.isdigit() else None, **parametres)
+    return JsonResponse({
+        'regroupement': regroupement,
+        'rafraichi_le': date_rafraichissement(),
+        'parametres': parametres,
+        'lignes': lignes,
+        # Totaux de la période : uniquement si toutes ses lignes sont lues
+        'total': totaux(lignes) if regroupement == 'mois' and not limite.isdigit() else None,
+    })
@@ -0,0 +1,81 @@
+"""
+Requêtes conditionnelles (If-None-Match) sur les pages de liste et de détail.
+
+Le décorateur page_conditionnelle calcule l'ETag d'une page avant de
+l'afficher, à partir d'une estampille peu coûteuse : version de l'objet
+affiché (Client.version, Devis.version) ou version des listes (voir
+clients/cache.py et devis/cache.py). Si le navigateur possède déjà la page,
+une réponse 304 est retournée sans exécuter la vue ni rendre de template.
+
+Les pages dépendent aussi de l'utilisateur connecté (menu, jeton CSRF) :
+l'ETag comprend l'utilisateur et le cookie CSRF, et les réponses sont
+privées (Cache-Control: private, no-cache ; Vary: Cookie). Une requête qui a
+des messages flash en attente est toujours servie en entier, les messages
+n'étant affichés qu'une fois.
+
+PAGES_VERSION entre dans tous les ETags : la changer à chaque déploiement
+(par exemple avec le commit déployé) pour que les pages rendues par les
+anciens templates ne soient plus considérées comme à jour.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+
+def etag_page(request, estampille):
+    """
+    Calcule l'ETag d'une page pour l'utilisateur de la requête.
+
+    Args:
+        request: La requête HTTP
+        estampille: Les versions des données affichées par la page
+
+    Returns:
+        str: L'ETag, entre guillemets
+    """
+    elements = [
+        getattr(settings, 'PAGES_VERSION', ''),
+        request.user.pk,
+        request.META.get('CSRF_COOKIE'),
+        estampille,
+    ]
+    return quote_etag(hashlib.sha256(repr(elements).encode()).hexdigest()[:32])
+
+
+def page_conditionnelle(estampille):
+    """
+    Décorateur de vue : répond 304 aux requêtes GET dont l'ETag correspond
+    à l'estampille courante de la page.
+
+    Args:
+        estampille: Fonction (request, *args, **kwargs) retournant les versions
+                    des données affichées, ou None si la page ne peut pas être
+                    servie conditionnellement (objet introuvable…)
+    """
+    def decorateur(vue):
+        @wraps(vue)
+        def enveloppe(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return vue(request, *args, **kwargs)
+            versions = estampille(request, *args, **kwargs)
+            if versions is None:
+                return vue(request, *args, **kwargs)
+
+            etag = etag_page(request, versions)
+            reponse = get_conditional_response(request, etag=etag)
+            if reponse is None:
+                reponse = vue(request, *args, **kwargs)
+                if reponse.status_code != 200:
+                    return reponse
+                reponse['ETag'] = etag
+            # Le navigateur conserve la page mais doit la revalider à chaque affichage
+            patch_cache_control(reponse, private=True, no_cache=True)
+            patch_vary_headers(reponse, ['Cookie'])
+            return reponse
+        return enveloppe
+    return decorateur
@@ -0,0 +1,59 @@
+"""
+Réponses CSV diffusées en flux.
+
+Les exports CSV sont écrits ligne par ligne dans une StreamingHttpResponse
+au lieu d'être construits entièrement en mémoire : la mémoire utilisée
+reste constante quel que soit le nombre de lignes exportées, et le premier
+octet est envoyé dès que la première ligne est disponible.
+"""
+
+import csv
+
+from django.http import StreamingHttpResponse
+
+# Nombre de lignes CSV regroupées dans chaque morceau envoyé au client
+LIGNES_PAR_MORCEAU = 500
+
+
+class Echo:
+    """
+    Pseudo-fichier qui retourne ce qu'on lui écrit au lieu de le stocker,
+    pour que csv.writer produise directement les lignes à diffuser.
+    """
+
+    def write(self, valeur):
+        return valeur
+
+
+def generer_csv(entetes, lignes, lignes_par_morceau=LIGNES_PAR_MORCEAU):
+    """
+    Génère le contenu CSV par morceaux de plusieurs lignes.
+
+    Args:
+        entetes: La ligne d'en-têtes
+        lignes: Un itérable de lignes (séquences de valeurs)
+        lignes_par_morceau: Nombre de lignes regroupées par morceau
+    """
+    writer = csv.writer(Echo())
+    morceau = [writer.writerow(entetes)]
+    for ligne in lignes:
+        morceau.append(writer.writerow(ligne))
+        if len(morceau) >= lignes_par_morceau:
+            yield ''.join(morceau)
+            morceau = []
+    if morceau:
+        yield ''.join(morceau)
+
+
+def reponse_csv(nom_fichier, entetes, lignes):
+    """
+    Retourne une réponse HTTP qui diffuse un fichier CSV en pièce jointe.
+
+    Args:
+        nom_fichier: Nom du fichier proposé au téléchargement
+        entetes: La ligne d'en-têtes
+        lignes: Un itérable de lignes, consommé au fil de l'envoi
+    """
+    response = StreamingHttpResponse(generer_csv(entetes, lignes), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+    return response
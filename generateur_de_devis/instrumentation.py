@@ -0,0 +1,252 @@
+"""
+Instrumentation des vues : requêtes SQL, temps base de données, temps de
+rendu des templates et durée totale, par nom d'URL (devis:devis_detail…).
+
+- InstrumentationMiddleware mesure chaque requête HTTP et enregistre les
+  mesures dans le registre du processus ;
+- GabaritsInstrumentes est le moteur de templates Django, dont les rendus
+  sont chronométrés (à déclarer dans TEMPLATES) ;
+- la vue metriques() expose les mesures au format texte de Prometheus,
+  aux seuls membres du staff.
+
+Les centiles sont calculés sur les INSTRUMENTATION_FENETRE dernières
+requêtes de chaque vue ; les mesures sont propres à chaque processus.
+Une requête qui dépasse INSTRUMENTATION_BUDGET_REQUETES requêtes SQL est
+signalée dans les logs.
+
+Les réponses diffusées en flux (CSV, ZIP) ne sont mesurées que jusqu'au
+retour de la vue, et le temps de rendu des templates comprend les requêtes
+SQL exécutées pendant ce rendu.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+# Centiles publiés pour chaque mesure
+CENTILES = (0.5, 0.9, 0.99)
+
+# Mesures publiées : (attribut de Mesure, nom de la métrique, description)
+METRIQUES = [
+    ('duree', 'generateur_vue_duree_secondes', "Durée totale de traitement des requêtes"),
+    ('duree_bdd', 'generateur_vue_bdd_secondes', "Temps passé dans la base de données"),
+    ('duree_gabarits', 'generateur_vue_gabarits_secondes', "Temps de rendu des templates"),
+    ('requetes', 'generateur_vue_requetes_sql', "Nombre de requêtes SQL"),
+]
+
+# Nom publié pour les requêtes qui ne correspondent à aucune URL
+VUE_NON_RESOLUE = '<non résolue>'
+
+# Mesure de la requête en cours de traitement
+_mesure_courante = contextvars.ContextVar('mesure_courante', default=None)
+
+
+class Mesure:
+    """Mesures d'une requête HTTP."""
+
+    def __init__(self):
+        self.requetes = 0
+        self.duree_bdd = 0.0
+        self.duree_gabarits = 0.0
+        self.duree = 0.0
+        # Profondeur des rendus imbriqués, pour ne compter que le plus externe
+        self.profondeur_gabarits = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Enveloppe d'exécution SQL (voir connection.execute_wrapper())."""
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duree_bdd += time.perf_counter() - debut
+            self.requetes += 1
+
+
+class StatistiquesVue:
+    """Mesures glissantes et cumulées d'une vue."""
+
+    def __init__(self, fenetre):
+        self.echantillons = {attribut: deque(maxlen=fenetre) for attribut, _, _ in METRIQUES}
+        self.sommes = {attribut: 0 for attribut, _, _ in METRIQUES}
+        self.nombre = 0
+
+    def ajouter(self, mesure):
+        for attribut in self.echantillons:
+            valeur = getattr(mesure, attribut)
+            self.echantillons[attribut].append(valeur)
+            self.sommes[attribut] += valeur
+        self.nombre += 1
+
+
+class Registre:
+    """Mesures de toutes les vues du processus."""
+
+    def __init__(self, fenetre):
+        self.fenetre = fenetre
+        self._vues = {}
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, vue, mesure):
+        with self._verrou:
+            statistiques = self._vues.get(vue)
+            if statistiques is None:
+                statistiques = self._vues[vue] = StatistiquesVue(self.fenetre)
+            statistiques.ajouter(mesure)
+
+    def instantane(self):
+        """
+        Retourne une copie des mesures de chaque vue.
+
+        Returns:
+            dict: {vue: (nombre, sommes, échantillons triés)} par mesure
+        """
+        with self._verrou:
+            return {
+                vue: (
+                    statistiques.nombre,
+                    dict(statistiques.sommes),
+                    {attribut: sorted(valeurs) for attribut, valeurs in statistiques.echantillons.items()},
+                )
+                for vue, statistiques in self._vues.items()
+            }
+
+    def vider(self):
+        with self._verrou:
+            self._vues.clear()
+
+
+registre = Registre(getattr(settings, 'INSTRUMENTATION_FENETRE', 1000))
+
+
+def centile(valeurs_triees, q):
+    """Centile q (entre 0 et 1) d'une liste triée, méthode du rang le plus proche."""
+    if not valeurs_triees:
+        return 0
+    rang = min(len(valeurs_triees) - 1, max(0, round(q * len(valeurs_triees)) - 1))
+    return valeurs_triees[rang]
+
+
+class InstrumentationMiddleware:
+    """
+    Mesure chaque requête et l'enregistre sous le nom de sa vue.
+
+    À placer en tête de MIDDLEWARE pour que la durée totale comprenne
+    les autres middlewares.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mesure = Mesure()
+        jeton = _mesure_courante.set(mesure)
+        debut = time.perf_counter()
+        try:
+            with ExitStack() as pile:
+                for connexion in connections.all():
+                    pile.enter_context(connexion.execute_wrapper(mesure))
+                response = self.get_response(request)
+        finally:
+            mesure.duree = time.perf_counter() - debut
+            _mesure_courante.reset(jeton)
+
+        correspondance = getattr(request, 'resolver_match', None)
+        vue = correspondance.view_name if correspondance else VUE_NON_RESOLUE
+        registre.enregistrer(vue, mesure)
+
+        budget = getattr(settings, 'INSTRUMENTATION_BUDGET_REQUETES', None)
+        if budget is not None and mesure.requetes > budget:
+            logger.warning(
+                f"{vue} ({request.method} {request.path}) : {mesure.requetes} requêtes SQL "
+                f"pour un budget de {budget} ({mesure.duree_bdd * 1000:.1f} ms en base)"
+            )
+        return response
+
+
+class GabaritInstrumente(Template):
+    """Template dont le rendu est chronométré pour la requête en cours."""
+
+    def render(self, context=None, request=None):
+        mesure = _mesure_courante.get()
+        if mesure is None:
+            return super().render(context, request)
+
+        mesure.profondeur_gabarits += 1
+        debut = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            mesure.profondeur_gabarits -= 1
+            if mesure.profondeur_gabarits == 0:
+                mesure.duree_gabarits += time.perf_counter() - debut
+
+
+class GabaritsInstrumentes(DjangoTemplates):
+    """Moteur de templates Django dont les rendus sont chronométrés."""
+
+    def from_string(self, template_code):
+        return GabaritInstrumente(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return GabaritInstrumente(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def _etiquette(valeur):
+    """Échappe une valeur d'étiquette Prometheus."""
+    return valeur.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_prometheus(instantane):
+    """
+    Met en forme les mesures au format texte de Prometheus (métriques de
+    type summary : centiles glissants, somme et nombre cumulés).
+
+    Args:
+        instantane: Les mesures, telles que retournées par Registre.instantane()
+
+    Returns:
+        str: Le texte de l'exposition
+    """
+    lignes = []
+    for attribut, nom, description in METRIQUES:
+        lignes.append(f"# HELP {nom} {description}")
+        lignes.append(f"# TYPE {nom} summary")
+        for vue, (nombre, sommes, echantillons) in sorted(instantane.items()):
+            etiquette = f'vue="{_etiquette(vue)}"'
+            for q in CENTILES:
+                lignes.append(f'{nom}{{{etiquette},quantile="{q}"}} {centile(echantillons[attribut], q):g}')
+            lignes.append(f"{nom}_sum{{{etiquette}}} {sommes[attribut]:g}")
+            lignes.append(f"{nom}_count{{{etiquette}}} {nombre}")
+    return '\n'.join(lignes) + '\n'
+
+
+@staff_member_required
+def metriques(request):
+    """
+    Expose les mesures des vues au format texte de Prometheus.
+
+    Args:
+        request: La requête HTTP
+
+    Returns:
+        HttpResponse: Les métriques (text/plain, version 0.0.4)
+    """
+    return HttpResponse(
+        format_prometheus(registre.instantane()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',  # Gestion des sessions
     'django.contrib.messages',  # Système de messages
     'django.contrib.staticfiles',  # Gestion des fichiers statiques
+    'django.contrib.postgres',  # Recherche plein texte et index PostgreSQL
     'crispy_forms',  # Amélioration des formulaires
     'crispy_bootstrap5',  # Intégration Bootstrap 5
 ]
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
 # Middleware
 # Ces composants sont exécutés dans l'ordre pour chaque requête
 MIDDLEWARE = [
+    'generateur_de_devis.instrumentation.InstrumentationMiddleware',  # Mesures des vues
     'django.middleware.security.SecurityMiddleware',  # Sécurité
     'django.contrib.sessions.middleware.SessionMiddleware',  # Sessions
     'django.middleware.common.CommonMiddleware',  # Fonctionnalités communes
@@ -58,7 +60,8 @@ ROOT_URLCONF = 'generateur_de_devis.urls'
 # Configuration des templates
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Moteur Django standard, dont les rendus sont chronométrés
+        'BACKEND': 'generateur_de_devis.instrumentation.GabaritsInstrumentes',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -88,6 +91,35 @@ DATABASES = {
     }
 }
 
+# Configuration du cache
+# Les versions qui invalident les entrées (ETag, fragments, liste des clients)
+# sont conservées en base et partagées par tous les processus : un cache
+# local à chaque processus reste correct. Un cache partagé (par exemple
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache) évite de
+# conserver les mêmes fragments dans chaque processus
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Durée de conservation de la liste des clients en cache (en secondes)
+CLIENTS_LISTE_CACHE_TIMEOUT = 3600
+
+# Nombre de pages d'autocomplétion des clients conservées par processus
+CLIENTS_AUTOCOMPLETION_CACHE = 512
+
+# Version des pages servies avec un ETag (voir generateur_de_devis/conditionnel.py) :
+# à changer à chaque déploiement, par exemple avec le commit déployé
+PAGES_VERSION = os.getenv('PAGES_VERSION', '')
+
+# Journal CSV des clients créés (voir clients/journal.py) : les lignes sont
+# écrites par lots de CLIENTS_JOURNAL_TAILLE_LOT, au plus tard
+# CLIENTS_JOURNAL_DELAI secondes après la création du client
+CLIENTS_JOURNAL_DELAI = 1.0
+CLIENTS_JOURNAL_TAILLE_LOT = 100
+
 # Validation des mots de passe
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -106,7 +138,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Configuration de l'internationalisation
 LANGUAGE_CODE = 'fr-fr'  # Langue par défaut
-TIME_ZONE = 'Europe/Paris'  # Fuseau horaire
+TIME_ZONE = 'Europe/Paris'  # Fuseau horaire (aussi fixé dans la vue des agrégats, migration devis 0011)
 USE_I18N = True  # Internationalisation
 USE_TZ = True  # Support des fuseaux horaires
 
@@ -139,3 +171,55 @@ EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))  # Port SMTP
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'  # Utilisation de TLS
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')  # Utilisateur SMTP
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')  # Mot de passe SMTP
+
+# Nombre maximal de champs acceptés par requête
+# Chaque ligne de devis poste 3 à 4 champs : la valeur par défaut (1000)
+# limiterait les devis à environ 250 lignes
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
+
+# Configuration de la numérotation des devis
+# Backend chargé d'attribuer le numéro séquentiel mensuel (DEV-YYYYMM-XXXX)
+DEVIS_NUMEROTATION_BACKEND = 'devis.numerotation.CompteurBaseDeDonnees'
+
+# Affichage du nombre total de devis dans les listes
+# Désactivé par défaut : le COUNT(*) parcourt toute la table filtrée
+DEVIS_LISTE_COMPTER = False
+
+# Cache disque des documents exportés (PDF, Excel, Word)
+# Les documents sont indexés par l'empreinte du contenu du devis ; au-delà
+# de TAILLE_MAX octets, les moins récemment utilisés sont supprimés
+DEVIS_EXPORTS_CACHE = {
+    'DOSSIER': os.getenv('DEVIS_EXPORTS_CACHE_DIR', str(MEDIA_ROOT / 'cache_exports')),
+    'TAILLE_MAX': int(os.getenv('DEVIS_EXPORTS_CACHE_TAILLE_MAX', 200 * 1024 * 1024)),
+}
+
+# Nombre de processus chargés des exports en arrière-plan (par processus web)
+DEVIS_EXPORTS_WORKERS = int(os.getenv('DEVIS_EXPORTS_WORKERS', 2))
+
+# Nombre de rendus d'export simultanés, tous processus web confondus
+# (verrous consultatifs PostgreSQL, voir devis/exports/taches.py)
+DEVIS_EXPORTS_SIMULTANES = int(os.getenv('DEVIS_EXPORTS_SIMULTANES', 4))
+
+# Durée d'exécution (secondes) au-delà de laquelle une tâche en cours est
+# reprise par la commande relancer_exports
+DEVIS_EXPORTS_DELAI_MAX = int(os.getenv('DEVIS_EXPORTS_DELAI_MAX', 30 * 60))
+
+# Nombre de processus chargés des exports groupés (ZIP), par processus web
+DEVIS_EXPORTS_ZIP_WORKERS = int(os.getenv('DEVIS_EXPORTS_ZIP_WORKERS', 2))
+
+# Nombre de lignes à partir duquel un devis est exporté en mode flux
+# (lignes relues par morceaux, PDF découpé en tableaux successifs)
+DEVIS_EXPORTS_SEUIL_GROS_DEVIS = 500
+
+# Document Word de base des exports (.docx), lu une fois par processus
+# Par défaut, le modèle de python-docx. Le document doit définir les styles
+# « Table Grid », « Heading 1 » et « Heading 2 » ; après un changement de
+# modèle, vider le cache des exports (DEVIS_EXPORTS_CACHE)
+DEVIS_EXPORTS_MODELE_WORD = os.getenv('DEVIS_EXPORTS_MODELE_WORD') or None
+
+# Instrumentation des vues (voir generateur_de_devis/instrumentation.py)
+# Nombre de requêtes conservées par vue pour le calcul des centiles
+INSTRUMENTATION_FENETRE = 1000
+# Au-delà de ce nombre de requêtes SQL, la requête HTTP est signalée dans les logs
+# (0 pour désactiver)
+INSTRUMENTATION_BUDGET_REQUETES = int(os.getenv('INSTRUMENTATION_BUDGET_REQUETES', 30)) or None
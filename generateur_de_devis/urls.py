@@ -5,6 +5,7 @@ from django.contrib.auth import views as auth_views
 from clients.views import register, logout_view
 from django.conf import settings
 from django.conf.urls.static import static
+from generateur_de_devis.instrumentation import metriques
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,6 +14,7 @@ urlpatterns = [
     path('accounts/login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('accounts/logout/', logout_view, name='logout'),
     path('accounts/register/', register, name='register'),
+    path('metriques/', metriques, name='metriques'),
     path('', lambda request: redirect('clients:client_list'), name='home'),
 ]
 
@@ -0,0 +1,136 @@
+// Sélection d'un client par autocomplétion (formulaire de devis, filtres de
+// la liste des devis) : les clients dont le nom commence par le texte saisi
+// sont demandés page par page, 150 ms après la dernière frappe.
+//
+// Options :
+//   champ        : champ caché recevant l'identifiant du client choisi
+//   recherche    : champ de saisie du nom (role="combobox")
+//   suggestions  : liste déroulante des suggestions (ul.dropdown-menu)
+//   url          : URL de l'autocomplétion (clients:client_autocompletion)
+//   obligatoire  : un client doit être choisi dans la liste (défaut : false)
+function initialiserAutocompletionClient(options) {
+    const clientId = options.champ;
+    const clientRecherche = options.recherche;
+    const suggestions = options.suggestions;
+    let minuteurClient = null;
+    let derniereRecherche = null;
+
+    function verifierClient() {
+        if (options.obligatoire) {
+            clientRecherche.setCustomValidity(clientId.value ? '' : 'Veuillez sélectionner un client.');
+        }
+    }
+
+    function fermerSuggestions() {
+        suggestions.classList.remove('show');
+        clientRecherche.setAttribute('aria-expanded', 'false');
+    }
+
+    function choisirClient(client) {
+        clientId.value = client.id;
+        clientRecherche.value = client.nom;
+        verifierClient();
+        fermerSuggestions();
+    }
+
+    function afficherClients(texte, donnees) {
+        if (donnees.page === 1) {
+            suggestions.replaceChildren();
+        } else {
+            suggestions.querySelector('.page-suivante')?.remove();
+        }
+        donnees.resultats.forEach(function(client) {
+            const li = document.createElement('li');
+            const bouton = document.createElement('button');
+            bouton.type = 'button';
+            bouton.className = 'dropdown-item';
+            bouton.setAttribute('role', 'option');
+            bouton.textContent = client.nom;
+            const email = document.createElement('small');
+            email.className = 'text-muted ms-2';
+            email.textContent = client.email;
+            bouton.appendChild(email);
+            bouton.addEventListener('click', () => choisirClient(client));
+            li.appendChild(bouton);
+            suggestions.appendChild(li);
+        });
+        if (donnees.suivante) {
+            const li = document.createElement('li');
+            li.className = 'page-suivante';
+            const bouton = document.createElement('button');
+            bouton.type = 'button';
+            bouton.className = 'dropdown-item text-primary';
+            bouton.textContent = 'Plus de clients…';
+            bouton.addEventListener('click', () => chargerClients(texte, donnees.page + 1));
+            li.appendChild(bouton);
+            suggestions.appendChild(li);
+        }
+        if (!suggestions.children.length) {
+            const li = document.createElement('li');
+            const vide = document.createElement('span');
+            vide.className = 'dropdown-item-text text-muted';
+            vide.textContent = 'Aucun client trouvé';
+            li.appendChild(vide);
+            suggestions.appendChild(li);
+        }
+        suggestions.classList.add('show');
+        clientRecherche.setAttribute('aria-expanded', 'true');
+    }
+
+    function chargerClients(texte, page) {
+        derniereRecherche = texte;
+        fetch(options.url + '?q=' + encodeURIComponent(texte) + '&page=' + page, {headers: {'Accept': 'application/json'}})
+            .then(reponse => reponse.ok ? reponse.json() : null)
+            .then(donnees => {
+                // Les réponses d'une saisie dépassée sont ignorées
+                if (donnees && texte === derniereRecherche) {
+                    afficherClients(texte, donnees);
+                }
+            })
+            .catch(() => {});
+    }
+
+    clientRecherche.addEventListener('input', function() {
+        // Le texte modifié ne désigne plus le client choisi
+        clientId.value = '';
+        verifierClient();
+        clearTimeout(minuteurClient);
+        const texte = clientRecherche.value.trim();
+        minuteurClient = setTimeout(() => chargerClients(texte, 1), 150);
+    });
+
+    clientRecherche.addEventListener('focus', function() {
+        if (!clientId.value && !suggestions.children.length) {
+            chargerClients(clientRecherche.value.trim(), 1);
+        }
+    });
+
+    // Navigation au clavier dans les suggestions
+    clientRecherche.addEventListener('keydown', function(e) {
+        if (e.key === 'ArrowDown' && suggestions.classList.contains('show')) {
+            e.preventDefault();
+            suggestions.querySelector('button')?.focus();
+        } else if (e.key === 'Escape') {
+            fermerSuggestions();
+        }
+    });
+    suggestions.addEventListener('keydown', function(e) {
+        const element = e.target.closest('li');
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            const voisin = e.key === 'ArrowDown' ? element.nextElementSibling : element.previousElementSibling;
+            (voisin ? voisin.querySelector('button') : clientRecherche)?.focus();
+        } else if (e.key === 'Escape') {
+            fermerSuggestions();
+            clientRecherche.focus();
+        }
+    });
+
+    document.addEventListener('click', function(e) {
+        if (!clientRecherche.parentElement.contains(e.target)) {
+            fermerSuggestions();
+        }
+    });
+
+    verifierClient();
+}